@@ -27,9 +27,14 @@ __all__ = [
     "ReadStreamDescriptor",
     "WriteStreamDescriptor",
     "EventLoggingConfig",
+    "StreamConsumerMode",
+    "StreamEnvelope",
     "EventStreamConfig",
     "Compression",
     "Serialization",
+    "ResponseStreamFormat",
+    "EventCacheConfig",
+    "EventAdmissionConfig",
     "AppEngineConfig",
     "AppConfig",
     "parse_app_config_json",
@@ -102,17 +107,33 @@ class ReadStreamDescriptor:
         events when no queue where specified at publish time, allowing to consume message with different
         priorities without waiting for all events in the stream to be consumed.
         Queues specified in this entry will be consumed by this event
-        on each poll cycle, on the order specified. If not present
+        on each poll cycle. If not present
         only AUTO queue will be consumed. Take into account that in applications using multiple
         queue names, in order to ensure all messages are consumed, all queue names should be listed
         here including AUTO, except that the app is intentionally designed for certain events to
         consume only from specific queues. This configuration is manual to allow consuming messages
-        produced by external apps.
+        produced by external apps. Queues are read concurrently on each poll cycle, so waiting
+        for messages in a quiet queue does not delay reading from the others.
+    :queue_weights: Dict[str, int], optional positive weight for each queue name, default weight is 1.
+        When specified, the number of messages read on each poll cycle (`batch_size`) is shared
+        among queues proportionally to their weights, with every queue reading at least one message
+        while batch size allows it. If not specified, up to `batch_size` messages are read from
+        each queue on each cycle. Notice that in `prefetch` and `continuous` consumer modes,
+        batch size is always shared among queues.
+    :partitions: int, number of partitions of the stream, must match `partitions` configured
+        in `write_stream` of events publishing to it. Default 0 means stream is not partitioned.
+        If greater than 1, each queue is read from one stream per partition, using partition
+        number as stream name suffix, i.e. `stream_name.queue:3`. Partitions are assigned
+        to consumers of the consumer group, so each partition is read by a single consumer,
+        and its messages are processed in order while different partitions are processed
+        concurrently. Batch size of each queue is shared among assigned partitions.
     """
 
     name: str
     consumer_group: str
     queues: List[str] = field(default_factory=StreamQueue.default_queues)
+    queue_weights: Dict[str, int] = field(default_factory=dict)
+    partitions: int = 0
 
 
 class StreamQueueStrategy(str, Enum):
@@ -149,11 +170,17 @@ class WriteStreamDescriptor:
         with a queue name and publishing to another stream. Default is `StreamQueueStrategy.DROP`,
         so in case of complex stream propagating queue names are configured,
         `StreamQueueStrategy.PROPAGATE` must be explicitly specified.
+    :field partitions: int, number of partitions to publish to. Default 0 means stream is
+        not partitioned. If greater than 1, each message is published to the partition computed
+        hashing `event_id()` of its payload, using partition number as stream name suffix,
+        so all messages with the same event id are consumed in publishing order.
+        Events reading this stream must be configured with the same number of partitions.
     """
 
     name: str
     queues: List[str] = field(default_factory=StreamQueue.default_queues)
     queue_strategy: StreamQueueStrategy = StreamQueueStrategy.DROP
+    partitions: int = 0
 
 
 @dataobject
@@ -189,6 +216,15 @@ class EventLoggingConfig:
 class Compression(str, Enum):
     """
     Available compression algorithms and levels for event payloads.
+
+    `zstd` options require `zstandard` package, installed with `hopeit.engine[zstd]` extra.
+    Stream payloads compressed using zstd can use trained dictionaries,
+    see `StreamsConfig.compression_dictionaries`.
+
+    `auto` leaves small stream payloads uncompressed, and selects compression for larger ones
+    per datatype based on observed compression ratio and cost, see `StreamsConfig.auto_compression_*`
+    settings. Compression selected is recorded in each message, so readers do not need to be
+    configured.
     """
 
     NONE = "none"
@@ -205,11 +241,19 @@ class Compression(str, Enum):
     BZ2_MIN = "bz2:1"
     BZ2_MAX = "bz2:9"
     LZMA = "lzma"
+    ZSTD = "zstd"
+    ZSTD_MIN = "zstd:1"
+    ZSTD_MAX = "zstd:19"
+    AUTO = "auto"
 
 
 class Serialization(str, Enum):
     """
     Available serialization methods for event payloads.
+
+    `msgpack` is a compact binary format, faster and smaller than json for numeric payloads,
+    and safe to use across versions, unlike pickle. Requires `msgpack` package, installed
+    with `hopeit.engine[msgpack]` extra.
     """
 
     JSON_UTF8 = "json"
@@ -217,6 +261,40 @@ class Serialization(str, Enum):
     PICKLE3 = "pickle:3"
     PICKLE4 = "pickle:4"
     PICKLE5 = "pickle:5"
+    MSGPACK = "msgpack"
+
+
+class StreamConsumerMode(str, Enum):
+    """
+    Strategies to consume messages from streams in STREAM events.
+
+    :field BATCH: reads a batch of messages, processes them concurrently and waits
+        for all of them to finish before reading the next batch.
+    :field PREFETCH: reads next batch of messages while current batch is being processed,
+        keeping up to `max_in_flight` messages read and not yet processed.
+    :field CONTINUOUS: processes up to `max_in_flight` messages concurrently, with no batch
+        barriers: every processed message frees a slot and new messages are read as slots are freed.
+    """
+
+    BATCH = "batch"
+    PREFETCH = "prefetch"
+    CONTINUOUS = "continuous"
+
+
+class StreamEnvelope(str, Enum):
+    """
+    Formats used to encode event metadata in stream messages.
+    Readers decode messages in any of the formats, so writers can switch format at any time.
+
+    :field FIELDS: every message field (event id, datatype, timestamps, track ids, auth info,
+        serialization and compression) is sent as a separate string value.
+    :field COMPACT: event metadata is sent in a single versioned binary header,
+        using integer timestamps and ids for datatype names and track ids keys,
+        omitting auth info when empty. Reduces stream service memory used per message.
+    """
+
+    FIELDS = "fields"
+    COMPACT = "compact"
 
 
 @dataobject
@@ -240,6 +318,28 @@ class EventStreamConfig:
         default from Server config will be used.
     :field serialization: Serialization, serialization method used to send messages to stream, if not specified
         default from Server config will be used.
+    :field ack_batch_size: int, max number of successfully processed messages acknowledged together
+        using a single request to stream service. Acknowledgements are sent by the read loop,
+        not counting for processing `timeout`: in `continuous` consumer mode, when `ack_batch_size`
+        messages are pending or `ack_interval_ms` elapsed, checked every time stream is read.
+        Pending acknowledgements are always sent at the end of each read cycle.
+    :field ack_interval_ms: int, max milliseconds to hold a pending acknowledgement before sending it,
+        default 1000.
+    :field consumer_mode: StreamConsumerMode, strategy used to read and process messages,
+        default `batch`.
+    :field max_in_flight: int, max number of messages read from stream and not yet processed,
+        when consumer_mode is `prefetch` or `continuous`. Default 0 allows up to 2 x batch_size
+        messages in `prefetch` mode, that is, one batch being processed and one prefetched,
+        and batch_size messages in `continuous` mode.
+    :field envelope: StreamEnvelope, format used to encode metadata of messages sent to stream,
+        default `fields`.
+    :field pack_size: int, max number of consecutive payloads of the same datatype packed
+        in a single stream message when writing batches, serialized and compressed together.
+        Default 0 writes one message per payload. Packed messages are unpacked by readers
+        and acknowledged once all their events are processed successfully: if any of them fails,
+        message is not acknowledged, and all its events will be delivered again on retry.
+        Notice that `batch_size` and `max_in_flight` limits on readers count stream messages.
+        Stream managers not supporting packing write one message per payload.
     """
 
     timeout: float = 60.0
@@ -249,6 +349,74 @@ class EventStreamConfig:
     batch_size: int = 100
     compression: Optional[Compression] = None
     serialization: Optional[Serialization] = None
+    ack_batch_size: int = 100
+    ack_interval_ms: int = 1000
+    consumer_mode: StreamConsumerMode = StreamConsumerMode.BATCH
+    max_in_flight: int = 0
+    envelope: StreamEnvelope = StreamEnvelope.FIELDS
+    pack_size: int = 0
+
+
+class ResponseStreamFormat(str, Enum):
+    """
+    Formats available to stream web responses of GET and POST events, item by item,
+    as they are yield from steps returning `Spawn[...]`.
+
+    :field NONE: response is not streamed, last yield item is returned in response body.
+    :field NDJSON: each item is sent as a json line, using `application/x-ndjson` content type.
+    :field SSE: each item is sent as a server-sent event `data:` message,
+        using `text/event-stream` content type.
+    """
+
+    NONE = "none"
+    NDJSON = "ndjson"
+    SSE = "sse"
+
+
+@dataobject
+@dataclass
+class EventCacheConfig:
+    """
+    Response cache configuration for GET events
+
+    :field ttl: float, default 0.0: seconds a cached response is valid. Default 0.0 disables cache.
+    :field max_entries: int, default 1000: max number of responses to keep in cache. Least recently
+        used responses are evicted when this number is exceeded.
+    :field auth_claims: list of str, default empty: claims from authorization payload (i.e. `sub`)
+        to be included in cache key, so responses are cached separately for each user or tenant.
+        If empty, for events with authorization methods other than Unsecured, cache key includes
+        `sub` claim, or the whole authorization payload when it has no `sub` claim.
+        Cache key always includes event name, payload and query arguments.
+    :field coalesce: bool, default False: when enabled, concurrent requests with the same cache key
+        share a single execution of the event, and its result is sent to all of them.
+        Can be used with or without caching responses (ttl=0.0).
+    """
+
+    ttl: float = 0.0
+    max_entries: int = 1000
+    auth_claims: List[str] = field(default_factory=list)
+    coalesce: bool = False
+
+
+@dataobject
+@dataclass
+class EventAdmissionConfig:
+    """
+    Admission control for GET and POST events, to shed load when event is saturated
+    instead of letting requests pile up until they time out.
+
+    :field max_concurrent: int, default 0: max number of requests executing concurrently.
+        Default 0 means no limit.
+    :field max_queued: int, default 0: max number of requests allowed to wait for execution
+        when `max_concurrent` requests are executing. Requests arriving when queue is full are
+        rejected immediately with Too Many Requests (429) status.
+    :field queue_timeout: float, default 10.0: max seconds a request can wait in queue.
+        Requests not admitted after this time are rejected with Service Unavailable (503) status.
+    """
+
+    max_concurrent: int = 0
+    max_queued: int = 0
+    queue_timeout: float = 10.0
 
 
 @dataobject
@@ -264,11 +432,20 @@ class EventSettings(Generic[EventPayloadType]):
         to set up timeout on stream processing.
     :field logging: EventLoggingConfig, configuration for logging for this particular event
     :field stream: EventStreamConfig, configuration for stream processing for this particular event
+    :field response_stream: ResponseStreamFormat, default `none`: for GET and POST events,
+        allows streaming every item yield by the event (i.e. steps returning `Spawn[...]`) to the client
+        as soon as it is available, instead of returning only the last item. When streaming,
+        `response_timeout` applies to the wait for each item, and `__postprocess__` is not invoked.
+    :field cache: EventCacheConfig, configuration to cache responses of GET events
+    :field admission: EventAdmissionConfig, concurrency limits for GET and POST events
     """
 
     response_timeout: float = 60.0
     logging: EventLoggingConfig = field(default_factory=EventLoggingConfig)
     stream: EventStreamConfig = field(default_factory=EventStreamConfig)
+    response_stream: ResponseStreamFormat = ResponseStreamFormat.NONE
+    cache: EventCacheConfig = field(default_factory=EventCacheConfig)
+    admission: EventAdmissionConfig = field(default_factory=EventAdmissionConfig)
     extras: Dict[str, Any] = field(default_factory=dict)
 
     def __call__(self, *, key: str = "_", datatype: Type[EventPayloadType]) -> EventPayloadType:
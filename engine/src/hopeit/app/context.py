@@ -17,6 +17,7 @@ from typing import (
     Mapping,
 )
 from abc import ABC, abstractmethod
+import dataclasses
 from pathlib import Path
 from datetime import datetime, timezone
 import re
@@ -35,7 +36,64 @@ from hopeit.app.config import (
 )
 
 
-__all__ = ["EventContext", "PostprocessHook", "PreprocessHook", "NoopMultiparReader"]
+__all__ = [
+    "EventContext",
+    "EventContextTemplate",
+    "PostprocessHook",
+    "PreprocessHook",
+    "NoopMultiparReader",
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class EventContextTemplate:
+    """
+    Static information required to create EventContext instances for a given event.
+
+    Computing this information involves merging env configuration and building the list
+    of track fields, which is invariant during app lifecycle. Engine components that
+    create contexts on every request or message can compute a template once using
+    `EventContextTemplate.create(...)` and use `EventContext.from_template(...)`.
+    Every context gets its own copy of `env`, so changes done during an event execution
+    are not visible to other executions.
+    """
+
+    app_key: str
+    plugin_key: str
+    app: AppDescriptor
+    env: Env
+    event_name: str
+    settings: EventSettings
+    event_info: EventDescriptor
+    track_fields: Tuple[str, ...]
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        app_config: AppConfig,
+        plugin_config: AppConfig,
+        event_name: str,
+        settings: EventSettings,
+    ) -> "EventContextTemplate":
+        base_event = event_name.split("$")[0]
+        event_info = plugin_config.events[base_event]
+        return cls(
+            app_key=app_config.app_key(),
+            plugin_key=plugin_config.app_key(),
+            app=app_config.app,
+            env={**plugin_config.env, **app_config.env},
+            event_name=event_name,
+            settings=settings,
+            event_info=event_info,
+            track_fields=(
+                "track.operation_id",
+                "track.client_app_key",
+                "track.client_event_name",
+                *app_config.engine.track_headers,
+                *(settings.logging.stream_fields if event_info.type == EventType.STREAM else []),
+            ),
+        )
 
 
 class EventContext:
@@ -63,24 +121,46 @@ class EventContext:
         track_ids: Dict[str, str],
         auth_info: Dict[str, Any],
     ):
-        self.app_key: str = app_config.app_key()
-        self.plugin_key: str = plugin_config.app_key()
-        self.app: AppDescriptor = app_config.app
-        self.env: Env = {**plugin_config.env, **app_config.env}
-        self.event_name = event_name
-        self.settings = settings
-        base_event = event_name.split("$")[0]
-        self.event_info: EventDescriptor = plugin_config.events[base_event]
+        template = EventContextTemplate.create(
+            app_config=app_config,
+            plugin_config=plugin_config,
+            event_name=event_name,
+            settings=settings,
+        )
+        self._setup(template, track_ids, auth_info)
+
+    @classmethod
+    def from_template(
+        cls,
+        template: EventContextTemplate,
+        *,
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+    ) -> "EventContext":
+        """
+        Creates an EventContext from a precomputed `EventContextTemplate`,
+        avoiding to recompute static event information on every request.
+        """
+        context = cls.__new__(cls)
+        context._setup(template, track_ids, auth_info)
+        return context
+
+    def _setup(
+        self,
+        template: EventContextTemplate,
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+    ) -> None:
+        self.app_key: str = template.app_key
+        self.plugin_key: str = template.plugin_key
+        self.app: AppDescriptor = template.app
+        self.env: Env = {**template.env}
+        self.event_name = template.event_name
+        self.settings = template.settings
+        self.event_info: EventDescriptor = template.event_info
         self.creation_ts: datetime = datetime.now(tz=timezone.utc)
         self.auth_info = auth_info
-        track_fields = [
-            "track.operation_id",
-            "track.client_app_key",
-            "track.client_event_name",
-            *app_config.engine.track_headers,
-            *(settings.logging.stream_fields if self.event_info.type == EventType.STREAM else []),
-        ]
-        self.track_ids = {k: track_ids[k] for k in track_fields if k in track_ids}
+        self.track_ids = {k: track_ids[k] for k in template.track_fields if k in track_ids}
         self.track_ids["event.app"] = self.app_key
         if self.plugin_key != self.app_key:
             self.track_ids["event.plugin"] = self.plugin_key
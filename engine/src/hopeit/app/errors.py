@@ -3,7 +3,7 @@ Special handled exceptions to return specific response status.
 All other exceptions will return 500 (Internal Server Error)
 """
 
-__all__ = ["BadRequest", "Unauthorized"]
+__all__ = ["BadRequest", "Unauthorized", "TooManyRequests", "ServiceUnavailable"]
 
 from hopeit.server import errors
 
@@ -22,3 +22,19 @@ class Unauthorized(BaseException):
     """
 
     ErrorInfo = errors.ErrorInfo  # pylint: disable=invalid-name
+
+
+class TooManyRequests(BaseException):
+    """
+    Exception that will return Too Many Requests (429) response in endpoint
+    """
+
+    ErrorInfo = errors.ErrorInfo  # pylint: disable=invalid-name
+
+
+class ServiceUnavailable(BaseException):
+    """
+    Exception that will return Service Unavailable (503) response in endpoint
+    """
+
+    ErrorInfo = errors.ErrorInfo  # pylint: disable=invalid-name
@@ -6,4 +6,5 @@ provides implementation for the following CLI commands:
     * **openapi** (hopeit_openapi): creation, diff and update openapi.json spec files
     * **server** (hopeit_server): tool for running a server instance
     * **job** (hopeit_job): execute a single event without starting a web server
+    * **compression** (hopeit_compression): train zstd dictionaries to compress stream payloads
 """
@@ -0,0 +1,57 @@
+"""
+CLI compression commands
+"""
+
+import base64
+
+import click
+
+from hopeit.app.config import Serialization
+from hopeit.server.compression import register_zstd_dictionary, train_zstd_dictionary
+
+
+@click.group()
+def compression():
+    pass
+
+
+@compression.command(name="train-dictionary")  # type: ignore
+@click.option(
+    "--samples-file",
+    required=True,
+    help="Path to file with one sample payload per line, as json serialized to streams.",
+)
+@click.option("--output-file", required=True, help="Path to dictionary file to be created.")
+@click.option(
+    "--dict-size",
+    default=16384,
+    show_default=True,
+    help="Max dictionary size in bytes.",
+)
+@click.option(
+    "--serialization",
+    type=click.Choice([Serialization.JSON_UTF8.value, Serialization.JSON_BASE64.value]),
+    default=Serialization.JSON_UTF8.value,
+    show_default=True,
+    help="Serialization used by streams where dictionary will be used.",
+)
+def train_dictionary(samples_file: str, output_file: str, dict_size: int, serialization: str):
+    """
+    Trains a zstd compression dictionary from sample payloads of a datatype.
+    Configure the created file in `streams.compression_dictionaries` server config setting.
+    """
+    with open(samples_file, "rb") as f:
+        samples = [line.strip() for line in f if line.strip()]
+    if serialization == Serialization.JSON_BASE64.value:
+        samples = [base64.b64encode(sample) for sample in samples]
+    try:
+        dict_data = train_zstd_dictionary(samples, dict_size)
+    except Exception as e:  # pylint: disable=broad-except
+        raise click.ClickException(f"Cannot train dictionary from {samples_file}: {e}") from e
+    with open(output_file, "wb") as f:
+        f.write(dict_data)
+    dict_id = register_zstd_dictionary(dict_data)
+    click.echo(
+        f"Dictionary created: file={output_file} dict_id={dict_id} "
+        f"size={len(dict_data)} samples={len(samples)}"
+    )
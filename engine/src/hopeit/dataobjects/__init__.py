@@ -18,13 +18,17 @@ Example:
         number: int
 """
 
+import copy
+import dataclasses
 import pickle
+import types
 import uuid
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Dict, Type, TypeVar, Optional, Union, Any
+from enum import Enum
+from typing import Callable, Dict, Type, TypeVar, Optional, Union, Any, get_args, get_origin
 
-from pydantic import RootModel, Field as field
+from pydantic import BaseModel, RootModel, Field as field
 from pydantic.dataclasses import dataclass
 from pydantic.fields import FieldInfo
 
@@ -195,26 +199,141 @@ def dataobject(
     return wrap(decorated_class)
 
 
+CopyStrategy = Callable[[Any], Any]
+
+_IMMUTABLE_TYPES = (
+    str,
+    int,
+    float,
+    bool,
+    bytes,
+    tuple,
+    frozenset,
+    Decimal,
+    datetime,
+    date,
+    time,
+    timedelta,
+    uuid.UUID,
+    Enum,
+    type(None),
+)
+
+# Copy strategy per payload type, resolved on first use by `copy_payload`
+_COPY_STRATEGIES: Dict[type, CopyStrategy] = {}
+
+
 def _binary_copy(payload: Any) -> Any:
     return pickle.loads(pickle.dumps(payload, protocol=4))
 
 
+def _no_copy(payload: Any) -> Any:
+    return payload
+
+
+def _model_copy(payload: BaseModel) -> BaseModel:
+    return payload.model_copy(deep=True)
+
+
+def _list_items_copy(payload: Any) -> Any:
+    if isinstance(payload, list):
+        return [copy_payload(item) for item in payload]
+    return copy_payload(payload)
+
+
+def _is_immutable_type(datatype: Any) -> bool:
+    """
+    Returns True if instances of datatype do not need to be copied: immutable builtin types,
+    frozen dataclasses and dataobjects flagged as `unsafe`
+    """
+    if not isinstance(datatype, type):
+        origin = get_origin(datatype)
+        if origin is Union or origin is types.UnionType:
+            return all(_is_immutable_type(arg) for arg in get_args(datatype))
+        return False
+    if issubclass(datatype, _IMMUTABLE_TYPES):
+        return True
+    dataclass_params = getattr(datatype, "__dataclass_params__", None)
+    if dataclass_params is not None and dataclass_params.frozen:
+        return True
+    data_object = getattr(datatype, "__data_object__", None)
+    return data_object is not None and data_object["unsafe"]
+
+
+def _field_copy_strategy(annotation: Any) -> Optional[CopyStrategy]:
+    """
+    Returns copy strategy for a dataclass field based on its type annotation,
+    or None in case the field value can be shared between copies.
+    """
+    if _is_immutable_type(annotation):
+        return None
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (list, set) and args and _is_immutable_type(args[0]):
+        return copy.copy
+    if origin is dict and len(args) == 2 and _is_immutable_type(args[1]):
+        return copy.copy
+    if origin is list and args and dataclasses.is_dataclass(args[0]):
+        return _list_items_copy
+    # Nested dataobjects, collections of mutable items or unknown types: resolved by value type
+    return copy_payload
+
+
+def _structural_copy_strategy(datatype: type) -> CopyStrategy:
+    """
+    Generates a copy function for a dataclass that copies attributes one by one,
+    sharing values of immutable fields and delegating nested values to `copy_payload`
+    """
+    field_annotations = {
+        name: info.annotation for name, info in getattr(datatype, "__pydantic_fields__", {}).items()
+    }
+    field_strategies = {
+        dc_field.name: _field_copy_strategy(field_annotations.get(dc_field.name, Any))
+        for dc_field in dataclasses.fields(datatype)
+    }
+
+    def _structural_copy(payload: Any) -> Any:
+        state = {}
+        for name, value in payload.__dict__.items():
+            strategy = field_strategies.get(name, copy_payload)
+            state[name] = value if strategy is None else strategy(value)
+        new: Any = object.__new__(datatype)
+        new.__dict__.update(state)
+        return new
+
+    return _structural_copy
+
+
+def _copy_strategy(datatype: type) -> CopyStrategy:
+    """
+    Decides how instances of datatype should be copied to prevent steps mutating payloads
+    """
+    if _is_immutable_type(datatype):
+        return _no_copy
+    if issubclass(datatype, BaseModel):
+        return _model_copy
+    if dataclasses.is_dataclass(datatype) and not any(
+        "__slots__" in vars(base) for base in datatype.__mro__
+    ):
+        return _structural_copy_strategy(datatype)
+    # Builtin collections and other types
+    return _binary_copy
+
+
 def copy_payload(original: Optional[EventPayload]) -> Optional[EventPayload]:
     """
     Creates a copy of the original DataObject in case it is mutable.
-    Returns original object in case it is a frozen dataclass
+    Returns original object in case it is a frozen dataclass or an `unsafe` dataobject.
+
+    Copy strategy is decided once per payload type and cached.
     """
     if original is None:
         return None
-    if isinstance(original, (str, int, float, bool, tuple, Decimal)):  # immutable supported types
-        return original
-    if isinstance(original, (dict, set, list)):
-        return _binary_copy(original)
-    if hasattr(original, "__dataclass_params__") and original.__dataclass_params__.frozen:  # type: ignore
-        return original
-    if hasattr(original, "__data_object__") and original.__data_object__["unsafe"]:
-        return original
-    return _binary_copy(original)
+    datatype = type(original)
+    strategy = _COPY_STRATEGIES.get(datatype)
+    if strategy is None:
+        strategy = _copy_strategy(datatype)
+        _COPY_STRATEGIES[datatype] = strategy
+    return strategy(original)
 
 
 def fields(
@@ -2,14 +2,30 @@
 Payload tools to serialize and deserialze event payloads and responses, including dataobjects
 """
 
-from typing import Type, Generic, Union, Dict
+from typing import Any, Type, Generic, Union, Dict
 
-from pydantic import RootModel, ValidationError
+from pydantic import TypeAdapter, ValidationError
 
 from hopeit.dataobjects import EventPayloadType
 
 _ATOMIC_TYPES = (str, int, float, bool)
 
+# Process-wide registry of pydantic TypeAdapters, shared by all serialization paths
+_TYPE_ADAPTERS: Dict[Any, TypeAdapter] = {}
+
+
+def type_adapter(datatype: Any) -> TypeAdapter:
+    """
+    Returns a cached pydantic TypeAdapter for the given datatype,
+    creating it on first use. Accepts dataobjects, collections (i.e. `List[T]`)
+    and atomic wrappers (i.e. `Dict[str, int]`).
+    """
+    adapter = _TYPE_ADAPTERS.get(datatype)
+    if adapter is None:
+        adapter = TypeAdapter(datatype)
+        _TYPE_ADAPTERS[datatype] = adapter
+    return adapter
+
 
 class Payload(Generic[EventPayloadType]):
     """
@@ -29,17 +45,13 @@ class Payload(Generic[EventPayloadType]):
         :param json_str: str containing valid json, or string representation for atomic values
         :param datatype: supported types defined in EventPayload
         :param key: key to extract atomic types from
-        :param kwargs: Additional arguments to pass to the Pydantic `model_validate_json` method.
+        :param kwargs: Additional arguments to pass to the Pydantic `validate_json` method.
         :return: instance of datatype
         """
         if datatype in _ATOMIC_TYPES:
-            return (
-                RootModel[Dict[str, datatype]]  # type: ignore[valid-type]
-                .model_validate_json(json_str, **kwargs)
-                .root[key]
-            )
+            return type_adapter(Dict[str, datatype]).validate_json(json_str, **kwargs)[key]  # type: ignore[valid-type]
         try:
-            return RootModel[datatype].model_validate_json(json_str, **kwargs).root  # type: ignore[valid-type]
+            return type_adapter(datatype).validate_json(json_str, **kwargs)
         except ValidationError:
             raise
         except Exception as e:
@@ -60,15 +72,13 @@ class Payload(Generic[EventPayloadType]):
         :param data: dictionary containing fields expected on datatype
         :param datatype: supported types defined in EventPayload
         :param key: key to extract atomic types from
-        :param kwargs: Additional arguments to pass to the Pydantic `model_dump_json` method.
+        :param kwargs: Additional arguments to pass to the Pydantic `validate_python` method.
         :return: instance of datatype
         """
         if datatype in _ATOMIC_TYPES:
-            return (
-                RootModel[datatype].model_validate(data.get(key), **kwargs).root  # type: ignore[valid-type, union-attr]
-            )
+            return type_adapter(datatype).validate_python(data.get(key), **kwargs)  # type: ignore[union-attr]
         try:
-            return RootModel[datatype].model_validate(data, **kwargs).root  # type: ignore[valid-type]
+            return type_adapter(datatype).validate_python(data, **kwargs)
         except ValidationError:
             raise
         except Exception as e:
@@ -83,14 +93,28 @@ class Payload(Generic[EventPayloadType]):
 
         :param payload: EventPayload, instance of supported object type
         :param key: key name used in generated json when serializing atomic values
-        :param kwargs: Additional arguments to pass to the Pydantic `model_dump_json` method.
+        :param kwargs: Additional arguments to pass to the Pydantic `dump_json` method.
         :return: str containing json representation of data. In case of simple datatypes,
             a json str of key:value form will be generated using key parameter if it's not None.
         """
+        return Payload.to_json_bytes(payload, key, **kwargs).decode()
+
+    @staticmethod
+    def to_json_bytes(payload: EventPayloadType, key: str = "value", **kwargs) -> bytes:
+        """
+        Converts event payload to utf-8 encoded json bytes, avoiding str encoding step
+        when data is to be sent over the network or written to binary storage.
+
+        :param payload: EventPayload, instance of supported object type
+        :param key: key name used in generated json when serializing atomic values
+        :param kwargs: Additional arguments to pass to the Pydantic `dump_json` method.
+        :return: bytes containing json representation of data. In case of simple datatypes,
+            a json of key:value form will be generated using key parameter if it's not None.
+        """
         if isinstance(payload, _ATOMIC_TYPES):  # immutable supported types
-            return RootModel({key: payload}).model_dump_json(**kwargs)
+            return type_adapter(dict).dump_json({key: payload}, **kwargs)
         try:
-            return RootModel(payload).model_dump_json(**kwargs)
+            return type_adapter(type(payload)).dump_json(payload, **kwargs)
         except Exception as e:
             if not hasattr(payload, "__data_object__"):
                 raise TypeError(f"{type(payload)} must be annotated with @dataobject") from e
@@ -103,7 +127,7 @@ class Payload(Generic[EventPayloadType]):
 
         :param payload: EventPayload, instance of supported object type
         :param key: key name used in generated json when serializing atomic values
-        :param kwargs: Additional arguments to pass to the Pydantic `model_dump` method.
+        :param kwargs: Additional arguments to pass to the Pydantic `dump_python` method.
             i.e. use `mode='json'` to generate json compatible output instead of python objects.
         :return: dict or list containing mapped representation of data. In case of simple datatypes,
             a key:value form will be generated using key parameter. All objects mappable to dict will
@@ -112,7 +136,7 @@ class Payload(Generic[EventPayloadType]):
         if isinstance(payload, _ATOMIC_TYPES):  # immutable supported types
             return {key: payload}
         try:
-            serialized = RootModel(payload).model_dump(**kwargs)  # pylint: disable=assignment-from-no-return
+            serialized = type_adapter(type(payload)).dump_python(payload, **kwargs)
             if not isinstance(serialized, (dict, list, set)):
                 raise TypeError(f"Cannot serialize {type(payload)} as `dict`, `list` or `set`")
             return serialized
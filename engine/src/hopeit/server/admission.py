@@ -0,0 +1,65 @@
+"""
+Admission control: limits concurrent executions of an event, with a bounded wait queue
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from hopeit.app.config import EventAdmissionConfig
+from hopeit.app.errors import ServiceUnavailable, TooManyRequests
+
+__all__ = ["AdmissionControl"]
+
+
+class AdmissionControl:
+    """
+    Admits up to `max_concurrent` executions of an event. Up to `max_queued` additional
+    requests wait for a free slot during `queue_timeout` seconds, in arrival order.
+
+    Requests arriving with a full queue are rejected raising `TooManyRequests`,
+    and requests that could not be admitted before `queue_timeout` raise `ServiceUnavailable`.
+    """
+
+    def __init__(self, config: EventAdmissionConfig):
+        self.max_concurrent = config.max_concurrent
+        self.max_queued = config.max_queued
+        self.queue_timeout = config.queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(config.max_concurrent)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Waits until request can be executed, or raises in case it is rejected.
+        Execution slot is released on exit.
+        """
+        if self._semaphore.locked() or self.queued > 0:
+            await self._wait_in_queue()
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    async def _wait_in_queue(self) -> None:
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise TooManyRequests(
+                f"Max concurrent requests exceeded: active={self.active} queued={self.queued}"
+            )
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError as e:
+            self.rejected += 1
+            raise ServiceUnavailable(
+                f"Request not admitted after waiting seconds={self.queue_timeout}"
+            ) from e
+        finally:
+            self.queued -= 1
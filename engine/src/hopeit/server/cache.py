@@ -0,0 +1,180 @@
+"""
+In-memory response cache for GET events, with TTL expiration and LRU eviction,
+and coalescing of concurrent identical requests
+"""
+
+import asyncio
+import dataclasses
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from hopeit.app.config import EventCacheConfig
+from hopeit.app.context import EventContext
+from hopeit.dataobjects import EventPayload, copy_payload
+from hopeit.server.logger import format_extra_values
+
+__all__ = ["CachedResponse", "ResponseCache", "InFlightRequests", "request_key"]
+
+
+def request_key(
+    context: EventContext,
+    query_args: Dict[str, Any],
+    payload: Optional[Any],
+    auth_claims: Sequence[str],
+    secured: bool = False,
+) -> Hashable:
+    """
+    Returns a key identifying equivalent requests to an event: same payload, query arguments
+    and values for specified claims in authorization payload.
+    If no claims are specified for a `secured` event, the key includes the `sub` claim,
+    or the whole authorization payload if there is no `sub` claim, so requests of different
+    users are never considered equivalent.
+    """
+    claims: Tuple[str, ...] = ()
+    if auth_claims or secured:
+        auth_payload = context.auth_info.get("payload")
+        if isinstance(auth_payload, dict) and auth_claims:
+            claims = tuple(str(auth_payload.get(claim)) for claim in auth_claims)
+        elif isinstance(auth_payload, dict) and "sub" in auth_payload:
+            claims = (str(auth_payload["sub"]),)
+        else:
+            claims = (str(auth_payload),)
+    return (
+        str(payload),
+        tuple(sorted((k, str(v)) for k, v in query_args.items())),
+        claims,
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedResponse:
+    """
+    Serialized response stored in cache
+    """
+
+    body: bytes
+    content_type: str
+    headers: Dict[str, str]
+    status: int
+
+
+class ResponseCache:
+    """
+    Keeps serialized responses of a single event, keyed by payload, query arguments
+    and configured authorization claims, or user identity for `secured` events
+    if no claims are configured. See `request_key`.
+
+    Expired entries are dropped when accessed, and least recently used entries are evicted
+    when `max_entries` is exceeded.
+    """
+
+    def __init__(self, config: EventCacheConfig, *, secured: bool = False):
+        self.ttl = config.ttl
+        self.max_entries = config.max_entries
+        self.auth_claims = tuple(config.auth_claims)
+        self.secured = secured
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, CachedResponse]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self, context: EventContext, query_args: Dict[str, Any], payload: Optional[Any]
+    ) -> Hashable:
+        """
+        Returns cache key for a request
+        """
+        return request_key(context, query_args, payload, self.auth_claims, self.secured)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """
+        Returns cached response for key if present and not expired, and updates hit/miss counters
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expire_ts, response = entry
+            if expire_ts > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, response: CachedResponse) -> None:
+        """
+        Stores response in cache, evicting least recently used entries if needed
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def metrics(self, hit: bool) -> Dict[str, str]:
+        """
+        Return cache metrics as a dictionary that can be used in logging
+        """
+        return {
+            "extra": format_extra_values(
+                {
+                    "cache": "hit" if hit else "miss",
+                    "cache_hits": self.hits,
+                    "cache_misses": self.misses,
+                },
+                prefix="metrics.",
+            )
+        }
+
+
+class InFlightRequests:
+    """
+    Single-flight execution of concurrent identical requests to an event.
+
+    The first request for a key starts the execution in a separate task, and requests arriving
+    with the same key while it is running wait for the same result instead of executing the event
+    again. Every caller receives its own copy of the result, and exceptions are raised to all of
+    them. Cancelling a caller (i.e. client disconnected) does not cancel the shared execution.
+    Requests of different users to `secured` events are not coalesced, see `request_key`.
+    """
+
+    def __init__(self, config: EventCacheConfig, *, secured: bool = False):
+        self.auth_claims = tuple(config.auth_claims)
+        self.secured = secured
+        self.coalesced = 0
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def key(
+        self, context: EventContext, query_args: Dict[str, Any], payload: Optional[Any]
+    ) -> Hashable:
+        """
+        Returns coalescing key for a request
+        """
+        return request_key(context, query_args, payload, self.auth_claims, self.secured)
+
+    async def execute(
+        self, key: Hashable, func: Callable[[], Awaitable[Optional[EventPayload]]]
+    ) -> Optional[EventPayload]:
+        """
+        Executes `func` if there is no execution in progress for key, otherwise waits for
+        the result of the execution in progress
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return copy_payload(await asyncio.shield(task))
+
+    def _done(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # Marks exception as retrieved in case all callers were cancelled
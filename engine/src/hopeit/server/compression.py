@@ -3,17 +3,34 @@ Provides generic `compress` and `decompress` methods for payloads
 """
 
 from functools import partial
+import threading
+import time
 import zlib
 import gzip
 import bz2
 import lzma
-from typing import Callable, Tuple
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 
 import lz4.frame  # type: ignore
 
+try:
+    import zstandard as zstd
+except ImportError:  # pragma: no cover
+    zstd = None  # type: ignore  # zstd is optional, installed with `hopeit.engine[zstd]`
+
 from hopeit.app.config import Compression
 
-__all__ = ["compress", "decompress"]
+__all__ = [
+    "compress",
+    "decompress",
+    "supports_dictionary",
+    "register_zstd_dictionary",
+    "train_zstd_dictionary",
+    "compression_field",
+    "parse_compression_field",
+    "compress_timed",
+    "AutoCompression",
+]
 
 
 def _compress_none(level: int, data: bytes) -> bytes:
@@ -64,6 +81,67 @@ def _decompress_lzma(data: bytes):
     return lzma.decompress(data)
 
 
+_zstd_local = threading.local()
+
+_ZSTD_DICTIONARIES: Dict[int, Any] = {}
+
+
+def _zstd_required() -> None:
+    if zstd is None:
+        raise ImportError(
+            "zstd compression requires `zstandard` package: pip install hopeit.engine[zstd]"
+        )
+
+
+def _zstd_dictionary(dict_id: int) -> Any:
+    dictionary = _ZSTD_DICTIONARIES.get(dict_id)
+    if dictionary is None:
+        raise ValueError(
+            f"Unknown zstd dictionary dict_id={dict_id}: dictionaries used to compress payloads "
+            "must be registered using `register_zstd_dictionary`, "
+            "i.e. configured in `StreamsConfig.compression_dictionaries`"
+        )
+    return dictionary
+
+
+def _zstd_compressor(level: int, dict_id: int) -> Any:
+    """
+    Returns zstd compressor for level and dictionary, cached per thread
+    since compressor objects cannot be used concurrently
+    """
+    cache = getattr(_zstd_local, "compressors", None)
+    if cache is None:
+        cache = _zstd_local.compressors = {}
+    compressor = cache.get((level, dict_id))
+    if compressor is None:
+        _zstd_required()
+        compressor = cache[(level, dict_id)] = zstd.ZstdCompressor(
+            level=level, dict_data=_zstd_dictionary(dict_id) if dict_id else None
+        )
+    return compressor
+
+
+def _zstd_decompressor(dict_id: int) -> Any:
+    cache = getattr(_zstd_local, "decompressors", None)
+    if cache is None:
+        cache = _zstd_local.decompressors = {}
+    decompressor = cache.get(dict_id)
+    if decompressor is None:
+        _zstd_required()
+        decompressor = cache[dict_id] = zstd.ZstdDecompressor(
+            dict_data=_zstd_dictionary(dict_id) if dict_id else None
+        )
+    return decompressor
+
+
+def _compress_zstd(level: int, data: bytes, dict_id: int = 0) -> bytes:
+    return _zstd_compressor(level, dict_id).compress(data)
+
+
+def _decompress_zstd(data: bytes, dict_id: int = 0) -> bytes:
+    return _zstd_decompressor(dict_id).decompress(data)
+
+
 _ALGOS = {
     "none": (_compress_none, 0, _decompress_none),
     "lz4": (_compress_lz4, 3, _decompress_lz4),
@@ -71,27 +149,229 @@ _ALGOS = {
     "gzip": (_compress_gzip, 9, _decompress_gzip),
     "bz2": (_compress_bz2, 9, _decompress_bz2),
     "lzma": (_compress_lzma, 0, _decompress_lzma),
+    "zstd": (_compress_zstd, 3, _decompress_zstd),
 }
 
 
+def _level(compression: Compression) -> int:
+    info = compression.value.split(":")
+    return _ALGOS[info[0]][1] if len(info) <= 1 else int(info[1])  # type: ignore
+
+
 def _compressors(
     compression: Compression,
 ) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
-    info = compression.value.split(":")
-    algo = info[0]
-    comp, default_level, decomp = _ALGOS[algo]
-    level = default_level if len(info) <= 1 else int(info[1])
-    return partial(comp, level), decomp  # type: ignore
+    comp, _, decomp = _ALGOS[compression.value.split(":")[0]]
+    return partial(comp, _level(compression)), decomp  # type: ignore
+
+
+# `auto` is not a compression method: it is resolved to one by `AutoCompression`
+_METHODS: List[Compression] = [c for c in Compression if c != Compression.AUTO]
+
+_COMPRESS = {c: _compressors(c)[0] for c in _METHODS}
+
+_DECOMPRESS = {c: _compressors(c)[1] for c in _METHODS}
 
+_LEVELS = {c: _level(c) for c in _METHODS}
 
-_COMPRESS = {c: _compressors(c)[0] for c in Compression}
+_DICTIONARY_SUPPORT = frozenset(c for c in Compression if c.value.split(":")[0] == "zstd")
 
-_DECOMPRESS = {c: _compressors(c)[1] for c in Compression}
+_COMPRESSION_FIELDS = {c.value: (c, 0) for c in _METHODS}
 
 
-def compress(data: bytes, compression: Compression) -> bytes:
+def supports_dictionary(compression: Compression) -> bool:
+    return compression in _DICTIONARY_SUPPORT
+
+
+def _check_method(compression: Compression) -> None:
+    if compression == Compression.AUTO:
+        raise ValueError(
+            "`auto` is not a compression method: it is only supported for stream payloads, "
+            "where it is resolved to a method per datatype. See `PayloadCodec.encode`"
+        )
+
+
+def _check_dictionary_support(compression: Compression) -> None:
+    if compression not in _DICTIONARY_SUPPORT:
+        raise ValueError(f"Dictionary not supported by compression={compression.value}")
+
+
+def compress(data: bytes, compression: Compression, dict_id: int = 0) -> bytes:
+    """
+    Compresses data using the specified algorithm and level.
+    `dict_id`, if not 0, refers to a zstd dictionary registered using `register_zstd_dictionary`.
+    Raises ValueError for `Compression.AUTO`, which is not a compression method,
+    or if `dict_id` is not registered or not supported by `compression`.
+    """
+    _check_method(compression)
+    if dict_id:
+        _check_dictionary_support(compression)
+        return _compress_zstd(_LEVELS[compression], data, dict_id)
     return _COMPRESS[compression](data)
 
 
-def decompress(data: bytes, compression: Compression) -> bytes:
+def decompress(data: bytes, compression: Compression, dict_id: int = 0) -> bytes:
+    """
+    Decompresses data using the specified algorithm. `dict_id`, if not 0, refers to
+    the registered zstd dictionary used to compress data.
+    Raises ValueError for `Compression.AUTO`, which is not a compression method,
+    or if `dict_id` is not registered or not supported by `compression`.
+    """
+    _check_method(compression)
+    if dict_id:
+        _check_dictionary_support(compression)
+        return _decompress_zstd(data, dict_id)
     return _DECOMPRESS[compression](data)
+
+
+def train_zstd_dictionary(samples: Sequence[bytes], dict_size: int) -> bytes:
+    """
+    Trains a zstd dictionary from a list of sample payloads, as they are sent to compression.
+    Returns dictionary contents, including its id, to be saved and registered
+    using `register_zstd_dictionary`
+    """
+    _zstd_required()
+    return zstd.train_dictionary(dict_size, list(samples)).as_bytes()
+
+
+def register_zstd_dictionary(dict_data: bytes) -> int:
+    """
+    Registers a trained zstd dictionary to be used with `compress` and `decompress`.
+    Returns dictionary id, as assigned on training
+    """
+    _zstd_required()
+    dictionary = zstd.ZstdCompressionDict(dict_data)
+    dict_id = dictionary.dict_id()
+    if dict_id == 0:
+        raise ValueError("Invalid zstd dictionary: only trained dictionaries are supported")
+    _ZSTD_DICTIONARIES[dict_id] = dictionary
+    return dict_id
+
+
+def compression_field(compression: Compression, dict_id: int = 0) -> str:
+    """
+    Returns string identifying compression method and dictionary used,
+    as recorded in messages: `algorithm[:level][@dict_id]`
+    """
+    return f"{compression.value}@{dict_id}" if dict_id else compression.value
+
+
+def parse_compression_field(value: str) -> Tuple[Compression, int]:
+    """
+    Parses string generated by `compression_field` into compression method and dictionary id,
+    where dictionary id is 0 if no dictionary was used.
+    """
+    parsed = _COMPRESSION_FIELDS.get(value)
+    if parsed is not None:
+        return parsed
+    compression, _, dict_id = value.partition("@")
+    return Compression(compression), int(dict_id or 0)
+
+
+def compress_timed(data: bytes, compression: Compression, dict_id: int = 0) -> Tuple[bytes, float]:
+    """
+    Compresses data as `compress`, returning compressed data and time spent in seconds
+    """
+    start = time.perf_counter()
+    result = compress(data, compression, dict_id)
+    return result, time.perf_counter() - start
+
+
+class _CodecStats:
+    """
+    Moving averages of compression ratio and cost in seconds per byte of a compression method
+    """
+
+    __slots__ = ("ratio", "cost", "count")
+
+    def __init__(self):
+        self.ratio = 1.0
+        self.cost = 0.0
+        self.count = 0
+
+
+class AutoCompression:
+    """
+    Selects compression method for payloads of each datatype.
+
+    Payloads smaller than `min_size` are not compressed. For larger payloads of each datatype,
+    every method in `codecs` is used for `samples` payloads, measuring compression ratio and
+    cost. Then the method with the lowest ratio is selected, preferring the fastest one among
+    methods with ratio within `ratio_tolerance` of the lowest. If no method gets a ratio
+    below `max_ratio`, payloads are not compressed. Every `resample_every` payloads,
+    methods are sampled again, so selection adapts to changes in payloads.
+
+    Callers compress payloads using the method returned by `select` and report results
+    using `observe`.
+    """
+
+    def __init__(
+        self,
+        min_size: int,
+        codecs: List[Compression],
+        *,
+        samples: int = 10,
+        resample_every: int = 1000,
+        max_ratio: float = 0.9,
+        ratio_tolerance: float = 0.05,
+        smoothing: float = 0.2,
+    ):
+        assert Compression.AUTO not in codecs, "`auto` is not a valid codec to select"
+        self.min_size = min_size
+        self.codecs = codecs
+        self.samples = samples
+        self.resample_every = resample_every
+        self.max_ratio = max_ratio
+        self.ratio_tolerance = ratio_tolerance
+        self.smoothing = smoothing
+        self.selected: Dict[str, Compression] = {}
+        self._stats: Dict[str, Dict[Compression, _CodecStats]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def select(self, datatype_name: str, size: int) -> Compression:
+        """
+        Returns compression method to use for a payload of `datatype_name` of `size` bytes
+        """
+        if size < self.min_size or not self.codecs:
+            return Compression.NONE
+        count = self._counts.get(datatype_name, 0) + 1
+        self._counts[datatype_name] = count
+        selected = self.selected.get(datatype_name)
+        if selected is not None and count % self.resample_every:
+            return selected
+        stats = self._stats.get(datatype_name)
+        if stats is None:
+            stats = self._stats[datatype_name] = {c: _CodecStats() for c in self.codecs}
+        return min(self.codecs, key=lambda c: stats[c].count)  # type: ignore
+
+    def observe(
+        self,
+        datatype_name: str,
+        compression: Compression,
+        size: int,
+        compressed_size: int,
+        seconds: float,
+    ) -> None:
+        """
+        Records compression ratio and time spent compressing a payload of `datatype_name`
+        using the method returned by `select`
+        """
+        codec_stats = self._stats.get(datatype_name, {}).get(compression)
+        if codec_stats is None or size == 0:
+            return
+        alpha = 1.0 if codec_stats.count == 0 else self.smoothing
+        codec_stats.ratio += alpha * (compressed_size / size - codec_stats.ratio)
+        codec_stats.cost += alpha * (seconds / size - codec_stats.cost)
+        codec_stats.count += 1
+        stats = self._stats[datatype_name]
+        if all(s.count >= self.samples for s in stats.values()):
+            self.selected[datatype_name] = self._best(stats)
+
+    def _best(self, stats: Dict[Compression, _CodecStats]) -> Compression:
+        best_ratio = min(s.ratio for s in stats.values())
+        if best_ratio > self.max_ratio:
+            return Compression.NONE
+        return min(
+            (c for c, s in stats.items() if s.ratio <= best_ratio + self.ratio_tolerance),
+            key=lambda c: stats[c].cost,
+        )
@@ -3,7 +3,7 @@ Server configuration utility
 """
 
 from enum import Enum
-from typing import TypeVar, List, Optional
+from typing import Dict, TypeVar, List, Optional
 import re
 import os
 
@@ -14,10 +14,12 @@ from hopeit.server.version import ENGINE_VERSION
 
 
 __all__ = [
+    "OffloadExecutor",
     "StreamsConfig",
     "LoggingConfig",
     "AuthType",
     "AuthConfig",
+    "MetricsConfig",
     "ServerConfig",
     "parse_server_config_json",
     "replace_env_vars",
@@ -29,6 +31,20 @@ DEFAULT_STR = "<<DEFAULT>>"
 ConfigType = TypeVar("ConfigType")  # pylint: disable=invalid-name
 
 
+class OffloadExecutor(str, Enum):
+    """
+    Type of executor used to offload payload compression and deserialization
+    out of the event loop.
+
+    :field THREAD: thread pool, offloads compression, decompression and deserialization
+    :field PROCESS: process pool, offloads only compression and decompression,
+        since deserialized payloads would need to be pickled back to the main process
+    """
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+
 @dataobject
 @dataclass
 class StreamsConfig:
@@ -46,6 +62,29 @@ class StreamsConfig:
         Default is 60.0 seconds.
     :field num_failures_open_circuit_breaker: int: Number of failures before opening the circuit breaker.
         Default is 1.
+    :field offload_threshold_bytes: int: Size in bytes of encoded payloads from which compression
+        and deserialization run in an executor instead of the event loop.
+        Default is 0, which disables offloading.
+    :field offload_executor: OffloadExecutor: Type of executor used to offload payloads above
+        `offload_threshold_bytes`. Default is "thread".
+    :field offload_max_workers: Optional[int]: Max number of workers of the offload executor.
+        Default is None, to use Python defaults for the executor type.
+    :field compression_dictionaries: Dict[str, str]: Trained zstd dictionaries used to compress
+        stream payloads, as a mapping of datatype full qualified name to dictionary file path.
+        Dictionaries are created using `hopeit_compression train-dictionary` command
+        and are used for datatypes written with a `zstd` compression option. Apps reading
+        those payloads must be configured with the same dictionaries.
+    :field auto_compression_min_bytes: int: Payloads written to streams using `auto` compression
+        are not compressed when their serialized size is smaller than this value. Default is 512.
+    :field auto_compression_codecs: List[str]: Compression methods tried on payloads written using
+        `auto` compression. For each datatype, the method with best compression ratio is selected,
+        preferring faster methods with similar ratios, and no compression is used if none
+        of them reduces size significantly. `auto` is not allowed. Default is ["lz4", "zip"].
+    :field partition_lease_ms: int: Time in milliseconds a partition of a partitioned stream
+        remains assigned to a consumer without being renewed. Assignments are renewed every
+        third of this time while reading, so it should be longer than the time needed to process
+        a batch of messages. It is also the max time partitions of a stopped consumer wait to be
+        assigned to others. Default is 30000.
 
     Note:
         hopeit.engine provides `hopeit.redis_streams.RedisStreamManager` as the default plugin for stream management.
@@ -57,14 +96,42 @@ class StreamsConfig:
     initial_backoff_seconds: float = 1.0
     max_backoff_seconds: float = 60.0
     num_failures_open_circuit_breaker: int = 1
+    offload_threshold_bytes: int = 0
+    offload_executor: OffloadExecutor = OffloadExecutor.THREAD
+    offload_max_workers: Optional[int] = None
+    compression_dictionaries: Dict[str, str] = field(default_factory=dict)
+    auto_compression_min_bytes: int = 512
+    auto_compression_codecs: List[str] = field(default_factory=lambda: ["lz4", "zip"])
+    partition_lease_ms: int = 30000
+
+    def __post_init__(self):
+        if "auto" in self.auto_compression_codecs:
+            raise ValueError("auto_compression_codecs: `auto` is not a compression method", self)
 
 
 @dataobject
 @dataclass
 class LoggingConfig:
+    """
+    Server logging configuration
+
+    :field log_level: str, default "INFO": python logging level name
+    :field log_path: str, default "logs/": folder where log files are created
+    :field console_only: bool, default False: log only to console, no log files are created
+    :field async_writer: bool, default False: when enabled, log records are enqueued and written
+        in batches by a background thread, so slow disk writes do not block the event loop
+    :field async_buffer_size: int, default 10000: max number of log records waiting to be written
+        when `async_writer` is enabled. Records are dropped and counted when buffer is full
+    :field async_batch_size: int, default 100: max number of log records written in a batch
+        before flushing log files when `async_writer` is enabled
+    """
+
     log_level: str = "INFO"
     log_path: str = "logs/"
     console_only: bool = False
+    async_writer: bool = False
+    async_buffer_size: int = 10000
+    async_batch_size: int = 100
 
 
 class AuthType(str, Enum):
@@ -112,6 +179,19 @@ class APIConfig:
     docs_path: Optional[str] = None
 
 
+@dataobject
+@dataclass
+class MetricsConfig:
+    """
+    Config for in-process metrics endpoint
+
+    :field endpoint: optional str, if specified, latency histograms and event counters
+        are exposed in Prometheus text format at this route, i.e. "/metrics"
+    """
+
+    endpoint: Optional[str] = None
+
+
 @dataobject
 @dataclass
 class ServerConfig:
@@ -123,6 +203,7 @@ class ServerConfig:
     logging: LoggingConfig = field(default_factory=LoggingConfig)
     auth: AuthConfig = field(default_factory=AuthConfig.no_auth)
     api: APIConfig = field(default_factory=APIConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
     engine_version: str = field(default=ENGINE_VERSION)
 
     def __post_init__(self):
@@ -6,8 +6,20 @@ import asyncio
 import random
 import uuid
 from asyncio import CancelledError
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timezone
-from typing import Awaitable, Optional, Dict, List, Union, Tuple, Any
+from typing import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Optional,
+    Dict,
+    List,
+    Set,
+    Union,
+    Tuple,
+    Any,
+)
 
 from hopeit.server.imports import find_datobject_type, find_event_handler
 from hopeit.server.steps import (
@@ -23,23 +35,30 @@ from hopeit.app.config import (
     EventType,
     ReadStreamDescriptor,
     EventDescriptor,
+    StreamConsumerMode,
     StreamQueue,
     StreamQueueStrategy,
 )
 from hopeit.app.context import EventContext, PostprocessHook, PreprocessHook
 from hopeit.app.client import register_app_connections, stop_app_connections
+from hopeit.app.errors import ServiceUnavailable, TooManyRequests
 from hopeit.dataobjects import DataObject, EventPayload
 from hopeit.server.config import ServerConfig
 from hopeit.server.events import EventHandler, get_event_settings, get_runtime_settings
 from hopeit.streams import (
+    StreamAckAggregator,
     StreamCircuitBreaker,
+    StreamPartitions,
+    partition_stream_name,
     stream_auth_info,
+    stream_partition,
     StreamEvent,
     StreamOSError,
     StreamManager,
 )
 from hopeit.server.logger import engine_logger, extra_logger, combined
-from hopeit.server.metrics import metrics, stream_metrics, StreamStats
+from hopeit.server.metrics import admission_metrics, metrics, stream_metrics, StreamStats
+from hopeit.server.admission import AdmissionControl
 
 __all__ = ["AppEngine", "Server"]
 
@@ -84,6 +103,11 @@ class AppEngine:
             for event_name, event_info in self.effective_events.items()
             if event_info.type in (EventType.STREAM, EventType.SERVICE)
         }
+        self.admission_control: Dict[str, AdmissionControl] = {}
+        for event_name, event_info in self.effective_events.items():
+            admission = get_event_settings(self.settings, event_name).admission
+            if event_info.type in (EventType.GET, EventType.POST) and admission.max_concurrent > 0:
+                self.admission_control[event_name] = AdmissionControl(admission)
         logger.init_app(app_config, plugins)
 
     async def start(self):
@@ -106,6 +130,13 @@ class AppEngine:
         if streams_present and self.streams_enabled:
             stream_config = self.app_config.server.streams
             mgr = StreamManager.create(stream_config)
+            mgr.set_expected_consumers(
+                sum(
+                    len(event_info.read_stream.queues) * max(1, event_info.read_stream.partitions)
+                    for event_info in self.effective_events.values()
+                    if event_info.type == EventType.STREAM and event_info.read_stream is not None
+                )
+            )
             self.stream_manager = StreamCircuitBreaker(
                 stream_manager=await mgr.connect(stream_config),
                 initial_backoff_seconds=stream_config.initial_backoff_seconds,
@@ -147,7 +178,21 @@ class AppEngine:
         :param payload: EventPayload, payload to send to event handler
         :return: EventPayload, result from executing the event
         :raise: TimeoutException in case configured timeout is exceeded before getting the result
+        :raise: TooManyRequests or ServiceUnavailable in case event admission control is configured
+            and request is rejected
         """
+        admission = self.admission_control.get(context.event_name)
+        if admission is None:
+            return await self._execute_with_timeout(context, query_args, payload)
+        async with self._admit(context, admission):
+            return await self._execute_with_timeout(context, query_args, payload)
+
+    async def _execute_with_timeout(
+        self,
+        context: EventContext,
+        query_args: Optional[dict],
+        payload: Optional[EventPayload],
+    ) -> Optional[EventPayload]:
         try:
             return await asyncio.wait_for(
                 self._execute_event(context, query_args, payload),
@@ -158,6 +203,74 @@ class AppEngine:
                 f"Response timeout exceeded seconds={context.settings.response_timeout}"
             ) from e
 
+    @asynccontextmanager
+    async def _admit(
+        self, context: EventContext, admission: AdmissionControl
+    ) -> AsyncIterator[None]:
+        """
+        Admits request using event admission control, logging rejected requests
+        """
+        try:
+            async with admission.admit():
+                yield
+        except (TooManyRequests, ServiceUnavailable) as e:
+            logger.warning(context, f"Request rejected: {e}", extra=admission_metrics(admission))
+            raise
+
+    async def execute_stream(
+        self,
+        *,
+        context: EventContext,
+        query_args: Optional[dict],
+        payload: Optional[EventPayload],
+    ) -> AsyncGenerator[EventPayload, None]:
+        """
+        Executes a configured Event of type GET or POST using received payload as input,
+        yielding every result as soon as it is available (i.e. events returning `Spawn[...]`),
+        so callers can stream results without collecting them in memory.
+        Results are written to output stream if configured, same as in `execute`.
+
+        :param context: EventContext, info about app, event and tracking
+        :param query_args: dict, containing query arguments to be passed to every step of event
+        :param payload: EventPayload, payload to send to event handler
+        :return: async generator of EventPayload, not None results from executing the event
+        :raise: TimeoutException in case configured timeout is exceeded waiting for next result
+        :raise: TooManyRequests or ServiceUnavailable in case event admission control is configured
+            and request is rejected
+        """
+        admission = self.admission_control.get(context.event_name)
+        if admission is None:
+            async for result in self._stream_results(context, query_args, payload):
+                yield result
+        else:
+            async with self._admit(context, admission):
+                async for result in self._stream_results(context, query_args, payload):
+                    yield result
+
+    async def _stream_results(
+        self,
+        context: EventContext,
+        query_args: Optional[dict],
+        payload: Optional[EventPayload],
+    ) -> AsyncGenerator[EventPayload, None]:
+        results = self._event_results(context, query_args, payload, StreamQueue.AUTO)
+        try:
+            while True:
+                try:
+                    result = await asyncio.wait_for(
+                        results.__anext__(), timeout=context.settings.response_timeout
+                    )
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError as e:
+                    raise asyncio.TimeoutError(
+                        f"Response timeout exceeded seconds={context.settings.response_timeout}"
+                    ) from e
+                if result is not None:
+                    yield result
+        finally:
+            await results.aclose()
+
     async def _execute_event(
         self,
         context: EventContext,
@@ -173,13 +286,28 @@ class AppEngine:
         :return: result of executing the event. In case of multiple results yield from event,
         last item will be returned. If no items are yield, None will be returned.
         """
+        result = None
+        async for result in self._event_results(context, query_args, payload, queue):
+            pass
+        return result
+
+    async def _event_results(
+        self,
+        context: EventContext,
+        query_args: Optional[dict],
+        payload: Optional[EventPayload],
+        queue: str,
+    ) -> AsyncGenerator[Optional[EventPayload], None]:
+        """
+        Yields results of executing event specified in context for a given input payload,
+        writing them in batches of configured batch_size into output stream if configured.
+        """
         assert self.event_handler is not None, "event_handler not created. Call `start()`."
         if self.streams_enabled and (context.event_info.write_stream is not None):
             assert self.stream_manager, "stream_manager not initialized. Call `start()`."
         event_info = self.effective_events[context.event_name]
         batch_size = context.settings.stream.batch_size
         batch = []
-        result = None
         async for result in self.event_handler.handle_async_event(
             context=context, query_args=query_args, payload=payload
         ):
@@ -190,11 +318,11 @@ class AppEngine:
                     batch=batch, context=context, event_info=event_info, queue=queue
                 )
                 batch.clear()
+            yield result
         if (len(batch) > 0) and (event_info.write_stream is not None):
             await self._write_stream_batch(
                 batch=batch, context=context, event_info=event_info, queue=queue
             )
-        return result
 
     async def _write_stream_batch(
         self,
@@ -204,34 +332,65 @@ class AppEngine:
         event_info: EventDescriptor,
         queue: str,
     ):
-        await asyncio.gather(
-            *[
-                self._write_stream(
-                    payload=item,
-                    context=context,
-                    event_info=event_info,
-                    upstream_queue=queue,
-                )
-                for item in batch
-            ]
-        )
+        """
+        Publish a batch of payloads in configured one or more queues for a given configured
+        stream, using a single `write_stream_fanout` call so payloads are encoded once
+        for all target queues. If stream is partitioned, payloads are grouped by partition
+        keeping their order, and a `write_stream_fanout` call is made for each partition.
+        """
+        assert self.stream_manager is not None, "stream_manager not created. Call `start()`."
+        assert event_info.write_stream is not None, "write_stream name not configured"
+        targets = self._write_stream_targets(event_info, queue)
+        payloads = [StreamManager.as_data_event(payload) for payload in batch]
+        partitions = event_info.write_stream.partitions
+        if partitions <= 1:
+            await self._write_stream_fanout(context, targets, payloads)
+            return
+        partitioned: Dict[int, List[EventPayload]] = {}
+        for payload in payloads:
+            partition = stream_partition(str(payload.event_id()), partitions)  # type: ignore
+            partitioned.setdefault(partition, []).append(payload)
+        for partition, partition_payloads in partitioned.items():
+            await self._write_stream_fanout(
+                context,
+                [
+                    (partition_stream_name(stream_name, partition), queue_name)
+                    for stream_name, queue_name in targets
+                ],
+                partition_payloads,
+            )
 
-    async def _write_stream(
+    async def _write_stream_fanout(
         self,
-        *,
-        payload: EventPayload,
         context: EventContext,
-        event_info: EventDescriptor,
-        upstream_queue: str,
+        targets: List[Tuple[str, str]],
+        payloads: List[EventPayload],
     ):
-        """
-        Publish payload in configured one or more queues for a given configured stream
-        """
         assert self.stream_manager is not None, "stream_manager not created. Call `start()`."
-        assert event_info.write_stream is not None, "write_stream name not configured"
         assert context.settings.stream.compression, "stream compression not configured"
         assert context.settings.stream.serialization, "stream serialization not configured"
+        await self.stream_manager.write_stream_fanout(
+            targets=targets,
+            payloads=payloads,
+            track_ids=context.track_ids,
+            auth_info=context.auth_info,
+            compression=context.settings.stream.compression,
+            serialization=context.settings.stream.serialization,
+            target_max_len=context.settings.stream.target_max_len,
+            envelope=context.settings.stream.envelope,
+            pack_size=context.settings.stream.pack_size,
+        )
 
+    @staticmethod
+    def _write_stream_targets(
+        event_info: EventDescriptor, upstream_queue: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Returns stream name and queue name to publish to, for every configured queue
+        of event write_stream, according to configured queue strategy
+        """
+        assert event_info.write_stream is not None, "write_stream name not configured"
+        targets = []
         for configured_queue in event_info.write_stream.queues:
             stream_name = event_info.write_stream.name
             if (
@@ -248,17 +407,8 @@ class AppEngine:
                 if event_info.write_stream.queue_strategy == StreamQueueStrategy.DROP
                 else upstream_queue
             )
-
-            await self.stream_manager.write_stream(
-                stream_name=stream_name,
-                queue=queue_name,
-                payload=StreamManager.as_data_event(payload),
-                track_ids=context.track_ids,
-                auth_info=context.auth_info,
-                compression=context.settings.stream.compression,
-                serialization=context.settings.stream.serialization,
-                target_max_len=context.settings.stream.target_max_len,
-            )
+            targets.append((stream_name, queue_name))
+        return targets
 
     async def preprocess(
         self,
@@ -294,6 +444,7 @@ class AppEngine:
         context: EventContext,
         stats: StreamStats,
         log_info: Dict[str, str],
+        acks: StreamAckAggregator,
     ) -> Union[EventPayload, Exception]:
         """
         Invokes _process_stream_event with a configured timeout
@@ -310,6 +461,7 @@ class AppEngine:
                     context=context,
                     stats=stats,
                     log_info=log_info,
+                    acks=acks,
                 ),
                 timeout=context.settings.stream.timeout,
             )
@@ -340,6 +492,8 @@ class AppEngine:
         last_err: Optional[StreamOSError],
         *,
         batch_size: int,
+        acks: StreamAckAggregator,
+        partitions: Optional[StreamPartitions] = None,
     ) -> Tuple[
         Optional[Union[EventPayload, Exception]],
         Optional[EventContext],
@@ -348,75 +502,523 @@ class AppEngine:
         """
         Single read_stream cycle used from read_stream while loop to allow wait and retry/recover on failures
         Will read from multiple queues if configured, always starting from the first queue and stopping
-        when batch_size is reached
+        when batch_size is reached. Successfully processed messages pending acknowledgement
+        are flushed at the end of the cycle
+        """
+        stream_events = await self._read_stream_events(
+            stream_info, datatypes, offset, stats, batch_size=batch_size, partitions=partitions
+        )
+        last_res, last_context = await self._process_stream_events(
+            event_name,
+            event_settings,
+            stream_info,
+            stream_events,
+            stats,
+            log_info,
+            acks=acks,
+            partitions=partitions,
+        )
+        if last_context:
+            logger.stats(last_context, extra=extra(prefix="metrics.stream.", **stats.calc()))
+        if test_mode:
+            self._running[event_name].release()
+        if last_err is not None:
+            logger.warning(__name__, f"Recovered read stream for event={event_name}.")
+            last_err = None
+
+        return last_res, last_context, last_err
+
+    async def _read_stream_events(
+        self,
+        stream_info: ReadStreamDescriptor,
+        datatypes: Dict[str, type],
+        offset: str,
+        stats: StreamStats,
+        *,
+        batch_size: int,
+        shared_batch: bool = False,
+        partitions: Optional[StreamPartitions] = None,
+    ) -> List[Tuple[str, StreamEvent]]:
+        """
+        Reads messages from all configured queues concurrently, returning them in
+        configured queues order. Read errors are logged and counted in stats.
+
+        By default up to batch_size messages are read from each queue. If `shared_batch` is set,
+        or `queue_weights` are configured in read_stream, batch_size is shared among queues
+        according to their weights. For partitioned streams, batch size of each queue is
+        shared among `partitions` assigned to this consumer, reading all of them using
+        a single `read_partitions` request. Messages left pending by previous consumers
+        of newly assigned partitions are claimed before reading new messages from them.
+
+        :return: list of stream name and stream event read
         """
         assert self.stream_manager is not None
         assert stream_info.consumer_group is not None
 
-        last_res, last_context = None, None
-
-        batch: List[Awaitable[Union[EventPayload, Exception]]] = []
-        for queue in stream_info.queues:
+        stream_names: List[str] = []
+        reads: List[Awaitable[List[Tuple[str, Union[StreamEvent, Exception]]]]] = []
+        batch_sizes = self._read_stream_batch_sizes(
+            stream_info, batch_size, shared=shared_batch or bool(stream_info.queue_weights)
+        )
+        if partitions is not None:
+            await partitions.renew()
+        for queue, queue_batch_size in zip(stream_info.queues, batch_sizes):
+            if queue_batch_size <= 0:
+                continue
             stream_name = stream_info.name
             if queue != StreamQueue.AUTO:
                 stream_name += f".{queue}"
+            read: Awaitable[List[Tuple[str, Union[StreamEvent, Exception]]]]
+            if partitions is None:
+                read = self._read_named_stream_events(
+                    stream_name,
+                    self.stream_manager.read_stream(
+                        stream_name=stream_name,
+                        consumer_group=stream_info.consumer_group,
+                        datatypes=datatypes,
+                        track_headers=self.app_config.engine.track_headers,
+                        offset=offset,
+                        batch_size=queue_batch_size,
+                        timeout=self.app_config.engine.read_stream_timeout,
+                        batch_interval=self.app_config.engine.read_stream_interval,
+                    ),
+                )
+            elif len(partitions.assigned) != 0:
+                read = self._read_partition_events(
+                    stream_name,
+                    stream_info.consumer_group,
+                    datatypes,
+                    offset,
+                    partitions,
+                    batch_size=queue_batch_size,
+                )
+            else:
+                continue
+            stream_names.append(stream_name)
+            reads.append(read)
 
-            for stream_event in await self.stream_manager.read_stream(
-                stream_name=stream_name,
-                consumer_group=stream_info.consumer_group,
-                datatypes=datatypes,
-                track_headers=self.app_config.engine.track_headers,
-                offset=offset,
-                batch_size=batch_size,
-                timeout=self.app_config.engine.read_stream_timeout,
-                batch_interval=self.app_config.engine.read_stream_interval,
-            ):
+        if len(reads) == 0:
+            # No partitions assigned: wait before trying again, same as an empty read
+            await asyncio.sleep(self.app_config.engine.read_stream_interval / 1000.0)
+        stream_events: List[Tuple[str, StreamEvent]] = []
+        for stream_name, read_result in zip(
+            stream_names, await asyncio.gather(*reads, return_exceptions=True)
+        ):
+            read_events: List[Tuple[str, Union[StreamEvent, BaseException]]] = (
+                [(stream_name, read_result)]
+                if isinstance(read_result, BaseException)
+                else [*read_result]
+            )
+            for read_stream_name, stream_event in read_events:
                 stats.ensure_start()
 
-                if isinstance(stream_event, Exception):
+                if isinstance(stream_event, BaseException):
                     logger.error(__name__, stream_event)
                     stats.inc(error=True)
                 else:
-                    context = EventContext(
-                        app_config=self.app_config,
-                        plugin_config=self.app_config,
-                        event_name=event_name,
-                        settings=event_settings,
-                        track_ids=stream_event.track_ids,
-                        auth_info=stream_auth_info(stream_event),
-                    )
-                    last_context = context
-                    logger.start(
-                        context,
-                        extra=extra(
-                            prefix="stream.",
-                            **{**log_info, "name": stream_name, "queue": queue},
-                        ),
-                    )
-                    batch.append(
-                        self._process_stream_event_with_timeout(
-                            stream_event=stream_event,
-                            stream_info=stream_info,
-                            stream_name=stream_name,
-                            queue=stream_event.queue,
-                            context=context,
-                            stats=stats,
-                            log_info=log_info,
-                        )
+                    stream_events.append((read_stream_name, stream_event))
+        if partitions is not None:
+            partitions.read(stream_events)
+        return stream_events
+
+    @staticmethod
+    async def _read_named_stream_events(
+        stream_name: str, read: Awaitable[List[Union[StreamEvent, Exception]]]
+    ) -> List[Tuple[str, Union[StreamEvent, Exception]]]:
+        """Awaits a read from a single stream, returning stream name with each event read"""
+        return [(stream_name, stream_event) for stream_event in await read]
+
+    async def _read_partition_events(
+        self,
+        stream_name: str,
+        consumer_group: str,
+        datatypes: Dict[str, type],
+        offset: str,
+        partitions: StreamPartitions,
+        *,
+        batch_size: int,
+    ) -> List[Tuple[str, Union[StreamEvent, Exception]]]:
+        """
+        Reads up to batch_size messages from partitions of a queue assigned to this consumer.
+        Messages left pending by previous consumer of newly assigned partitions are claimed
+        first, then remaining batch size is shared among partitions with no messages left to claim,
+        reading all of them using a single `read_partitions` request.
+        """
+        assert self.stream_manager is not None
+        partition_batch_sizes = partitions.batch_sizes(batch_size)
+        claims = [
+            (partition_stream_name(stream_name, partition), partition_batch_size)
+            for partition, partition_batch_size in partition_batch_sizes
+            if partition_stream_name(stream_name, partition) in partitions.claims
+        ]
+        stream_events: List[Tuple[str, Union[StreamEvent, Exception]]] = []
+        for claim_stream_name, (next_id, claimed) in zip(
+            [claim_stream_name for claim_stream_name, _ in claims],
+            await asyncio.gather(
+                *(
+                    self.stream_manager.claim_pending(
+                        stream_name=claim_stream_name,
+                        consumer_group=consumer_group,
+                        datatypes=datatypes,
+                        track_headers=self.app_config.engine.track_headers,
+                        start_id=partitions.claims[claim_stream_name],
+                        batch_size=claim_batch_size,
                     )
+                    for claim_stream_name, claim_batch_size in claims
+                )
+            ),
+        ):
+            partitions.claimed(claim_stream_name, next_id)
+            stream_events.extend((claim_stream_name, stream_event) for stream_event in claimed)
+        remaining = batch_size - len(stream_events)
+        read_partitions = [
+            partition
+            for partition, _ in partition_batch_sizes
+            if partition_stream_name(stream_name, partition) not in partitions.claims
+        ][: max(0, remaining)]
+        if len(read_partitions) != 0:
+            stream_events.extend(
+                await self.stream_manager.read_partitions(
+                    stream_name=stream_name,
+                    partitions=read_partitions,
+                    consumer_group=consumer_group,
+                    datatypes=datatypes,
+                    track_headers=self.app_config.engine.track_headers,
+                    offset=offset,
+                    batch_size=remaining // len(read_partitions),
+                    timeout=self.app_config.engine.read_stream_timeout,
+                    batch_interval=self.app_config.engine.read_stream_interval,
+                )
+            )
+        return stream_events
+
+    @staticmethod
+    def _read_stream_batch_sizes(
+        stream_info: ReadStreamDescriptor, batch_size: int, *, shared: bool
+    ) -> List[int]:
+        """
+        Computes max number of messages to read from each configured queue.
+        If not `shared`, every queue can read up to batch_size messages. Otherwise,
+        batch_size is split proportionally to `queue_weights` (default weight is 1),
+        ensuring each queue reads at least one message while batch_size allows it,
+        prioritizing queues with higher weights.
+        """
+        queues = stream_info.queues
+        if not shared:
+            return [batch_size] * len(queues)
+        weights = [max(1, stream_info.queue_weights.get(queue, 1)) for queue in queues]
+        total = sum(weights)
+        sizes = [batch_size * weight // total for weight in weights]
+        remaining = batch_size - sum(sizes)
+        by_weight = sorted(range(len(queues)), key=lambda i: -weights[i])
+        for i in [*(i for i in by_weight if sizes[i] == 0), *by_weight]:
+            if remaining <= 0:
+                break
+            sizes[i] += 1
+            remaining -= 1
+        return sizes
+
+    async def _process_stream_events(
+        self,
+        event_name: str,
+        event_settings: EventSettings,
+        stream_info: ReadStreamDescriptor,
+        stream_events: List[Tuple[str, StreamEvent]],
+        stats: StreamStats,
+        log_info: Dict[str, str],
+        *,
+        acks: StreamAckAggregator,
+        partitions: Optional[StreamPartitions] = None,
+    ) -> Tuple[Optional[Union[EventPayload, Exception]], Optional[EventContext]]:
+        """
+        Processes concurrently a list of read stream events, waiting for all of them to finish
+        and flushing pending acknowledgements. For partitioned streams, events read from
+        the same partition are processed in order, concurrently with other partitions,
+        and registered as processed in `partitions`.
+
+        :return: last result and last context created, if any
+        """
+        last_res, last_context = None, None
+
+        batch: List[Awaitable[Union[EventPayload, Exception]]] = []
+        ordered: Dict[str, List[Awaitable[Union[EventPayload, Exception]]]] = {}
+        for stream_name, stream_event in stream_events:
+            context = self._stream_event_context(
+                event_name, event_settings, stream_name, stream_event, log_info
+            )
+            last_context = context
+            process = self._process_stream_event_with_timeout(
+                stream_event=stream_event,
+                stream_info=stream_info,
+                stream_name=stream_name,
+                queue=stream_event.queue,
+                context=context,
+                stats=stats,
+                log_info=log_info,
+                acks=acks,
+            )
+            if stream_info.partitions > 1:
+                ordered.setdefault(stream_name, []).append(process)
+            else:
+                batch.append(process)
+        batch.extend(self._process_in_order(processes) for processes in ordered.values())
 
         if len(batch) != 0:
             for result in await asyncio.gather(*batch):
                 last_res = result
-        if last_context:
-            logger.stats(last_context, extra=extra(prefix="metrics.stream.", **stats.calc()))
-        if test_mode:
+            await acks.flush()
+        if partitions is not None:
+            partitions.processed(stream_events)
+        return last_res, last_context
+
+    @staticmethod
+    async def _process_in_order(
+        processes: List[Awaitable[Union[EventPayload, Exception]]],
+    ) -> Union[EventPayload, Exception]:
+        """Awaits processing of stream events one after another, returning last result"""
+        result: Union[EventPayload, Exception] = RuntimeError("No stream events to process")
+        for process in processes:
+            result = await process
+        return result
+
+    def _stream_event_context(
+        self,
+        event_name: str,
+        event_settings: EventSettings,
+        stream_name: str,
+        stream_event: StreamEvent,
+        log_info: Dict[str, str],
+    ) -> EventContext:
+        """Creates context to process a stream event and logs processing start"""
+        context = EventContext(
+            app_config=self.app_config,
+            plugin_config=self.app_config,
+            event_name=event_name,
+            settings=event_settings,
+            track_ids=stream_event.track_ids,
+            auth_info=stream_auth_info(stream_event),
+        )
+        logger.start(
+            context,
+            extra=extra(
+                prefix="stream.",
+                **{**log_info, "name": stream_name, "queue": stream_event.queue},
+            ),
+        )
+        return context
+
+    async def _read_stream_prefetch(
+        self,
+        event_name: str,
+        event_settings: EventSettings,
+        stream_info: ReadStreamDescriptor,
+        datatypes: Dict[str, type],
+        offset: str,
+        stats: StreamStats,
+        log_info: Dict[str, str],
+        test_mode: bool,
+        *,
+        max_events: Optional[int],
+        stop_when_empty: bool,
+        acks: StreamAckAggregator,
+        partitions: Optional[StreamPartitions] = None,
+    ) -> Tuple[Optional[Union[EventPayload, Exception]], Optional[EventContext]]:
+        """
+        Consumes stream using `prefetch` mode: a background task reads batches of messages
+        into a bounded buffer while previous batch is being processed. Reading waits
+        when `max_in_flight` messages are already read and not yet processed.
+
+        :return: last result and last context created, if any
+        """
+        batch_size = event_settings.stream.batch_size
+        max_in_flight = event_settings.stream.max_in_flight or 2 * batch_size
+        prefetched: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_in_flight // batch_size))
+        in_flight = 0
+        processed = asyncio.Condition()
+
+        async def _prefetch() -> None:
+            nonlocal in_flight
+            read_count = 0
+            try:
+                while self._running[event_name].locked():
+                    async with processed:
+                        await processed.wait_for(lambda: in_flight < max_in_flight)
+                    budget = min(batch_size, max_in_flight - in_flight)
+                    if max_events:
+                        budget = min(budget, max_events - read_count)
+                        if budget <= 0:
+                            break
+                    stream_events = await self._read_stream_events(
+                        stream_info,
+                        datatypes,
+                        offset,
+                        stats,
+                        batch_size=budget,
+                        shared_batch=True,
+                        partitions=partitions,
+                    )
+                    if len(stream_events) != 0:
+                        in_flight += len(stream_events)
+                        read_count += len(stream_events)
+                        await prefetched.put(stream_events)
+                    if test_mode or (stop_when_empty and len(stream_events) == 0):
+                        break
+            except CancelledError:
+                # Consumer is not reading anymore: never block on a full queue
+                with suppress(asyncio.QueueFull):
+                    prefetched.put_nowait(None)
+                raise
+            except Exception:
+                await prefetched.put(None)
+                raise
+            await prefetched.put(None)
+
+        last_res, last_context = None, None
+        prefetch_task = asyncio.create_task(_prefetch())
+        try:
+            while (stream_events := await prefetched.get()) is not None:
+                res, context = await self._process_stream_events(
+                    event_name,
+                    event_settings,
+                    stream_info,
+                    stream_events,
+                    stats,
+                    log_info,
+                    acks=acks,
+                    partitions=partitions,
+                )
+                last_res, last_context = res, context or last_context
+                if last_context:
+                    logger.stats(
+                        last_context, extra=extra(prefix="metrics.stream.", **stats.calc())
+                    )
+                async with processed:
+                    in_flight -= len(stream_events)
+                    processed.notify_all()
+            await prefetch_task
+        finally:
+            if not prefetch_task.done():
+                prefetch_task.cancel()
+                with suppress(CancelledError):
+                    await prefetch_task
+        if test_mode and self._running[event_name].locked():
             self._running[event_name].release()
-        if last_err is not None:
-            logger.warning(__name__, f"Recovered read stream for event={event_name}.")
-            last_err = None
+        return last_res, last_context
 
-        return last_res, last_context, last_err
+    async def _read_stream_continuous(
+        self,
+        event_name: str,
+        event_settings: EventSettings,
+        stream_info: ReadStreamDescriptor,
+        datatypes: Dict[str, type],
+        offset: str,
+        stats: StreamStats,
+        log_info: Dict[str, str],
+        test_mode: bool,
+        *,
+        max_events: Optional[int],
+        stop_when_empty: bool,
+        acks: StreamAckAggregator,
+        partitions: Optional[StreamPartitions] = None,
+    ) -> Tuple[Optional[Union[EventPayload, Exception]], Optional[EventContext]]:
+        """
+        Consumes stream using `continuous` mode: a window of `max_in_flight` slots limits
+        messages being processed concurrently. Every processed message releases its slot,
+        and stream is read again as soon as slots are available, so a slow message
+        does not hold back processing of the following ones. For partitioned streams,
+        processing of a message waits for the previous message read from the same partition.
+
+        :return: last result and last context created, if any
+        """
+        batch_size = event_settings.stream.batch_size
+        max_in_flight = event_settings.stream.max_in_flight or batch_size
+        window = asyncio.Semaphore(max_in_flight)
+        tasks: Set[asyncio.Task] = set()
+        last_tasks: Dict[str, asyncio.Task] = {}
+        last_res: Optional[Union[EventPayload, Exception]] = None
+        last_context: Optional[EventContext] = None
+        read_count = 0
+
+        async def _process(
+            stream_name: str,
+            stream_event: StreamEvent,
+            context: EventContext,
+            previous: Optional[asyncio.Task],
+        ) -> None:
+            nonlocal last_res
+            try:
+                if previous is not None:
+                    await asyncio.wait([previous])
+                last_res = await self._process_stream_event_with_timeout(
+                    stream_event=stream_event,
+                    stream_info=stream_info,
+                    stream_name=stream_name,
+                    queue=stream_event.queue,
+                    context=context,
+                    stats=stats,
+                    log_info=log_info,
+                    acks=acks,
+                )
+            finally:
+                if partitions is not None:
+                    partitions.processed([(stream_name, stream_event)])
+                window.release()
+
+        try:
+            while self._running[event_name].locked():
+                await window.acquire()
+                slots = 1
+                budget = batch_size
+                if max_events:
+                    budget = min(budget, max_events - read_count)
+                    if budget <= 0:
+                        window.release()
+                        break
+                while slots < budget and not window.locked():
+                    await window.acquire()
+                    slots += 1
+                stream_events = await self._read_stream_events(
+                    stream_info,
+                    datatypes,
+                    offset,
+                    stats,
+                    batch_size=slots,
+                    shared_batch=True,
+                    partitions=partitions,
+                )
+                for _ in range(slots - len(stream_events)):
+                    window.release()
+                for stream_name, stream_event in stream_events:
+                    last_context = self._stream_event_context(
+                        event_name, event_settings, stream_name, stream_event, log_info
+                    )
+                    previous = None
+                    if stream_info.partitions > 1:
+                        previous = last_tasks.get(stream_name)
+                        if previous is not None and previous.done():
+                            previous = None
+                    task = asyncio.create_task(
+                        _process(stream_name, stream_event, last_context, previous)
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    if stream_info.partitions > 1:
+                        last_tasks[stream_name] = task
+                read_count += len(stream_events)
+                await acks.flush_expired()
+                if last_context and len(stream_events) != 0:
+                    logger.stats(
+                        last_context, extra=extra(prefix="metrics.stream.", **stats.calc())
+                    )
+                if test_mode or (stop_when_empty and len(stream_events) == 0):
+                    break
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await acks.flush()
+        if test_mode and self._running[event_name].locked():
+            self._running[event_name].release()
+        return last_res, last_context
 
     async def read_stream(
         self,
@@ -445,6 +1047,7 @@ class AppEngine:
         assert self.app_config.server is not None
         stats = StreamStats()
         log_info = {"app_key": self.app_key, "event_name": event_name}
+        partitions: Optional[StreamPartitions] = None
         wait = self.app_config.server.streams.delay_auto_start_seconds
         if wait_start and wait > 0:
             wait = int(wait / 2) + random.randint(0, wait) - random.randint(0, int(wait / 2))
@@ -473,20 +1076,28 @@ class AppEngine:
             assert not self._running[event_name].locked(), f"Event already running {event_name}"
             await self._running[event_name].acquire()
 
+            queue_stream_names: List[str] = []
             for queue in stream_info.queues:
-                while self._running[event_name].locked():
-                    try:
-                        await self.stream_manager.ensure_consumer_group(
-                            stream_name=(
-                                f"{stream_info.name}.{queue}"
-                                if queue != StreamQueue.AUTO
-                                else stream_info.name
-                            ),
-                            consumer_group=stream_info.consumer_group,
-                        )
-                        break  # success, do not try anymoere
-                    except StreamOSError:
-                        pass  # Will retry when circuit breaker opens
+                queue_stream_name = (
+                    f"{stream_info.name}.{queue}" if queue != StreamQueue.AUTO else stream_info.name
+                )
+                queue_stream_names.append(queue_stream_name)
+                stream_names = [queue_stream_name]
+                if stream_info.partitions > 1:
+                    stream_names = [
+                        partition_stream_name(queue_stream_name, partition)
+                        for partition in range(stream_info.partitions)
+                    ]
+                for stream_name in stream_names:
+                    while self._running[event_name].locked():
+                        try:
+                            await self.stream_manager.ensure_consumer_group(
+                                stream_name=stream_name,
+                                consumer_group=stream_info.consumer_group,
+                            )
+                            break  # success, do not try anymoere
+                        except StreamOSError:
+                            pass  # Will retry when circuit breaker opens
 
             datatypes = self._find_stream_datatype_handlers(event_name, event_config)
             log_info["name"] = stream_info.name
@@ -499,11 +1110,24 @@ class AppEngine:
             offset = ">"
             last_res, last_context, last_err = None, None, None
             batch_size = event_settings.stream.batch_size
-            while self._running[event_name].locked():
-                remaining = (max_events or 0) - stats.total_event_count
-                if max_events and remaining <= 0:
-                    break
-                last_res, last_context, last_err = await self._read_stream_cycle(
+            acks = StreamAckAggregator(
+                self.stream_manager,
+                consumer_group=stream_info.consumer_group,
+                max_batch_size=event_settings.stream.ack_batch_size,
+                flush_interval_ms=event_settings.stream.ack_interval_ms,
+            )
+            if stream_info.partitions > 1:
+                partitions = StreamPartitions(
+                    self.stream_manager,
+                    stream_name=stream_info.name,
+                    consumer_group=stream_info.consumer_group,
+                    partitions=stream_info.partitions,
+                    lease_ms=self.app_config.server.streams.partition_lease_ms,
+                    acks=acks,
+                    queue_stream_names=queue_stream_names,
+                )
+            if event_settings.stream.consumer_mode == StreamConsumerMode.PREFETCH:
+                last_res, last_context = await self._read_stream_prefetch(
                     event_name,
                     event_settings,
                     stream_info,
@@ -512,11 +1136,47 @@ class AppEngine:
                     stats,
                     log_info,
                     test_mode,
-                    last_err,
-                    batch_size=min(remaining, batch_size) if max_events else batch_size,
+                    max_events=max_events,
+                    stop_when_empty=stop_when_empty,
+                    acks=acks,
+                    partitions=partitions,
                 )
-                if stop_when_empty and last_context is None:
-                    break
+            elif event_settings.stream.consumer_mode == StreamConsumerMode.CONTINUOUS:
+                last_res, last_context = await self._read_stream_continuous(
+                    event_name,
+                    event_settings,
+                    stream_info,
+                    datatypes,
+                    offset,
+                    stats,
+                    log_info,
+                    test_mode,
+                    max_events=max_events,
+                    stop_when_empty=stop_when_empty,
+                    acks=acks,
+                    partitions=partitions,
+                )
+            else:
+                while self._running[event_name].locked():
+                    remaining = (max_events or 0) - stats.total_event_count
+                    if max_events and remaining <= 0:
+                        break
+                    last_res, last_context, last_err = await self._read_stream_cycle(
+                        event_name,
+                        event_settings,
+                        stream_info,
+                        datatypes,
+                        offset,
+                        stats,
+                        log_info,
+                        test_mode,
+                        last_err,
+                        batch_size=min(remaining, batch_size) if max_events else batch_size,
+                        acks=acks,
+                        partitions=partitions,
+                    )
+                    if stop_when_empty and last_context is None:
+                        break
             logger.info(
                 __name__,
                 "Stopped read_stream.",
@@ -530,6 +1190,8 @@ class AppEngine:
             logger.error(__name__, f"Unexpectedly stopped read stream for event={event_name}")
             return e
         finally:
+            if partitions is not None:
+                await partitions.release()
             if (stop_when_empty or max_events is not None) and self._running[event_name].locked():
                 self._running[event_name].release()
 
@@ -543,12 +1205,16 @@ class AppEngine:
         context: EventContext,
         stats: StreamStats,
         log_info: Dict[str, str],
+        acks: StreamAckAggregator,
     ) -> Optional[Union[EventPayload, Exception]]:
         """
-        Process a single stream event, execute events, ack if not failed, log error if fail
+        Process a single stream event, execute events, ack if not failed, log error if fail.
+        Acknowledgement is collected by `acks` aggregator, to be sent in batches by the read loop,
+        outside of event processing timeout
 
         :return: results of executing the event, or Exception if errors during processing
         """
+        processed = False
         try:
             assert self.event_handler
             assert self.stream_manager
@@ -559,11 +1225,8 @@ class AppEngine:
                 payload=stream_event.payload,
                 queue=stream_event.queue,
             )
-            await self.stream_manager.ack_read_stream(
-                stream_name=stream_name,
-                consumer_group=stream_info.consumer_group,
-                stream_event=stream_event,
-            )
+            processed = True
+            acks.ack(stream_name=stream_name, stream_event=stream_event)
             logger.done(
                 context,
                 extra=combined(
@@ -578,12 +1241,16 @@ class AppEngine:
             stats.inc()
             return result
         except CancelledError as e:
+            if not processed:
+                acks.fail(stream_name=stream_name, stream_event=stream_event)
             extra_info = {**log_info, "name": stream_name, "queue": queue}
             logger.error(context, "Cancelled", extra=extra(prefix="stream.", **extra_info))
             logger.failed(context, extra=extra(prefix="stream.", **extra_info))
             stats.inc(error=True)
             return e
         except Exception as e:  # pylint: disable=broad-except
+            if not processed:
+                acks.fail(stream_name=stream_name, stream_event=stream_event)
             extra_info = {**log_info, "name": stream_name, "queue": queue}
             logger.error(context, e, extra=extra(prefix="stream.", **extra_info))
             logger.failed(context, extra=extra(prefix="stream.", **extra_info))
@@ -9,7 +9,7 @@ from asyncio import iscoroutine
 from hopeit.dataobjects import EventPayload
 from hopeit.dataobjects.payload import Payload
 from hopeit.server.steps import (
-    StepExecutionList,
+    StepDispatchTable,
     StepInfo,
     extract_postprocess_handler,
     extract_preprocess_handler,
@@ -50,7 +50,7 @@ class EventHandler:
         """
         self.app_config = app_config
         self.modules: Dict[str, Tuple[ModuleType, bool, list]] = {}
-        self.steps: Dict[str, StepExecutionList] = {}
+        self.steps: Dict[str, StepDispatchTable] = {}
         self.preprocess_handlers: Dict[str, Optional[StepInfo]] = {}
         self.postprocess_handlers: Dict[str, Optional[StepInfo]] = {}
         self.settings = settings
@@ -77,7 +77,7 @@ class EventHandler:
                 name=base_event,
                 event_settings=event_settings,
             )
-            self.steps[event_name] = effective_steps(event_name, steps)
+            self.steps[event_name] = StepDispatchTable(effective_steps(event_name, steps))
 
     async def _ensure_initialized(self, context: EventContext):
         base_event, _ = event_and_step(context.event_name)
@@ -0,0 +1,197 @@
+"""
+In-process metrics: latency histograms and counters per event and step,
+and stream age distributions, rendered in Prometheus text format
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from hopeit.app.context import EventContext
+
+__all__ = [
+    "BUCKET_BOUNDS_MS",
+    "LatencyHistogram",
+    "MetricsRegistry",
+    "registry",
+    "PROMETHEUS_CONTENT_TYPE",
+]
+
+SUB_BUCKETS = 4
+MIN_EXPONENT = -3
+MAX_EXPONENT = 17
+
+# Log-linear bucket upper bounds in milliseconds, from 0.125ms to ~131s:
+# every power of 2 is split in SUB_BUCKETS linear sub-buckets, keeping relative error bounded
+BUCKET_BOUNDS_MS: Tuple[float, ...] = tuple(
+    (2.0**exponent) * (1.0 + sub / SUB_BUCKETS)
+    for exponent in range(MIN_EXPONENT, MAX_EXPONENT)
+    for sub in range(SUB_BUCKETS)
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class LatencyHistogram:
+    """
+    Fixed buckets histogram of durations in milliseconds.
+    Recording a value is a binary search over `BUCKET_BOUNDS_MS` and a counter increment.
+    """
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns upper bound in milliseconds of the bucket containing the q-th percentile,
+        q in range 0.0 to 100.0. Returns 0.0 if no values were recorded.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1.0, self.count * q / 100.0)
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    Keeps latency histograms and counters for events executed in this process:
+
+    event_duration: time since event context was created until DONE, FAILED or IGNORED is logged
+    events: counters of DONE, FAILED and IGNORED events
+    step_duration: time spent executing each non-Spawn step of an event
+    stream_age: time events spent in stream before being consumed
+    codec_duration: time spent encoding and decoding stream payloads, inline or offloaded
+    """
+
+    def __init__(self):
+        self.event_duration: Dict[Tuple[str, ...], LatencyHistogram] = {}
+        self.events: Dict[Tuple[str, ...], int] = {}
+        self.step_duration: Dict[Tuple[str, ...], LatencyHistogram] = {}
+        self.stream_age: Dict[Tuple[str, ...], LatencyHistogram] = {}
+        self.codec_duration: Dict[Tuple[str, ...], LatencyHistogram] = {}
+
+    def clear(self) -> None:
+        self.event_duration.clear()
+        self.events.clear()
+        self.step_duration.clear()
+        self.stream_age.clear()
+        self.codec_duration.clear()
+
+    def observe_event(self, context: EventContext, status: str) -> None:
+        """
+        Records event duration, status counter and stream age if event was read from a stream
+        """
+        key = (context.app_key, context.event_name)
+        duration = 1000.0 * (datetime.now(tz=timezone.utc) - context.creation_ts).total_seconds()
+        _histogram(self.event_duration, key).observe(duration)
+        status_key = (context.app_key, context.event_name, status)
+        self.events[status_key] = self.events.get(status_key, 0) + 1
+        submit_ts = context.track_ids.get("stream.submit_ts")
+        read_ts = context.track_ids.get("stream.read_ts")
+        if submit_ts and read_ts:
+            age = datetime.fromisoformat(read_ts) - datetime.fromisoformat(submit_ts)
+            _histogram(self.stream_age, key).observe(1000.0 * age.total_seconds())
+
+    def observe_step(self, context: EventContext, step_name: str, duration_ms: float) -> None:
+        key = (context.app_key, context.event_name, step_name)
+        _histogram(self.step_duration, key).observe(duration_ms)
+
+    def observe_codec(self, operation: str, mode: str, duration_ms: float) -> None:
+        _histogram(self.codec_duration, (operation, mode)).observe(duration_ms)
+
+    def prometheus_text(self) -> str:
+        """
+        Renders all metrics in Prometheus text exposition format, durations in seconds
+        """
+        lines: List[str] = []
+        _render_histograms(
+            lines,
+            "hopeit_event_duration_seconds",
+            "Duration of events until DONE, FAILED or IGNORED.",
+            ("app", "event"),
+            self.event_duration,
+        )
+        lines.append("# HELP hopeit_events_total Events processed by status.")
+        lines.append("# TYPE hopeit_events_total counter")
+        for key, value in self.events.items():
+            lines.append(f"hopeit_events_total{_labels(('app', 'event', 'status'), key)} {value}")
+        _render_histograms(
+            lines,
+            "hopeit_step_duration_seconds",
+            "Duration of event steps execution.",
+            ("app", "event", "step"),
+            self.step_duration,
+        )
+        _render_histograms(
+            lines,
+            "hopeit_stream_age_seconds",
+            "Time events spent in stream before being consumed.",
+            ("app", "event"),
+            self.stream_age,
+        )
+        _render_histograms(
+            lines,
+            "hopeit_stream_codec_duration_seconds",
+            "Time spent encoding and decoding stream payloads.",
+            ("operation", "mode"),
+            self.codec_duration,
+        )
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _histogram(
+    histograms: Dict[Tuple[str, ...], LatencyHistogram], key: Tuple[str, ...]
+) -> LatencyHistogram:
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = LatencyHistogram()
+    return histogram
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], **extra: str) -> str:
+    items = [*zip(names, values), *extra.items()]
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+_BUCKET_LABELS = tuple(f"{bound / 1000.0:.9g}" for bound in BUCKET_BOUNDS_MS) + ("+Inf",)
+
+
+def _render_histograms(
+    lines: List[str],
+    name: str,
+    description: str,
+    label_names: Tuple[str, ...],
+    histograms: Dict[Tuple[str, ...], LatencyHistogram],
+) -> None:
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in histograms.items():
+        cumulative = 0
+        for le, bucket_count in zip(_BUCKET_LABELS, histogram.counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(label_names, key, le=le)} {cumulative}")
+        labels = _labels(label_names, key)
+        lines.append(f"{name}_sum{labels} {histogram.sum / 1000.0:.9g}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+
+registry = MetricsRegistry()
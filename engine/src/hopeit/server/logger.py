@@ -2,20 +2,26 @@
 Server/Engine logging module
 """
 
+import atexit
 import logging
 import os
+import queue
 import socket
+import sys
+import threading
 import time
+import traceback
 from datetime import datetime
 from functools import partial
-from logging.handlers import WatchedFileHandler
-from typing import Dict, Iterable, Union, List, Tuple, Callable, Any
+from logging.handlers import QueueHandler, WatchedFileHandler
+from typing import Dict, Iterable, Optional, Sequence, Union, List, Tuple, Callable, Any
 from hopeit.server.names import snakecase
 
 from hopeit.server import version
 from hopeit.app.config import AppDescriptor, AppConfig, EventSettings
 from hopeit.app.context import EventContext
 from hopeit.server.errors import json_exc
+from hopeit.server import histograms
 from hopeit.server.config import ServerConfig, LoggingConfig
 
 DEFAULT_ENGINE_LOGGER = "engine_logger_default"
@@ -30,6 +36,7 @@ __all__ = [
     "extra_logger",
     "format_extra_values",
     "EngineLoggerWrapper",
+    "AsyncLogWriter",
 ]
 
 
@@ -125,6 +132,156 @@ def _console_handler(logger_name: str, formatter: logging.Formatter):
     return ch
 
 
+class AsyncLogWriter:
+    """
+    Writes log records in a background thread, so handlers writing to files or console
+    do not block the event loop.
+
+    Records are enqueued in a bounded buffer: in case it is full (i.e. disk stalled),
+    records are dropped and counted, and a warning with the number of dropped records
+    is written once the writer catches up. Records are written in batches of up to
+    `batch_size` records, flushing every handler once per batch.
+    """
+
+    def __init__(self, buffer_size: int, batch_size: int):
+        self.queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="hopeit-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def enqueue(self, handlers: Sequence[logging.Handler], record: logging.LogRecord) -> None:
+        """
+        Enqueues record to be written by handlers, or drops it if buffer is full
+        """
+        try:
+            self.queue.put_nowait((handlers, record))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Writes pending records and stops writer thread
+        """
+        if self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            stop = item is None
+            try:
+                self._write(batch)
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc(file=sys.stderr)
+
+    def _write(self, batch: List[Tuple[Sequence[logging.Handler], logging.LogRecord]]) -> None:
+        pending: Dict[logging.Handler, List[logging.LogRecord]] = {}
+        for handlers, record in batch:
+            for handler in handlers:
+                pending.setdefault(handler, []).append(record)
+        dropped_record = self._dropped_record()
+        if dropped_record is not None:
+            for records in pending.values():
+                records.append(dropped_record)
+        for handler, records in pending.items():
+            _write_records(handler, records)
+        self.written += len(batch)
+
+    def _dropped_record(self) -> Optional[logging.LogRecord]:
+        with self._lock:
+            dropped = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        if dropped == 0:
+            return None
+        record = logging.LogRecord(
+            _engine_logger_name("logger"),
+            logging.WARNING,
+            __file__,
+            0,
+            "Log records dropped: async log buffer full",
+            None,
+            None,
+        )
+        record.extra = format_extra_values(
+            {"dropped": dropped, "total_dropped": self._reported_dropped}, prefix="metrics."
+        )
+        return record
+
+
+def _write_records(handler: logging.Handler, records: List[logging.LogRecord]) -> None:
+    """
+    Writes a batch of records using handler. Stream handlers (including files) are written
+    with a single write and flush per batch, other handlers handle records one by one.
+    """
+    if not isinstance(handler, logging.StreamHandler) or handler.filters:
+        for record in records:
+            handler.handle(record)
+        return
+    records = [record for record in records if record.levelno >= handler.level]
+    if not records:
+        return
+    handler.acquire()
+    try:
+        if isinstance(handler, WatchedFileHandler):
+            handler.reopenIfNeeded()
+        handler.stream.write("".join(handler.format(r) + handler.terminator for r in records))
+        handler.flush()
+    except Exception:  # pylint: disable=broad-except
+        handler.handleError(records[-1])
+    finally:
+        handler.release()
+
+
+class _AsyncLogHandler(QueueHandler):
+    """
+    Queue handler that submits records to `AsyncLogWriter`, to be written by target handlers.
+    Records are not formatted when enqueued: formatting is done in writer thread.
+    """
+
+    def __init__(self, writer: AsyncLogWriter, handlers: Sequence[logging.Handler]):
+        super().__init__(writer.queue)
+        self.writer = writer
+        self.handlers = tuple(handlers)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.writer.enqueue(self.handlers, record)
+
+
+_async_writer: Optional[AsyncLogWriter] = None
+
+
+def _get_async_writer(config: LoggingConfig) -> AsyncLogWriter:
+    global _async_writer  # pylint: disable=global-statement
+    if _async_writer is None:
+        _async_writer = AsyncLogWriter(
+            buffer_size=config.async_buffer_size, batch_size=config.async_batch_size
+        )
+    return _async_writer
+
+
 def _setup_standard_logger(
     logger_name: str, config: LoggingConfig, log_format: str = LOG_FORMAT
 ) -> logging.Logger:
@@ -132,6 +289,8 @@ def _setup_standard_logger(
     Creates a python logger using server logging configuration.
     By default all loggers are created with a file handler.
     If log_leve is DEBUG, an additional console handler is attached.
+    If async_writer is enabled, handlers are wrapped so records are written
+    from a background thread.
 
     :param logger_name: logger name
     :param config: server logging config
@@ -142,12 +301,15 @@ def _setup_standard_logger(
     logger.setLevel(config.log_level)
     formatter = logging.Formatter(log_format)
     formatter.converter = time.gmtime  # type: ignore
+    handlers: List[logging.Handler] = []
     if not config.console_only:
-        file_handler = _file_handler(logger_name, formatter, config.log_path)
-        logger.addHandler(file_handler)
+        handlers.append(_file_handler(logger_name, formatter, config.log_path))
     if config.console_only or config.log_level == "DEBUG":
-        ch = _console_handler(logger_name, formatter)
-        logger.addHandler(ch)
+        handlers.append(_console_handler(logger_name, formatter))
+    if config.async_writer:
+        handlers = [_AsyncLogHandler(_get_async_writer(config), handlers)]
+    for handler in handlers:
+        logger.addHandler(handler)
     return logger
 
 
@@ -209,12 +371,15 @@ class EngineLoggerWrapper:
 
     def failed(self, context: EventContext, *args, **kwargs) -> None:
         self.error(context, "FAILED", *args, **kwargs)
+        histograms.registry.observe_event(context, "failed")
 
     def ignored(self, context: EventContext, *args, **kwargs) -> None:
         self.warning(context, "IGNORED", *args, **kwargs)
+        histograms.registry.observe_event(context, "ignored")
 
     def done(self, context: EventContext, *args, **kwargs) -> None:
         self.info(context, "DONE", *args, **kwargs)
+        histograms.registry.observe_event(context, "done")
 
     def stats(self, context: EventContext, *args, **kwargs) -> None:
         self.info(context, "STATS", *args, **kwargs)
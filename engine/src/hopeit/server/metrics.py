@@ -3,13 +3,15 @@ Metrics module
 """
 
 from datetime import datetime, timezone
-from typing import Dict, Union, Optional
+from typing import TYPE_CHECKING, Dict, Union, Optional
 
 from hopeit.server.logger import format_extra_values
 from hopeit.app.context import EventContext
 
+if TYPE_CHECKING:
+    from hopeit.server.admission import AdmissionControl
 
-__all__ = ["metrics", "stream_metrics", "StreamStats"]
+__all__ = ["metrics", "stream_metrics", "admission_metrics", "StreamStats"]
 
 
 def metrics(context: EventContext):
@@ -34,6 +36,26 @@ def stream_metrics(context: EventContext):
     return {"extra": format_extra_values(_calc_stream_metrics(context), prefix="metrics.")}
 
 
+def admission_metrics(admission: "AdmissionControl"):
+    """
+    Return event admission control counters: requests executing, waiting in queue
+    and total rejected, as a dictionary that can be used in logging
+
+    :param admission: AdmissionControl for the event
+    :return: dictionary than can be passed to logging extra= parameter
+    """
+    return {
+        "extra": format_extra_values(
+            {
+                "active": admission.active,
+                "queued": admission.queued,
+                "rejected": admission.rejected,
+            },
+            prefix="metrics.",
+        )
+    }
+
+
 def _calc_event_metrics(context: EventContext):
     duration = 1000.0 * (datetime.now(tz=timezone.utc) - context.creation_ts).total_seconds()
     return {"duration": f"{duration:.3f}"}
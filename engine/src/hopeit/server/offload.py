@@ -0,0 +1,282 @@
+"""
+Offloads CPU-heavy payload compression and deserialization to a thread or process pool,
+so large stream messages do not block the event loop
+"""
+
+import asyncio
+import struct
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type
+
+from hopeit.app.config import Compression, Serialization
+from hopeit.dataobjects import EventPayload, EventPayloadType
+from hopeit.server.compression import (
+    AutoCompression,
+    compress_timed,
+    compression_field,
+    decompress,
+    parse_compression_field,
+    register_zstd_dictionary,
+    supports_dictionary,
+)
+from hopeit.server.config import OffloadExecutor, StreamsConfig
+from hopeit.server.histograms import registry
+from hopeit.server.serialization import deserialize_sync, serialize_sync
+
+__all__ = ["PayloadCodec"]
+
+_FRAME_LENGTH = struct.Struct("!I")
+
+
+class PayloadCodec:
+    """
+    Serializes and deserializes stream payloads. Compression and deserialization of payloads
+    of `offload_threshold_bytes` or more, configured in `StreamsConfig`, run in an executor.
+    Smaller payloads are processed in the event loop, where handing off work would cost more
+    than doing it.
+
+    Time spent encoding and decoding payloads is recorded in `hopeit.server.histograms.registry`
+    labeled by operation and mode: `inline` or `offload`.
+
+    Trained zstd dictionaries configured in `compression_dictionaries` are loaded and registered
+    on creation, to be used by `dictionary_id`, `serialize` and `deserialize`.
+    Payloads encoded using `auto` compression are compressed using the method selected
+    by `AutoCompression`, configured from `auto_compression_*` settings.
+
+    `encode_batch` and `decode_batch` pack many payloads of the same datatype in a single
+    compressed blob, each serialized payload prefixed by its length as a 4-byte unsigned int.
+    """
+
+    def __init__(self, config: StreamsConfig):
+        self.threshold_bytes = config.offload_threshold_bytes
+        self.executor_type = config.offload_executor
+        self.max_workers = config.offload_max_workers
+        self.dictionaries: Dict[str, int] = {}
+        self._dictionaries_data: List[bytes] = []
+        for datatype_name, path in config.compression_dictionaries.items():
+            with open(path, "rb") as f:
+                dict_data = f.read()
+            self.dictionaries[datatype_name] = register_zstd_dictionary(dict_data)
+            self._dictionaries_data.append(dict_data)
+        self.auto_compression = AutoCompression(
+            config.auto_compression_min_bytes,
+            [Compression(codec) for codec in config.auto_compression_codecs],
+        )
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == OffloadExecutor.PROCESS:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_register_dictionaries,
+                    initargs=(self._dictionaries_data,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hopeit-offload"
+                )
+        return self._executor
+
+    def _offload(self, size: int) -> bool:
+        return 0 < self.threshold_bytes <= size
+
+    def dictionary_id(self, datatype_name: str, compression: Compression) -> int:
+        """
+        Returns id of the dictionary to compress payloads of `datatype_name`
+        using `compression`, or 0 if no dictionary applies.
+        """
+        if self.dictionaries and supports_dictionary(compression):
+            return self.dictionaries.get(datatype_name, 0)
+        return 0
+
+    async def encode(
+        self, data: EventPayload, serialization: Serialization, compression: Compression
+    ) -> Tuple[bytes, str]:
+        """
+        Serializes and compresses payload, resolving `Compression.AUTO` to a compression method
+        and using compression dictionary configured for payload datatype, if any.
+        Returns encoded payload and compression field to be sent along with it,
+        identifying compression method and dictionary used. See `decode`.
+        """
+        datatype = type(data)
+        datatype_name = f"{datatype.__module__}.{datatype.__qualname__}"
+        if compression != Compression.AUTO:
+            dict_id = self.dictionary_id(datatype_name, compression)
+            result = await self.serialize(data, serialization, compression, dict_id)
+            return result, compression_field(compression, dict_id)
+        start = time.perf_counter()
+        encoded = serialize_sync(data, serialization, Compression.NONE)
+        return await self._compress_selected(encoded, datatype_name, compression, start)
+
+    async def encode_batch(
+        self,
+        payloads: List[EventPayload],
+        serialization: Serialization,
+        compression: Compression,
+    ) -> Tuple[bytes, str]:
+        """
+        Serializes payloads of the same datatype and compresses them together in a single blob,
+        selecting compression method and dictionary as in `encode`, by datatype of first payload.
+        Returns encoded blob and compression field to be sent along with it. See `decode_batch`.
+        """
+        start = time.perf_counter()
+        datatype = type(payloads[0])
+        datatype_name = f"{datatype.__module__}.{datatype.__qualname__}"
+        frames = []
+        for payload in payloads:
+            encoded = serialize_sync(payload, serialization, Compression.NONE)
+            frames.append(_FRAME_LENGTH.pack(len(encoded)))
+            frames.append(encoded)
+        return await self._compress_selected(b"".join(frames), datatype_name, compression, start)
+
+    async def _compress_selected(
+        self, encoded: bytes, datatype_name: str, compression: Compression, start: float
+    ) -> Tuple[bytes, str]:
+        selected = compression
+        if compression == Compression.AUTO:
+            selected = self.auto_compression.select(datatype_name, len(encoded))
+        dict_id = self.dictionary_id(datatype_name, selected)
+        mode, result, seconds = await self._compress(encoded, selected, dict_id)
+        if compression == Compression.AUTO:
+            self.auto_compression.observe(
+                datatype_name, selected, len(encoded), len(result), seconds
+            )
+        registry.observe_codec("encode", mode, 1000.0 * (time.perf_counter() - start))
+        return result, compression_field(selected, dict_id)
+
+    async def decode(
+        self,
+        data: bytes,
+        serialization: Serialization,
+        comp_field: str,
+        datatype: Type[EventPayloadType],
+    ) -> EventPayload:
+        """
+        Decompresses and deserializes payload encoded using `encode`,
+        where `comp_field` is the compression field returned by `encode`.
+        """
+        compression, dict_id = parse_compression_field(comp_field)
+        return await self.deserialize(data, serialization, compression, datatype, dict_id)
+
+    async def decode_batch(
+        self,
+        data: bytes,
+        serialization: Serialization,
+        comp_field: str,
+        datatype: Type[EventPayloadType],
+    ) -> List[EventPayload]:
+        """
+        Decompresses a blob encoded using `encode_batch`, in the offload executor when received
+        size reaches threshold, and deserializes each of its payloads.
+        """
+        start = time.perf_counter()
+        compression, dict_id = parse_compression_field(comp_field)
+        mode = "inline"
+        if compression == Compression.NONE:
+            decomp = data
+        elif self._offload(len(data)):
+            mode = "offload"
+            decomp = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), decompress, data, compression, dict_id
+            )
+        else:
+            decomp = decompress(data, compression, dict_id)
+        payloads: List[EventPayload] = []
+        pos, end = 0, len(decomp)
+        while pos < end:
+            (length,) = _FRAME_LENGTH.unpack_from(decomp, pos)
+            pos += _FRAME_LENGTH.size
+            payloads.append(
+                deserialize_sync(
+                    decomp[pos : pos + length], serialization, Compression.NONE, datatype
+                )
+            )
+            pos += length
+        registry.observe_codec("decode", mode, 1000.0 * (time.perf_counter() - start))
+        return payloads
+
+    async def serialize(
+        self,
+        data: EventPayload,
+        serialization: Serialization,
+        compression: Compression,
+        dict_id: int = 0,
+    ) -> bytes:
+        """
+        Serializes payload in the event loop, and compresses it in the offload executor
+        when serialized size reaches threshold.
+        """
+        start = time.perf_counter()
+        encoded = serialize_sync(data, serialization, Compression.NONE)
+        mode, result, _ = await self._compress(encoded, compression, dict_id)
+        registry.observe_codec("encode", mode, 1000.0 * (time.perf_counter() - start))
+        return result
+
+    async def _compress(
+        self, encoded: bytes, compression: Compression, dict_id: int
+    ) -> Tuple[str, bytes, float]:
+        if compression != Compression.NONE and self._offload(len(encoded)):
+            result, seconds = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), compress_timed, encoded, compression, dict_id
+            )
+            return "offload", result, seconds
+        result, seconds = compress_timed(encoded, compression, dict_id)
+        return "inline", result, seconds
+
+    async def deserialize(
+        self,
+        data: bytes,
+        serialization: Serialization,
+        compression: Compression,
+        datatype: Type[EventPayloadType],
+        dict_id: int = 0,
+    ) -> EventPayload:
+        """
+        Decompresses and deserializes payload, in the offload executor when received size
+        reaches threshold. Using a process pool, only decompression is offloaded.
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        if not self._offload(len(data)):
+            mode = "inline"
+            payload = deserialize_sync(data, serialization, compression, datatype, dict_id)
+        elif self.executor_type == OffloadExecutor.THREAD:
+            mode = "offload"
+            payload = await loop.run_in_executor(
+                self._get_executor(),
+                deserialize_sync,
+                data,
+                serialization,
+                compression,
+                datatype,
+                dict_id,
+            )
+        elif compression != Compression.NONE:
+            mode = "offload"
+            decomp = await loop.run_in_executor(
+                self._get_executor(), decompress, data, compression, dict_id
+            )
+            payload = deserialize_sync(decomp, serialization, Compression.NONE, datatype)
+        else:
+            mode = "inline"
+            payload = deserialize_sync(data, serialization, compression, datatype)
+        registry.observe_codec("decode", mode, 1000.0 * (time.perf_counter() - start))
+        return payload
+
+    def shutdown(self) -> None:
+        """
+        Shuts down offload executor, if it was started
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _register_dictionaries(dictionaries_data: List[bytes]) -> None:
+    """
+    Registers compression dictionaries in process pool workers
+    """
+    for dict_data in dictionaries_data:
+        register_zstd_dictionary(dict_data)
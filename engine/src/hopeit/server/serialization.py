@@ -6,37 +6,59 @@ import base64
 import pickle
 from typing import Type
 
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover
+    msgpack = None  # msgpack is optional, installed with `hopeit.engine[msgpack]`
+
 from hopeit.app.config import Serialization, Compression
 
-__all__ = ["serialize", "deserialize"]
+__all__ = ["serialize", "deserialize", "serialize_sync", "deserialize_sync"]
 
 from hopeit.dataobjects import EventPayload, EventPayloadType
 from hopeit.dataobjects.payload import Payload
 from hopeit.server.compression import compress, decompress
 
 
-async def _ser_json_utf8(data: EventPayload, level: int) -> bytes:
-    return Payload.to_json(data).encode("utf-8")
+def _ser_json_utf8(data: EventPayload, level: int) -> bytes:
+    return Payload.to_json_bytes(data)
 
 
-async def _deser_json_utf8(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
-    return Payload.from_json(data.decode("utf-8"), datatype)
+def _deser_json_utf8(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
+    return Payload.from_json(data, datatype)
 
 
-async def _ser_pickle(data: EventPayload, level: int) -> bytes:
+def _ser_pickle(data: EventPayload, level: int) -> bytes:
     return pickle.dumps(data, protocol=level)
 
 
-async def _deser_pickle(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
+def _deser_pickle(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
     return pickle.loads(data)
 
 
-async def _ser_json_base64(data: EventPayload, level: int) -> bytes:
-    return base64.b64encode(await _ser_json_utf8(data, level))
+def _ser_json_base64(data: EventPayload, level: int) -> bytes:
+    return base64.b64encode(_ser_json_utf8(data, level))
+
+
+def _deser_json_base64(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
+    return _deser_json_utf8(base64.b64decode(data), datatype)
+
+
+def _msgpack_required() -> None:
+    if msgpack is None:
+        raise ImportError(
+            "msgpack serialization requires `msgpack` package: pip install hopeit.engine[msgpack]"
+        )
+
+
+def _ser_msgpack(data: EventPayload, level: int) -> bytes:
+    _msgpack_required()
+    return msgpack.packb(Payload.to_obj(data, mode="json"), use_bin_type=True)
 
 
-async def _deser_json_base64(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
-    return await _deser_json_utf8(base64.b64decode(data), datatype)
+def _deser_msgpack(data: bytes, datatype: Type[EventPayloadType]) -> EventPayload:
+    _msgpack_required()
+    return Payload.from_obj(msgpack.unpackb(data, raw=False), datatype)
 
 
 _SERDESER = {
@@ -45,23 +67,55 @@ _SERDESER = {
     Serialization.PICKLE3: (_ser_pickle, 3, _deser_pickle),
     Serialization.PICKLE4: (_ser_pickle, 4, _deser_pickle),
     Serialization.PICKLE5: (_ser_pickle, 5, _deser_pickle),
+    Serialization.MSGPACK: (_ser_msgpack, 0, _deser_msgpack),
 }
 
 
-async def serialize(
-    data: EventPayload, serialization: Serialization, compression: Compression
+def serialize_sync(
+    data: EventPayload,
+    serialization: Serialization,
+    compression: Compression,
+    dict_id: int = 0,
 ) -> bytes:
+    """
+    Serializes and compresses payload, blocking the caller.
+    Allows running serialization in an executor, see `hopeit.server.offload`
+    """
     algos = _SERDESER[serialization]
-    encoded = await algos[0](data, level=algos[1])
-    return compress(encoded, compression)
+    encoded = algos[0](data, level=algos[1])
+    return compress(encoded, compression, dict_id)
 
 
-async def deserialize(
+def deserialize_sync(
     data: bytes,
     serialization: Serialization,
     compression: Compression,
     datatype: Type[EventPayloadType],
+    dict_id: int = 0,
 ) -> EventPayload:
+    """
+    Decompresses and deserializes payload, blocking the caller.
+    Allows running deserialization in an executor, see `hopeit.server.offload`
+    """
     algos = _SERDESER[serialization]
-    decomp = decompress(data, compression)
-    return await algos[2](decomp, datatype)
+    decomp = decompress(data, compression, dict_id)
+    return algos[2](decomp, datatype)
+
+
+async def serialize(
+    data: EventPayload,
+    serialization: Serialization,
+    compression: Compression,
+    dict_id: int = 0,
+) -> bytes:
+    return serialize_sync(data, serialization, compression, dict_id)
+
+
+async def deserialize(
+    data: bytes,
+    serialization: Serialization,
+    compression: Compression,
+    datatype: Type[EventPayloadType],
+    dict_id: int = 0,
+) -> EventPayload:
+    return deserialize_sync(data, serialization, compression, datatype, dict_id)
@@ -3,6 +3,7 @@ Handling sequencing and execution of steps from events
 """
 
 import asyncio
+import time
 from datetime import datetime, timezone
 from functools import partial
 from types import ModuleType
@@ -30,6 +31,7 @@ from hopeit.app.config import (
 )
 from hopeit.app.context import EventContext
 from hopeit.dataobjects import DataObject, EventPayload, EventPayloadType, copy_payload
+from hopeit.server import histograms
 from hopeit.server.imports import find_event_handler
 from hopeit.server.logger import engine_logger, extra_logger
 from hopeit.server.names import auto_path
@@ -45,6 +47,7 @@ __all__ = [
     "extract_input_type",
     "execute_steps",
     "invoke_single_step",
+    "StepDispatchTable",
     "find_datatype_handler",
     "StepInfo",
     "split_event_stages",
@@ -62,6 +65,62 @@ StepExecutionList = List[Tuple[int, str, StepInfo]]
 logger = engine_logger()
 extra = extra_logger()
 
+NextStep = Tuple[int, Optional[Callable], bool]
+_NO_STEP: NextStep = (-1, None, False)
+
+
+class StepDispatchTable:
+    """
+    Dispatch table that resolves next step to execute for a given payload type and step index.
+
+    Entries are keyed by `(payload type, from_index)`. Entries for `None` payloads and for the
+    concrete input types declared in steps are computed on creation, other payload types
+    (i.e. subclasses or payloads matching generic `DataObject` steps) are resolved and
+    memoized the first time they are seen, so step lookup is O(1) after warm up.
+    """
+
+    def __init__(self, steps: StepExecutionList):
+        self.steps = steps
+        self.step_names: Dict[int, str] = {i: name for i, name, _ in steps}
+        self._table: Dict[Tuple[type, int], NextStep] = {}
+        self._precompute()
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def _precompute(self):
+        payload_types = {type(None)}
+        for _, _, (_, input_type, _, _) in self.steps:
+            if isinstance(input_type, type):
+                payload_types.add(input_type)
+        for payload_type in payload_types:
+            for from_index in range(len(self.steps) + 1):
+                try:
+                    self._table[payload_type, from_index] = _find_next_step_for_type(
+                        payload_type, self.steps, from_index
+                    )
+                except TypeError:
+                    # Types that cannot be checked using issubclass are resolved on invocation
+                    pass
+
+    def find_next_step(self, payload: Optional[EventPayload], from_index: int) -> NextStep:
+        """
+        Returns (step index, step function, is_iterable) for next step accepting payload,
+        starting from `from_index`. Returns (-1, None, False) if no step matches.
+        """
+        key = (type(payload), from_index)
+        next_step = self._table.get(key)
+        if next_step is None:
+            next_step = _find_next_step(payload, self.steps, from_index)
+            self._table[key] = next_step
+        return next_step
+
+
+def _dispatch_table(steps: Union[StepExecutionList, StepDispatchTable]) -> StepDispatchTable:
+    if isinstance(steps, StepDispatchTable):
+        return steps
+    return StepDispatchTable(steps)
+
 
 def extract_module_steps(impl: ModuleType) -> List[Tuple[str, Optional[StepInfo]]]:
     assert hasattr(impl, "__steps__"), f"Missing `__steps__` definition in module={impl.__name__}"
@@ -164,7 +223,7 @@ def event_and_step(event_name: str) -> Tuple[str, Optional[str]]:
 async def _execute_steps_recursion(
     payload: Optional[EventPayload],
     context: EventContext,
-    steps: StepExecutionList,
+    steps: StepDispatchTable,
     step_index: int,
     func: Optional[Callable],
     is_spawn: bool,
@@ -184,7 +243,7 @@ async def _execute_steps_recursion(
         ):
             if step_delay:
                 await asyncio.sleep(step_delay)
-            i, f, it = _find_next_step(invoke_result, steps, from_index=step_index + 1)
+            i, f, it = steps.find_next_step(invoke_result, from_index=step_index + 1)
             if i == -1:
                 yield copy_payload(invoke_result)
             else:
@@ -206,16 +265,20 @@ async def _execute_steps_recursion(
                 break
 
             # Single step invokation
+            step_start = time.perf_counter()
             invoke_result = await _invoke_step(
                 copy_payload(invoke_result),
                 f,  # type: ignore
                 context,
                 **q,
             )
+            histograms.registry.observe_step(
+                context, steps.step_names[i], 1000.0 * (time.perf_counter() - step_start)
+            )
             q = {}
             if step_delay:
                 await asyncio.sleep(step_delay)
-            i, f, it = _find_next_step(invoke_result, steps, from_index=i + 1)
+            i, f, it = steps.find_next_step(invoke_result, from_index=i + 1)
 
         if i == -1:
             # Yields result if all steps were exhausted
@@ -227,7 +290,7 @@ async def _execute_steps_recursion(
 
 
 async def execute_steps(
-    steps: StepExecutionList,
+    steps: Union[StepExecutionList, StepDispatchTable],
     *,
     context: EventContext,
     payload: Optional[EventPayload],
@@ -237,14 +300,16 @@ async def execute_steps(
     Invoke steps from a event.
     It will try to find next step in configuration order that matches input type of the payload,
     and will updated the payload and invoke next valid step.
+    `steps` can be a precomputed `StepDispatchTable` or a plain `StepExecutionList`.
     """
     start_ts = datetime.now(tz=timezone.utc)
     step_delay = context.settings.stream.step_delay / 1000.0
     throttle_ms = context.settings.stream.throttle_ms
-    i, func, is_spawn = _find_next_step(payload, steps, from_index=0)
+    dispatch = _dispatch_table(steps)
+    i, func, is_spawn = dispatch.find_next_step(payload, from_index=0)
     if i >= 0:
         async for result in _execute_steps_recursion(
-            payload, context, steps, i, func, is_spawn, step_delay, kwargs
+            payload, context, dispatch, i, func, is_spawn, step_delay, kwargs
         ):
             await _throttle(context, throttle_ms, start_ts)
             yield result
@@ -280,34 +345,44 @@ async def invoke_single_step(
 
 def _find_next_step(
     payload: Optional[EventPayload], steps: StepExecutionList, from_index: int
-) -> Tuple[int, Optional[Callable], bool]:
+) -> NextStep:
     """
     Finds next step to exectute in pending_steps list, base on the payload data type
     """
+    return _find_next_step_for_type(type(payload), steps, from_index)
+
+
+def _find_next_step_for_type(
+    payload_type: type, steps: StepExecutionList, from_index: int
+) -> NextStep:
+    """
+    Finds next step to execute in pending_steps list that accepts a payload of `payload_type`
+    """
     # Returns in case no more steps are available
     if from_index >= len(steps):
-        return -1, None, False
+        return _NO_STEP
+    is_none = payload_type is type(None)
     # Try to match specific payload datatypes incluiding None
     for i, _, step_info in steps[from_index:]:
         func, input_type, _, is_iterable = step_info
-        if input_type is None and payload is None:
+        if input_type is None and is_none:
             return i, func, is_iterable
         if (
             input_type is not None
             and input_type is not DataObject
-            and isinstance(payload, input_type)
+            and issubclass(payload_type, input_type)
         ):
             return i, func, is_iterable
     # Return if there was no match for None payload
-    if payload is None:
-        return -1, None, False
+    if is_none:
+        return _NO_STEP
     # Finally try to match generic `payload: DataObject` argument in step
     for i, _, step_info in steps[from_index:]:
         func, input_type, _, is_iterable = step_info
-        if input_type is DataObject and payload is not None:
+        if input_type is DataObject:
             return i, func, is_iterable
     # No step input datatype matches current payload
-    return -1, None, False
+    return _NO_STEP
 
 
 async def _throttle(context: EventContext, throttle_ms: int, start_ts: datetime):
@@ -336,7 +411,8 @@ def split_event_stages(
     plus sub_events with names `event_name.step_name' for each step after a SHUFFLE.
     Creates intermediate auto named write_stream, read_stream to communicate data between event and sub_events,
     clones event configuration from main event to sub_events, and setup write_stream property for final event
-    to be the one specified in configuration.
+    to be the one specified in configuration. Intermediate streams use the same number of partitions as the
+    stream read by the event, if any, so messages are processed in order in every stage.
     """
     event_stages = extract_event_stages(impl)
     if len(event_stages) == 1:
@@ -346,6 +422,7 @@ def split_event_stages(
     event_type = event_info.type
     read_stream = event_info.read_stream
     queues = ["AUTO"] if read_stream is None else read_stream.queues
+    partitions = 0 if read_stream is None else read_stream.partitions
     sub_event_name: Optional[str] = event_name
     sub_event_info = event_info
     intermediate_stream = None
@@ -357,6 +434,7 @@ def split_event_stages(
                 name=intermediate_stream,
                 consumer_group=auto_path(app.name, app.version, *event_name.split("."), stage),
                 queues=queues,
+                partitions=partitions,
             )
         intermediate_stream = auto_path(app.name, app.version, *event_name.split("."), stage)
         sub_event_info = EventDescriptor(
@@ -365,7 +443,9 @@ def split_event_stages(
             connections=event_info.connections,
             impl=event_info.impl,
             write_stream=WriteStreamDescriptor(
-                name=intermediate_stream, queue_strategy=StreamQueueStrategy.PROPAGATE
+                name=intermediate_stream,
+                queue_strategy=StreamQueueStrategy.PROPAGATE,
+                partitions=partitions,
             ),
         )
         effective_events[sub_event_name] = sub_event_info
@@ -12,6 +12,7 @@ setattr(aiohttp.http, "SERVER_SOFTWARE", "")
 
 import argparse
 import asyncio
+import dataclasses
 import gc
 import logging
 import re
@@ -19,7 +20,7 @@ import sys
 import uuid
 from datetime import datetime, timezone
 from functools import partial
-from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Callable, Coroutine, Dict, List, Mapping, Optional, Tuple, Type, Union
 
 import aiohttp_cors  # type: ignore
 from aiohttp import web
@@ -32,18 +33,21 @@ from hopeit.app.config import (  # pylint: disable=ungrouped-imports
     EventPlugMode,
     EventSettings,
     EventType,
+    ResponseStreamFormat,
     parse_app_config_json,
 )
 from hopeit.app.context import (
     EventContext,
+    EventContextTemplate,
     NoopMultiparReader,
     PostprocessHook,
     PreprocessHook,
 )
-from hopeit.app.errors import BadRequest, Unauthorized
+from hopeit.app.errors import BadRequest, ServiceUnavailable, TooManyRequests, Unauthorized
 from hopeit.dataobjects import DataObject, EventPayload, EventPayloadType
 from hopeit.dataobjects.payload import Payload
-from hopeit.server import api, runtime
+from hopeit.server import api, histograms, runtime
+from hopeit.server.cache import CachedResponse, InFlightRequests, ResponseCache
 from hopeit.server.config import AuthType, ServerConfig, parse_server_config_json
 from hopeit.server.engine import AppEngine
 from hopeit.server.errors import ErrorInfo
@@ -54,7 +58,7 @@ from hopeit.server.logger import (
     engine_logger,
     extra_logger,
 )
-from hopeit.server.metrics import metrics
+from hopeit.server.metrics import admission_metrics, metrics
 from hopeit.server.names import route_name
 from hopeit.server.steps import find_datatype_handler
 from hopeit.toolkit import auth
@@ -80,6 +84,30 @@ web_server = web.Application()
 auth_info_default: Dict[str, str] = {}
 
 
+@dataclasses.dataclass(frozen=True)
+class EventRequestPlan:
+    """
+    Per-event information compiled once when routes are setup, and reused by
+    web handlers on every request: parsed event settings and static context info,
+    authorization methods, response header names for tracked ids, and response cache
+    and in-flight requests registry when enabled.
+    """
+
+    event_name: str
+    context_template: EventContextTemplate
+    auth_methods: Tuple[AuthType, ...]
+    auth_types: Tuple[AuthType, ...]
+    track_headers: Mapping[str, str]
+    cache: Optional[ResponseCache] = None
+    in_flight: Optional[InFlightRequests] = None
+
+    def track_header(self, key: str) -> str:
+        header = self.track_headers.get(key)
+        if header is None:
+            return _track_header_name(key)
+        return header
+
+
 def prepare_engine(
     *,
     config_files: List[str],
@@ -122,6 +150,8 @@ def prepare_engine(
     # Register and add startup hooks to start configured apps
     api.register_apps(apps_config)
     api.enable_swagger(server_config, web_server)
+    if server_config.metrics.endpoint:
+        web_server.add_routes([web.get(server_config.metrics.endpoint, _metrics_handler)])
     for config in apps_config:
         web_server.on_startup.append(partial(app_startup_hook, config, enabled_groups))
 
@@ -135,6 +165,16 @@ def prepare_engine(
     gc.collect()
 
 
+async def _metrics_handler(request: web.Request) -> web.Response:
+    """
+    Returns in-process latency histograms and event counters in Prometheus text format
+    """
+    return web.Response(
+        body=histograms.registry.prometheus_text().encode(),
+        headers={"Content-Type": histograms.PROMETHEUS_CONTENT_TYPE},
+    )
+
+
 async def _shutdown_hook(app):
     logger.debug(__name__, "Calling shutdown hook...")
     await runtime.server.stop()
@@ -324,6 +364,55 @@ def _auth_types(app_engine: AppEngine, event_name: str):
     return app_engine.app_config.server.auth.default_auth_methods
 
 
+def _track_header_name(key: str) -> str:
+    return f"X-{re.sub(' ', '-', titlecase(key))}"
+
+
+def _compile_request_plan(
+    app_engine: AppEngine, impl: AppEngine, event_name: str
+) -> EventRequestPlan:
+    """
+    Computes static information used to handle requests for an event,
+    so settings validation and context info setup is not performed on every request.
+    """
+    event_settings = get_event_settings(app_engine.settings, event_name)
+    template = EventContextTemplate.create(
+        app_config=app_engine.app_config,
+        plugin_config=impl.app_config,
+        event_name=event_name,
+        settings=event_settings,
+    )
+    auth_methods = template.event_info.auth
+    if (len(auth_methods) == 0) and (app_engine.app_config.server is not None):
+        auth_methods = app_engine.app_config.server.auth.default_auth_methods
+    track_keys = (
+        "track.request_id",
+        "track.request_ts",
+        *template.track_fields,
+        "event.app",
+        "event.plugin",
+    )
+    cache, in_flight = None, None
+    if (
+        template.event_info.type == EventType.GET
+        and event_settings.response_stream == ResponseStreamFormat.NONE
+    ):
+        secured = any(auth_type != AuthType.UNSECURED for auth_type in auth_methods)
+        if event_settings.cache.ttl > 0.0:
+            cache = ResponseCache(event_settings.cache, secured=secured)
+        if event_settings.cache.coalesce:
+            in_flight = InFlightRequests(event_settings.cache, secured=secured)
+    return EventRequestPlan(
+        event_name=event_name,
+        context_template=template,
+        auth_methods=tuple(auth_methods),
+        auth_types=tuple(_auth_types(impl, event_name)),
+        track_headers={k: _track_header_name(k) for k in track_keys},
+        cache=cache,
+        in_flight=in_flight,
+    )
+
+
 def _create_post_event_route(
     app_engine: AppEngine,
     *,
@@ -349,9 +438,8 @@ def _create_post_event_route(
         _handle_post_invocation,
         app_engine,
         impl,
-        event_name,
+        _compile_request_plan(app_engine, impl, event_name),
         datatype,
-        _auth_types(impl, event_name),
     )
     setattr(handler, "__closure__", None)
     setattr(handler, "__code__", _handle_post_invocation.__code__)
@@ -381,8 +469,7 @@ def _create_get_event_route(
         _handle_get_invocation,
         app_engine,
         impl,
-        event_name,
-        _auth_types(impl, event_name),
+        _compile_request_plan(app_engine, impl, event_name),
     )
     setattr(handler, "__closure__", None)
     setattr(handler, "__code__", _handle_get_invocation.__code__)
@@ -415,9 +502,8 @@ def _create_multipart_event_route(
         _handle_multipart_invocation,
         app_engine,
         impl,
-        event_name,
+        _compile_request_plan(app_engine, impl, event_name),
         datatype,
-        _auth_types(impl, event_name),
     )
     setattr(handler, "__closure__", None)
     setattr(handler, "__code__", _handle_multipart_invocation.__code__)
@@ -456,16 +542,22 @@ def _create_event_management_routes(
 
 
 def _response(
-    *, track_ids: Dict[str, str], key: str, payload: EventPayload, hook: PostprocessHook
+    *,
+    track_ids: Dict[str, str],
+    key: str,
+    payload: EventPayload,
+    hook: PostprocessHook,
+    plan: Optional[EventRequestPlan] = None,
 ) -> ResponseType:
     """
     Creates a web response object from a given payload (body), header track ids
     and applies a postprocess hook
     """
     response: ResponseType
+    header_name = _track_header_name if plan is None else plan.track_header
     headers = {
         **hook.headers,
-        **{f"X-{re.sub(' ', '-', titlecase(k))}": v for k, v in track_ids.items()},
+        **{header_name(k): v for k, v in track_ids.items()},
     }
     if hook.file_response is not None:
         response = web.FileResponse(
@@ -475,7 +567,7 @@ def _response(
     elif hook.stream_response is not None:
         response = hook.stream_response.resp
     else:
-        serializer: Callable[..., str] = CONTENT_TYPE_BODY_SER.get(
+        serializer: Callable[..., Union[str, bytes]] = CONTENT_TYPE_BODY_SER.get(
             hook.content_type, _text_response
         )
         body = serializer(payload, key=key)
@@ -556,21 +648,12 @@ async def _execute_setup_event(
     logger.done(context, extra=metrics(context))
 
 
-def _request_start(
-    app_engine: AppEngine,
-    plugin: AppEngine,
-    event_name: str,
-    event_settings: EventSettings,
-    request: web.Request,
-) -> EventContext:
+def _request_start(plan: EventRequestPlan, request: web.Request) -> EventContext:
     """
     Extracts context and track information from a request and logs start of event
     """
-    context = EventContext(
-        app_config=app_engine.app_config,
-        plugin_config=plugin.app_config,
-        event_name=event_name,
-        settings=event_settings,
+    context = EventContext.from_template(
+        plan.context_template,
         track_ids=_track_ids(request),
         auth_info=auth_info_default,
     )
@@ -599,7 +682,7 @@ AUTH_HEADER_EXTRACTORS = {
 
 
 def _extract_authorization(
-    auth_methods: List[AuthType], request: web.Request, context: EventContext
+    auth_methods: Tuple[AuthType, ...], request: web.Request, context: EventContext
 ):
     for auth_type in auth_methods:
         auth_header = AUTH_HEADER_EXTRACTORS[auth_type](request, context)
@@ -609,9 +692,8 @@ def _extract_authorization(
 
 
 def _validate_authorization(
-    app_config: AppConfig,
+    plan: EventRequestPlan,
     context: EventContext,
-    auth_types: List[AuthType],
     request: web.Request,
 ):
     """
@@ -620,10 +702,7 @@ def _validate_authorization(
 
     :raise `Unauthorized` if authorization is not valid
     """
-    auth_methods = context.event_info.auth
-    if (len(auth_methods) == 0) and (app_config.server is not None):
-        auth_methods = app_config.server.auth.default_auth_methods
-    auth_header = _extract_authorization(auth_methods, request, context)
+    auth_header = _extract_authorization(plan.auth_methods, request, context)
 
     try:
         method, data = auth_header.split(" ")
@@ -631,7 +710,7 @@ def _validate_authorization(
         raise BadRequest("Malformed Authorization") from e
 
     context.auth_info["allowed"] = False
-    for auth_type in auth_types:
+    for auth_type in plan.auth_types:
         if method.upper() == auth_type.name.upper():
             auth.validate_auth_method(auth_type, data, context)
             if context.auth_info.get("allowed"):
@@ -639,15 +718,15 @@ def _validate_authorization(
     raise Unauthorized(method)
 
 
-def _application_json_response(result: DataObject, key: str, *args, **kwargs) -> str:
-    return Payload.to_json(result, key=key)
+def _application_json_response(result: DataObject, key: str, *args, **kwargs) -> bytes:
+    return Payload.to_json_bytes(result, key=key)
 
 
 def _text_response(result: str, *args, **kwargs) -> str:
     return str(result)
 
 
-CONTENT_TYPE_BODY_SER: Dict[str, Callable[..., str]] = {
+CONTENT_TYPE_BODY_SER: Dict[str, Callable[..., Union[str, bytes]]] = {
     "application/json": _application_json_response,
     "text/html": _text_response,
     "text/plain": _text_response,
@@ -656,7 +735,7 @@ CONTENT_TYPE_BODY_SER: Dict[str, Callable[..., str]] = {
 
 async def _request_execute(
     app_engine: AppEngine,
-    event_name: str,
+    plan: EventRequestPlan,
     context: EventContext,
     query_args: Dict[str, Any],
     payload: Optional[EventPayloadType],
@@ -670,16 +749,161 @@ async def _request_execute(
     result = await app_engine.preprocess(
         context=context, query_args=query_args, payload=payload, request=preprocess_hook
     )
+    cache_key = None
     if (preprocess_hook.status is None) or (preprocess_hook.status == 200):
-        result = await app_engine.execute(context=context, query_args=query_args, payload=result)
+        if plan.context_template.settings.response_stream != ResponseStreamFormat.NONE:
+            return await _request_execute_stream(
+                app_engine, plan, context, query_args, result, request
+            )
+        if plan.cache is not None:
+            cache_key = plan.cache.key(context, query_args, result)
+            cached = plan.cache.get(cache_key)
+            if cached is not None:
+                cached_response = _cached_response(plan, context, cached)
+                logger.done(
+                    context,
+                    extra=combined(
+                        _response_info(cached_response),
+                        metrics(context),
+                        plan.cache.metrics(hit=True),
+                    ),
+                )
+                return cached_response
+        elif plan.in_flight is not None:
+            cache_key = plan.in_flight.key(context, query_args, result)
+        if plan.in_flight is not None:
+            result = await plan.in_flight.execute(
+                cache_key,
+                partial(app_engine.execute, context=context, query_args=query_args, payload=result),
+            )
+        else:
+            result = await app_engine.execute(
+                context=context, query_args=query_args, payload=result
+            )
         result = await app_engine.postprocess(
             context=context, payload=result, response=response_hook
         )
     else:
         response_hook.set_status(preprocess_hook.status)
     response = _response(
-        track_ids=context.track_ids, key=event_name, payload=result, hook=response_hook
+        track_ids=context.track_ids,
+        key=plan.event_name,
+        payload=result,
+        hook=response_hook,
+        plan=plan,
     )
+    log_extra = [_response_info(response), metrics(context)]
+    if plan.cache is not None and cache_key is not None:
+        _cache_response(plan.cache, cache_key, response, response_hook)
+        log_extra.append(plan.cache.metrics(hit=False))
+    admission = app_engine.admission_control.get(context.event_name)
+    if admission is not None:
+        log_extra.append(admission_metrics(admission))
+    logger.done(context, extra=combined(*log_extra))
+    return response
+
+
+def _cache_response(
+    cache: ResponseCache, key: Any, response: ResponseType, hook: PostprocessHook
+) -> None:
+    """
+    Stores response in cache if it is a successful response with serialized body,
+    not setting cookies nor being a file or stream response
+    """
+    if (
+        response.status == 200
+        and isinstance(response, web.Response)
+        and isinstance(response.body, bytes)
+        and hook.file_response is None
+        and hook.stream_response is None
+        and not hook.cookies
+        and not hook.del_cookies
+    ):
+        cache.put(
+            key,
+            CachedResponse(
+                body=response.body,
+                content_type=hook.content_type,
+                headers=dict(hook.headers),
+                status=response.status,
+            ),
+        )
+
+
+def _cached_response(
+    plan: EventRequestPlan, context: EventContext, cached: CachedResponse
+) -> web.Response:
+    headers = {
+        **cached.headers,
+        **{plan.track_header(k): v for k, v in context.track_ids.items()},
+    }
+    return web.Response(
+        body=cached.body,
+        headers=headers,
+        content_type=cached.content_type,
+        status=cached.status,
+    )
+
+
+def _ndjson_item(item: EventPayload, key: str) -> bytes:
+    return Payload.to_json_bytes(item, key=key) + b"\n"
+
+
+def _sse_item(item: EventPayload, key: str) -> bytes:
+    return b"data: " + Payload.to_json_bytes(item, key=key) + b"\n\n"
+
+
+RESPONSE_STREAM_FORMATS: Dict[ResponseStreamFormat, Tuple[str, Callable[..., bytes]]] = {
+    ResponseStreamFormat.NDJSON: ("application/x-ndjson", _ndjson_item),
+    ResponseStreamFormat.SSE: ("text/event-stream", _sse_item),
+}
+
+
+async def _request_execute_stream(
+    app_engine: AppEngine,
+    plan: EventRequestPlan,
+    context: EventContext,
+    query_args: Dict[str, Any],
+    payload: Optional[EventPayloadType],
+    request: web.Request,
+) -> web.StreamResponse:
+    """
+    Executes request using engine event handler, streaming each result yield by the event
+    to the client using configured `response_stream` format. Response is prepared when the first
+    result is available, so errors before that are returned as regular error responses.
+    Writes wait for the client socket to drain, providing backpressure to the event.
+    """
+    content_type, serializer = RESPONSE_STREAM_FORMATS[
+        plan.context_template.settings.response_stream
+    ]
+    response = web.StreamResponse(
+        headers={plan.track_header(k): v for k, v in context.track_ids.items()}
+    )
+    response.content_type = content_type
+    try:
+        async for item in app_engine.execute_stream(
+            context=context, query_args=query_args, payload=payload
+        ):
+            if not response.prepared:
+                await response.prepare(request)
+            await response.write(serializer(item, key=plan.event_name))
+    except ConnectionResetError as e:
+        logger.warning(context, f"Client disconnected while streaming response: {e}")
+        logger.ignored(context)
+        return response
+    except Exception as e:  # pylint: disable=broad-except
+        if not response.prepared:
+            raise
+        logger.error(context, e)
+        logger.failed(context)
+        if plan.context_template.settings.response_stream == ResponseStreamFormat.SSE:
+            info = Payload.to_json_bytes(ErrorInfo.from_exception(e))
+            await response.write(b"event: error\ndata: " + info + b"\n\n")
+        await response.write_eof()
+        return response
+    if not response.prepared:
+        await response.prepare(request)
+    await response.write_eof()
     logger.done(context, extra=combined(_response_info(response), metrics(context)))
     return response
 
@@ -706,9 +930,8 @@ async def _request_process_payload(
 async def _handle_post_invocation(
     app_engine: AppEngine,
     impl: AppEngine,
-    event_name: str,
+    plan: EventRequestPlan,
     datatype: Optional[Type[DataObject]],
-    auth_types: List[AuthType],
     request: web.Request,
 ) -> ResponseType:
     """
@@ -716,17 +939,16 @@ async def _handle_post_invocation(
     """
     context = None
     try:
-        event_settings = get_event_settings(app_engine.settings, event_name)
-        context = _request_start(app_engine, impl, event_name, event_settings, request)
+        context = _request_start(plan, request)
         query_args = dict(request.query)
-        _validate_authorization(app_engine.app_config, context, auth_types, request)
+        _validate_authorization(plan, context, request)
         payload, payload_raw = await _request_process_payload(context, datatype, request)
         hook: PreprocessHook[NoopMultiparReader] = PreprocessHook(
             headers=request.headers, payload_raw=payload_raw
         )
         return await _request_execute(
             impl,
-            event_name,
+            plan,
             context,
             query_args,
             payload,
@@ -737,6 +959,10 @@ async def _handle_post_invocation(
         return _ignored_response(context, 401, e)
     except BadRequest as e:
         return _ignored_response(context, 400, e)
+    except TooManyRequests as e:
+        return _ignored_response(context, 429, e)
+    except ServiceUnavailable as e:
+        return _ignored_response(context, 503, e)
     except Exception as e:  # pylint: disable=broad-except
         return _failed_response(context, e)
 
@@ -744,8 +970,7 @@ async def _handle_post_invocation(
 async def _handle_get_invocation(
     app_engine: AppEngine,
     impl: AppEngine,
-    event_name: str,
-    auth_types: List[AuthType],
+    plan: EventRequestPlan,
     request: web.Request,
 ) -> ResponseType:
     """
@@ -753,9 +978,8 @@ async def _handle_get_invocation(
     """
     context = None
     try:
-        event_settings = get_event_settings(app_engine.settings, event_name)
-        context = _request_start(app_engine, impl, event_name, event_settings, request)
-        _validate_authorization(app_engine.app_config, context, auth_types, request)
+        context = _request_start(plan, request)
+        _validate_authorization(plan, context, request)
         query_args = dict(request.query)
         payload = query_args.get("payload")
         if payload is not None:
@@ -763,7 +987,7 @@ async def _handle_get_invocation(
         hook: PreprocessHook[NoopMultiparReader] = PreprocessHook(headers=request.headers)
         return await _request_execute(
             impl,
-            event_name,
+            plan,
             context,
             query_args,
             payload=payload,
@@ -774,6 +998,10 @@ async def _handle_get_invocation(
         return _ignored_response(context, 401, e)
     except BadRequest as e:
         return _ignored_response(context, 400, e)
+    except TooManyRequests as e:
+        return _ignored_response(context, 429, e)
+    except ServiceUnavailable as e:
+        return _ignored_response(context, 503, e)
     except Exception as e:  # pylint: disable=broad-except
         return _failed_response(context, e)
 
@@ -781,9 +1009,8 @@ async def _handle_get_invocation(
 async def _handle_multipart_invocation(
     app_engine: AppEngine,
     impl: AppEngine,
-    event_name: str,
+    plan: EventRequestPlan,
     datatype: Optional[Type[DataObject]],
-    auth_types: List[AuthType],
     request: web.Request,
 ) -> ResponseType:
     """
@@ -791,17 +1018,16 @@ async def _handle_multipart_invocation(
     """
     context = None
     try:
-        event_settings = get_event_settings(app_engine.settings, event_name)
-        context = _request_start(app_engine, impl, event_name, event_settings, request)
+        context = _request_start(plan, request)
         query_args = dict(request.query)
-        _validate_authorization(app_engine.app_config, context, auth_types, request)
+        _validate_authorization(plan, context, request)
         hook = PreprocessHook(  # type: ignore
             headers=request.headers,
             multipart_reader=await request.multipart(),  # type: ignore
         )
         return await _request_execute(
             impl,
-            event_name,
+            plan,
             context,
             query_args,
             payload=None,
@@ -812,6 +1038,10 @@ async def _handle_multipart_invocation(
         return _ignored_response(context, 401, e)
     except BadRequest as e:
         return _ignored_response(context, 400, e)
+    except TooManyRequests as e:
+        return _ignored_response(context, 429, e)
+    except ServiceUnavailable as e:
+        return _ignored_response(context, 503, e)
     except Exception as e:  # pylint: disable=broad-except
         return _failed_response(context, e)
 
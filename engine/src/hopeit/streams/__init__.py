@@ -4,14 +4,15 @@ Streams module. Handles reading and writing to streams.
 
 from abc import ABC
 import asyncio
-import dataclasses
 import os
 import socket
+import time
+import zlib
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
 from importlib import import_module
 
-from hopeit.app.config import Compression, Serialization
+from hopeit.app.config import Compression, Serialization, StreamEnvelope
 from hopeit.dataobjects import EventPayload
 from hopeit.server.config import AuthType, StreamsConfig
 from hopeit.server.logger import engine_logger, extra_logger
@@ -19,16 +20,87 @@ from hopeit.server.logger import engine_logger, extra_logger
 logger = engine_logger()
 extra = extra_logger()
 
-__all__ = ["StreamEvent", "StreamManager", "stream_auth_info", "StreamOSError"]
+# Message id used to claim pending messages from the first one, returned when none are left
+CLAIM_START_ID = "0-0"
+
+__all__ = [
+    "StreamEvent",
+    "StreamManager",
+    "StreamAckAggregator",
+    "StreamPartitions",
+    "stream_auth_info",
+    "stream_partition",
+    "partition_stream_name",
+    "StreamOSError",
+]
 
 
-@dataclasses.dataclass
 class StreamEvent:
-    msg_internal_id: bytes
-    queue: str
-    payload: EventPayload
-    track_ids: Dict[str, str]
-    auth_info: Dict[str, Any]
+    """
+    Event read from a stream, as returned by `StreamManager.read_stream`.
+
+    `track_ids` and `auth_info` can be provided already decoded, or decoded on first access:
+    stream managers can subclass StreamEvent keeping raw message fields and overriding
+    `_decode_track_ids` and `_decode_auth_info`, so messages that are never processed
+    do not pay for decoding them.
+
+    `packed` is the number of events read from the same stream message, sharing
+    `msg_internal_id`, when writers pack many payloads in a single message. See `pack_size`
+    in `EventStreamConfig`.
+    """
+
+    __slots__ = ("msg_internal_id", "queue", "payload", "packed", "_track_ids", "_auth_info")
+
+    def __init__(
+        self,
+        msg_internal_id: bytes,
+        queue: str,
+        payload: EventPayload,
+        track_ids: Optional[Dict[str, str]] = None,
+        auth_info: Optional[Dict[str, Any]] = None,
+        packed: int = 1,
+    ):
+        self.msg_internal_id = msg_internal_id
+        self.queue = queue
+        self.payload = payload
+        self.packed = packed
+        self._track_ids = track_ids
+        self._auth_info = auth_info
+
+    @property
+    def track_ids(self) -> Dict[str, str]:
+        if self._track_ids is None:
+            self._track_ids = self._decode_track_ids()
+        return self._track_ids
+
+    @property
+    def auth_info(self) -> Dict[str, Any]:
+        if self._auth_info is None:
+            self._auth_info = self._decode_auth_info()
+        return self._auth_info
+
+    def _decode_track_ids(self) -> Dict[str, str]:
+        return {}
+
+    def _decode_auth_info(self) -> Dict[str, Any]:
+        return {}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StreamEvent):
+            return NotImplemented
+        return (
+            self.msg_internal_id == other.msg_internal_id
+            and self.queue == other.queue
+            and self.payload == other.payload
+            and self.track_ids == other.track_ids
+            and self.auth_info == other.auth_info
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(msg_internal_id={self.msg_internal_id!r}, "
+            f"queue={self.queue!r}, payload={self.payload!r})"
+        )
 
 
 class StreamOSError(Exception):
@@ -46,6 +118,21 @@ def stream_auth_info(stream_event: StreamEvent):
     }
 
 
+def stream_partition(event_id: str, partitions: int) -> int:
+    """
+    Returns partition number, from 0 to `partitions - 1`, for a message with a given event id.
+    Uses CRC32 of event id, so every process computes the same partition.
+    """
+    return zlib.crc32(event_id.encode()) % partitions
+
+
+def partition_stream_name(stream_name: str, partition: int) -> str:
+    """
+    Returns name of the stream holding messages of a partition of `stream_name`
+    """
+    return f"{stream_name}:{partition}"
+
+
 class StreamManager(ABC):
     """
     Base class to implement stream management of a Hopeit App
@@ -68,6 +155,14 @@ class StreamManager(ABC):
         )
         return impl(address=config.connection_str)
 
+    def set_expected_consumers(self, consumers: int) -> None:
+        """
+        Informs the number of stream consumers, that is STREAM events times their read queues,
+        expected to read using this stream manager. Called before `connect()`, so stream managers
+        can size their connection pools accordingly. Default implementation ignores it.
+        :param consumers: int, number of expected consumers
+        """
+
     async def connect(self, config: StreamsConfig) -> "StreamManager":
         """
         Connects to streams service
@@ -91,6 +186,7 @@ class StreamManager(ABC):
         compression: Compression,
         serialization: Serialization,
         target_max_len: int = 0,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
     ) -> int:
         """
         Writes event to a stream
@@ -101,10 +197,110 @@ class StreamManager(ABC):
         :param compression: Compression, supported compression algorithm from enum
         :param target_max_len: int, max_len to indicate approx. target collection size
             default 0 will not send max_len to stream service.
+        :param envelope: StreamEnvelope, format used to encode message metadata, stream managers
+            not supporting compact formats can ignore it.
         :return: number of successful written messages
         """
         raise NotImplementedError()
 
+    async def write_stream_batch(
+        self,
+        *,
+        stream_name: str,
+        queue: str,
+        payloads: List[EventPayload],
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+        compression: Compression,
+        serialization: Serialization,
+        target_max_len: int = 0,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
+        pack_size: int = 0,
+    ) -> int:
+        """
+        Writes a batch of events to a stream, sharing track_ids and auth_info.
+        Default implementation calls `write_stream` for each payload, concurrently
+        when more than one payload is provided.
+        Stream managers supporting it should override this method to send the whole batch
+        to the stream service in as few round trips as possible.
+        :param stream_name: stream name or key used
+        :param payloads: List[EventPayload], dataclass objects decorated with `@dataobject`
+        :param track_ids: dict with key and id values to track in stream events
+        :param auth_info: dict with auth info to be tracked as part of stream events
+        :param compression: Compression, supported compression algorithm from enum
+        :param target_max_len: int, max_len to indicate approx. target collection size
+            default 0 will not send max_len to stream service.
+        :param envelope: StreamEnvelope, format used to encode message metadata, stream managers
+            not supporting compact formats can ignore it.
+        :param pack_size: int, max number of payloads of the same datatype to pack in a single
+            message, stream managers not supporting packing can ignore it.
+        :return: number of successful written messages
+        """
+        writes = [
+            self.write_stream(
+                stream_name=stream_name,
+                queue=queue,
+                payload=payload,
+                track_ids=track_ids,
+                auth_info=auth_info,
+                compression=compression,
+                serialization=serialization,
+                target_max_len=target_max_len,
+                envelope=envelope,
+            )
+            for payload in payloads
+        ]
+        if len(writes) == 1:
+            return await writes[0]
+        return sum(await asyncio.gather(*writes))
+
+    async def write_stream_fanout(
+        self,
+        *,
+        targets: List[Tuple[str, str]],
+        payloads: List[EventPayload],
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+        compression: Compression,
+        serialization: Serialization,
+        target_max_len: int = 0,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
+        pack_size: int = 0,
+    ) -> int:
+        """
+        Writes the same batch of events to multiple streams and queues.
+        Default implementation calls `write_stream_batch` for each target.
+        Stream managers supporting it should override this method to encode
+        every payload only once and send it to all targets in as few round trips as possible.
+        :param targets: List[Tuple[str, str]], stream name and queue name of each target
+        :param payloads: List[EventPayload], dataclass objects decorated with `@dataobject`
+        :param track_ids: dict with key and id values to track in stream events
+        :param auth_info: dict with auth info to be tracked as part of stream events
+        :param compression: Compression, supported compression algorithm from enum
+        :param target_max_len: int, max_len to indicate approx. target collection size
+            default 0 will not send max_len to stream service.
+        :param envelope: StreamEnvelope, format used to encode message metadata, stream managers
+            not supporting compact formats can ignore it.
+        :param pack_size: int, max number of payloads of the same datatype to pack in a single
+            message, stream managers not supporting packing can ignore it.
+        :return: number of successful written messages, adding up all targets
+        """
+        written = 0
+        for stream_name, queue in targets:
+            written += await self.write_stream_batch(
+                stream_name=stream_name,
+                queue=queue,
+                payloads=payloads,
+                track_ids=track_ids,
+                auth_info=auth_info,
+                compression=compression,
+                serialization=serialization,
+                target_max_len=target_max_len,
+                envelope=envelope,
+                pack_size=pack_size,
+            )
+        return written
+
     async def ensure_consumer_group(self, *, stream_name: str, consumer_group: str) -> None:
         """
         Ensures a consumer_group exists for a given stream.
@@ -151,6 +347,80 @@ class StreamManager(ABC):
         """
         raise NotImplementedError()
 
+    async def read_partitions(
+        self,
+        *,
+        stream_name: str,
+        partitions: List[int],
+        consumer_group: str,
+        datatypes: Dict[str, type],
+        track_headers: List[str],
+        offset: str,
+        batch_size: int,
+        timeout: int,
+        batch_interval: int,
+    ) -> List[Tuple[str, Union[StreamEvent, Exception]]]:
+        """
+        Reads a batch of events from partitions of a partitioned stream using a consumer group,
+        up to `batch_size` messages from each partition.
+        Default implementation calls `read_stream` concurrently for each partition.
+        Stream managers supporting it should override this method to read all partitions
+        using a single request, so partitions with no messages do not delay others.
+        :param stream_name: str, base stream name of partitioned stream, including queue suffix
+        :param partitions: List[int], partition numbers to read
+        :param consumer_group: str, consumer group name
+        :param datatypes: Dict[str, type] supported datatypes name: type to be extracted from stream.
+        :param track_headers: list of headers/id fields to extract from message if available
+        :param offset: str, last msg id consumed to resume from. Use'>' to consume unconsumed events
+        :param batch_size: max number of messages to read from each partition
+        :param timeout: time to block waiting for messages, in milliseconds
+        :param batch_interval: int, time to sleep in case no messages are returned, in milliseconds
+        :return: list of partition stream name and stream event read or decoding error
+        """
+        names = [partition_stream_name(stream_name, partition) for partition in partitions]
+        reads = await asyncio.gather(
+            *(
+                self.read_stream(
+                    stream_name=name,
+                    consumer_group=consumer_group,
+                    datatypes=datatypes,
+                    track_headers=track_headers,
+                    offset=offset,
+                    batch_size=batch_size,
+                    timeout=timeout,
+                    batch_interval=batch_interval,
+                )
+                for name in names
+            )
+        )
+        return [(name, stream_event) for name, read in zip(names, reads) for stream_event in read]
+
+    async def claim_pending(
+        self,
+        *,
+        stream_name: str,
+        consumer_group: str,
+        datatypes: Dict[str, type],
+        track_headers: List[str],
+        start_id: str,
+        batch_size: int,
+    ) -> Tuple[str, List[Union[StreamEvent, Exception]]]:
+        """
+        Claims messages read by other consumers of consumer group and not acknowledged yet,
+        returning them to be processed by this consumer. Used when a partition is assigned
+        to this consumer, so messages left by its previous consumer are processed
+        before new ones. Default implementation does not claim any message.
+        :param stream_name: str, stream name or key
+        :param consumer_group: str, consumer group name
+        :param datatypes: Dict[str, type] supported datatypes name: type to be extracted from stream.
+        :param track_headers: list of headers/id fields to extract from message if available
+        :param start_id: str, message id to start claiming from, use "0-0" to start from first
+        :param batch_size: max number of messages to claim
+        :return: message id to continue claiming from, "0-0" if no pending messages are left,
+            and stream events claimed or decoding errors
+        """
+        return CLAIM_START_ID, []
+
     async def ack_read_stream(
         self, *, stream_name: str, consumer_group: str, stream_event: StreamEvent
     ) -> None:
@@ -167,6 +437,63 @@ class StreamManager(ABC):
         """
         raise NotImplementedError()
 
+    async def ack_read_stream_batch(
+        self, *, stream_name: str, consumer_group: str, stream_events: List[StreamEvent]
+    ) -> int:
+        """
+        Acknowledges a batch of read messages from the same stream to stream service.
+        Default implementation calls `ack_read_stream` for each message.
+        Stream managers supporting it should override this method to acknowledge
+        all messages using a single request to the stream service.
+        :param stream_name: str, stream name or key
+        :param consumer_group: str, consumer group registered with stream service
+        :param stream_events: List[StreamEvent], as provided by `read_stream(...)` method
+        :return: number of acknowledged messages
+        """
+        for stream_event in stream_events:
+            await self.ack_read_stream(
+                stream_name=stream_name,
+                consumer_group=consumer_group,
+                stream_event=stream_event,
+            )
+        return len(stream_events)
+
+    async def assign_partitions(
+        self, *, stream_name: str, consumer_group: str, partitions: int, lease_ms: int
+    ) -> List[int]:
+        """
+        Assigns partitions of a partitioned stream to this consumer, for `lease_ms`
+        milliseconds, renewing partitions already assigned. Should be called periodically
+        while reading. Stream managers supporting it should share partitions among
+        active consumers of consumer group, so each partition is assigned to a single consumer.
+        Default implementation assigns all partitions, so messages of a partition are only
+        processed in order if a single consumer is running.
+        :param stream_name: str, base stream name of partitioned stream
+        :param consumer_group: str, consumer group name
+        :param partitions: int, number of partitions of the stream
+        :param lease_ms: int, time in milliseconds assignment is valid if not renewed
+        :return: list of partition numbers assigned to this consumer
+        """
+        return list(range(partitions))
+
+    async def release_partitions(
+        self,
+        *,
+        stream_name: str,
+        consumer_group: str,
+        partitions: int,
+        released: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Releases partitions assigned to this consumer using `assign_partitions`,
+        so other consumers can be assigned them without waiting their leases to expire.
+        :param stream_name: str, base stream name of partitioned stream
+        :param consumer_group: str, consumer group name
+        :param partitions: int, number of partitions of the stream
+        :param released: optional list of partition numbers to release, keeping this consumer
+            active. Default None releases all partitions and unregisters this consumer.
+        """
+
     @staticmethod
     def as_data_event(payload: EventPayload) -> EventPayload:
         """
@@ -242,6 +569,9 @@ class StreamCircuitBreaker(StreamManager):
         self.backoff = 0.0
         self.lock = asyncio.Lock()
 
+    def set_expected_consumers(self, consumers: int) -> None:
+        self.stream_manager.set_expected_consumers(consumers)
+
     async def connect(self, config: StreamsConfig) -> "StreamManager":
         await self.stream_manager.connect(config)
         return self
@@ -261,6 +591,30 @@ class StreamCircuitBreaker(StreamManager):
             asyncio.create_task(self._start_backoff_wait())
             raise
 
+    async def write_stream_batch(self, **kwargs) -> int:
+        if self.lock.locked():
+            raise StreamOSError("Stream circuit breaker open. Cannot write to stream.")
+        try:
+            res = await self.stream_manager.write_stream_batch(**kwargs)
+            self._recover()
+            return res
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+            raise
+
+    async def write_stream_fanout(self, **kwargs) -> int:
+        if self.lock.locked():
+            raise StreamOSError("Stream circuit breaker open. Cannot write to stream.")
+        try:
+            res = await self.stream_manager.write_stream_fanout(**kwargs)
+            self._recover()
+            return res
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+            raise
+
     async def read_stream(self, **kwargs) -> List[Union[StreamEvent, Exception]]:
         await self._wait_backoff()
         try:
@@ -291,6 +645,60 @@ class StreamCircuitBreaker(StreamManager):
             self._handle_failure(e)
             asyncio.create_task(self._start_backoff_wait())
 
+    async def ack_read_stream_batch(self, **kwargs) -> int:
+        await self._wait_backoff()
+        try:
+            res = await self.stream_manager.ack_read_stream_batch(**kwargs)
+            self._recover()
+            return res
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+            # Re-raised so callers keep messages pending and acknowledge them later
+            raise
+
+    async def read_partitions(self, **kwargs) -> List[Tuple[str, Union[StreamEvent, Exception]]]:
+        await self._wait_backoff()
+        try:
+            res = await self.stream_manager.read_partitions(**kwargs)
+            self._recover()
+            return res
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+            return [(kwargs["stream_name"], e)]
+
+    async def claim_pending(self, **kwargs) -> Tuple[str, List[Union[StreamEvent, Exception]]]:
+        await self._wait_backoff()
+        try:
+            res = await self.stream_manager.claim_pending(**kwargs)
+            self._recover()
+            return res
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+            return kwargs["start_id"], [e]
+
+    async def assign_partitions(self, **kwargs) -> List[int]:
+        await self._wait_backoff()
+        try:
+            res = await self.stream_manager.assign_partitions(**kwargs)
+            self._recover()
+            return res
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+            return []
+
+    async def release_partitions(self, **kwargs) -> None:
+        await self._wait_backoff()
+        try:
+            await self.stream_manager.release_partitions(**kwargs)
+            self._recover()
+        except StreamOSError as e:
+            self._handle_failure(e)
+            asyncio.create_task(self._start_backoff_wait())
+
     def _handle_failure(self, e: StreamOSError):
         """Open circuit breaker in steps when a failure occurs"""
         if self.state == 0:  # closed
@@ -326,3 +734,282 @@ class StreamCircuitBreaker(StreamManager):
         self.state = max(0, self.state - 1)  # Back from open to semi-open and later to closed
         self.num_failures = 0 if self.state == 0 else self.num_failures - 1
         self.backoff = 0 if self.state == 0 else self.initial_backoff_seconds
+
+
+class StreamAckAggregator:
+    """
+    Collects successfully processed messages read by a consumer and acknowledges them
+    in batches, using a single `ack_read_stream_batch` request per stream.
+
+    `ack` only collects messages, so acknowledging does not wait for the stream service while
+    processing an event. Pending acks are sent calling `flush_expired()`, when `max_batch_size`
+    messages are collected or `flush_interval_ms` elapsed since the first pending ack was
+    collected, or calling `flush()`, i.e. at the end of every read cycle. Messages that could not
+    be acknowledged because of failures or cancellation are kept pending to be retried on next
+    flush.
+
+    Messages containing many packed events are acknowledged once `ack` was called for all
+    of their events. If `fail` is called for any of them, message is not acknowledged.
+    """
+
+    def __init__(
+        self,
+        stream_manager: StreamManager,
+        consumer_group: str,
+        max_batch_size: int,
+        flush_interval_ms: int,
+    ) -> None:
+        self.stream_manager = stream_manager
+        self.consumer_group = consumer_group
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.pending: Dict[str, List[StreamEvent]] = {}
+        self.pending_count = 0
+        self._first_pending_ts = 0.0
+        self._packed: Dict[Tuple[str, bytes], List[int]] = {}
+
+    def ack(self, *, stream_name: str, stream_event: StreamEvent) -> None:
+        """
+        Adds a message to be acknowledged on next flush
+        """
+        if stream_event.packed > 1 and not self._packed_done(stream_name, stream_event, 0):
+            return
+        self._add_pending(stream_name, [stream_event])
+
+    def _add_pending(self, stream_name: str, stream_events: List[StreamEvent]) -> None:
+        if self.pending_count == 0:
+            self._first_pending_ts = time.monotonic()
+        self.pending.setdefault(stream_name, []).extend(stream_events)
+        self.pending_count += len(stream_events)
+
+    def fail(self, *, stream_name: str, stream_event: StreamEvent) -> None:
+        """
+        Records a message that failed to be processed. Only required for packed messages,
+        so they are not acknowledged when the rest of their events succeed.
+        """
+        if stream_event.packed > 1:
+            self._packed_done(stream_name, stream_event, 1)
+
+    def _packed_done(self, stream_name: str, stream_event: StreamEvent, failed: int) -> bool:
+        """
+        Counts a processed event of a packed message.
+        :return: True when all events were processed and none of them failed
+        """
+        key = (stream_name, stream_event.msg_internal_id)
+        state = self._packed.get(key)
+        if state is None:
+            state = self._packed[key] = [stream_event.packed, 0]
+        state[0] -= 1
+        state[1] += failed
+        if state[0] > 0:
+            return False
+        del self._packed[key]
+        return state[1] == 0
+
+    async def flush_expired(self) -> int:
+        """
+        Acknowledges all pending messages only if `max_batch_size` messages were collected
+        or `flush_interval_ms` elapsed since the first pending ack was collected
+        :return: number of acknowledged messages
+        """
+        if (self.pending_count >= self.max_batch_size) or (
+            (self.pending_count > 0)
+            and (time.monotonic() - self._first_pending_ts >= self.flush_interval)
+        ):
+            return await self.flush()
+        return 0
+
+    async def flush(self) -> int:
+        """
+        Acknowledges all pending messages, one request per stream. Messages of streams
+        failing to be acknowledged, or not acknowledged yet if flush is cancelled,
+        are kept pending.
+        :return: number of acknowledged messages
+        """
+        if self.pending_count == 0:
+            return 0
+        pending, self.pending, self.pending_count = self.pending, {}, 0
+        acked = 0
+        try:
+            while pending:
+                stream_name, stream_events = next(iter(pending.items()))
+                try:
+                    acked += await self.stream_manager.ack_read_stream_batch(
+                        stream_name=stream_name,
+                        consumer_group=self.consumer_group,
+                        stream_events=stream_events,
+                    )
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error(
+                        __name__,
+                        f"Failed to acknowledge messages stream={stream_name} count={len(stream_events)}",
+                    )
+                    logger.error(__name__, e)
+                    self._add_pending(stream_name, stream_events)
+                del pending[stream_name]
+        finally:
+            for stream_name, stream_events in pending.items():
+                self._add_pending(stream_name, stream_events)
+        return acked
+
+
+class StreamPartitions:
+    """
+    Keeps track of partitions of a partitioned stream assigned to a consumer.
+
+    Assignment is requested to stream manager on first use, and renewed every third of
+    `lease_ms`. If assignment fails, i.e. stream service is unavailable, no partitions
+    are assigned until next renewal, so this consumer does not read partitions possibly
+    assigned to others.
+
+    Partitions no longer assigned after a renewal, i.e. when other consumers join, are not
+    read anymore, but they are released only after events already read from them are
+    processed and their acknowledgements flushed, so a partition is never processed by two
+    consumers at the same time. Events read are registered calling `read(...)`
+    and `processed(...)`. When a partition is assigned, messages its previous consumer
+    left pending are claimed before reading new messages: `claims` keeps the message id
+    to continue claiming from, for each stream of a partition being claimed.
+    """
+
+    def __init__(
+        self,
+        stream_manager: StreamManager,
+        *,
+        stream_name: str,
+        consumer_group: str,
+        partitions: int,
+        lease_ms: int,
+        acks: Optional[StreamAckAggregator] = None,
+        queue_stream_names: Optional[List[str]] = None,
+    ):
+        self.stream_manager = stream_manager
+        self.stream_name = stream_name
+        self.consumer_group = consumer_group
+        self.partitions = partitions
+        self.lease_ms = lease_ms
+        self.acks = acks
+        self.assigned: List[int] = []
+        self.releasing: List[int] = []
+        self.claims: Dict[str, str] = {}
+        self._partition_streams: Dict[str, int] = {
+            partition_stream_name(name, partition): partition
+            for name in queue_stream_names or [stream_name]
+            for partition in range(partitions)
+        }
+        self._in_flight: Dict[int, int] = {}
+        self._renew_ts = 0.0
+        self._cycle = 0
+
+    async def renew(self) -> List[int]:
+        """
+        Renews assignment if a third of lease time elapsed since last renewal,
+        and releases partitions no longer assigned with no events in flight
+        :return: assigned partitions
+        """
+        now = time.monotonic()
+        if now >= self._renew_ts:
+            assigned = sorted(
+                await self.stream_manager.assign_partitions(
+                    stream_name=self.stream_name,
+                    consumer_group=self.consumer_group,
+                    partitions=self.partitions,
+                    lease_ms=self.lease_ms,
+                )
+            )
+            held = {*self.assigned, *self.releasing}
+            self.claims = {
+                name: start_id
+                for name, start_id in self.claims.items()
+                if self._partition_streams[name] in assigned
+            }
+            for name, partition in self._partition_streams.items():
+                if partition in assigned and partition not in held:
+                    self.claims[name] = CLAIM_START_ID
+            self.assigned = assigned
+            self.releasing = sorted(held.difference(assigned))
+            self._renew_ts = now + self.lease_ms / 3000.0
+        if self.releasing:
+            await self._release_idle()
+        return self.assigned
+
+    def batch_sizes(self, batch_size: int) -> List[Tuple[int, int]]:
+        """
+        Shares batch_size among assigned partitions, skipping partitions with no messages
+        left to read. First partitions to read are rotated on every call,
+        so all assigned partitions are read when batch_size is smaller than their number.
+        :return: list of partition number and max number of messages to read from it
+        """
+        assigned = self.assigned
+        if len(assigned) == 0 or batch_size <= 0:
+            return []
+        size, extra_size = divmod(batch_size, len(assigned))
+        start = self._cycle % len(assigned)
+        self._cycle += 1
+        sizes = []
+        for i in range(len(assigned)):
+            partition_size = size + (1 if i < extra_size else 0)
+            if partition_size > 0:
+                sizes.append((assigned[(start + i) % len(assigned)], partition_size))
+        return sizes
+
+    def claimed(self, stream_name: str, next_id: str) -> None:
+        """
+        Registers message id to continue claiming pending messages of a partition stream from,
+        finishing claiming when there are no pending messages left
+        """
+        if stream_name not in self.claims:
+            return
+        if next_id == CLAIM_START_ID:
+            del self.claims[stream_name]
+        else:
+            self.claims[stream_name] = next_id
+
+    def read(self, stream_events: List[Tuple[str, StreamEvent]]) -> None:
+        """Registers events read from partition streams as in flight"""
+        for stream_name, _ in stream_events:
+            partition = self._partition_streams.get(stream_name)
+            if partition is not None:
+                self._in_flight[partition] = self._in_flight.get(partition, 0) + 1
+
+    def processed(self, stream_events: List[Tuple[str, StreamEvent]]) -> None:
+        """Registers events read from partition streams as processed"""
+        for stream_name, _ in stream_events:
+            partition = self._partition_streams.get(stream_name)
+            if partition is not None and self._in_flight.get(partition, 0) > 0:
+                self._in_flight[partition] -= 1
+
+    async def _release_idle(self) -> None:
+        """
+        Releases partitions no longer assigned once their events in flight are processed
+        and acknowledged. Partitions with acknowledgements failing are kept until next call.
+        """
+        idle = [partition for partition in self.releasing if not self._in_flight.get(partition)]
+        if len(idle) == 0:
+            return
+        if self.acks is not None:
+            await self.acks.flush()
+            unacked = {self._partition_streams.get(name) for name in self.acks.pending}
+            idle = [partition for partition in idle if partition not in unacked]
+            if len(idle) == 0:
+                return
+        await self.stream_manager.release_partitions(
+            stream_name=self.stream_name,
+            consumer_group=self.consumer_group,
+            partitions=self.partitions,
+            released=idle,
+        )
+        self.releasing = [partition for partition in self.releasing if partition not in idle]
+
+    async def release(self) -> None:
+        """
+        Releases assigned partitions
+        """
+        await self.stream_manager.release_partitions(
+            stream_name=self.stream_name,
+            consumer_group=self.consumer_group,
+            partitions=self.partitions,
+        )
+        self.assigned = []
+        self.releasing = []
+        self.claims = {}
+        self._renew_ts = 0.0
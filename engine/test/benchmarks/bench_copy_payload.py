@@ -0,0 +1,85 @@
+"""
+Benchmark: per step overhead of `copy_payload` for typical nested dataobjects,
+compared with the pickle round-trip used previously for every mutable payload.
+
+Run with:
+    PYTHONPATH=engine/src python engine/test/benchmarks/bench_copy_payload.py
+"""
+
+import timeit
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from hopeit.dataobjects import _binary_copy, copy_payload, dataclass, dataobject
+
+NUMBER = 20000
+
+
+@dataobject
+@dataclass
+class Address:
+    street: str
+    city: str
+    zip_code: str
+
+
+@dataobject
+@dataclass
+class LineItem:
+    sku: str
+    quantity: int
+    price: float
+
+
+@dataobject
+@dataclass
+class Order:
+    order_id: str
+    ts: datetime
+    customer: str
+    address: Address
+    items: List[LineItem]
+    tags: List[str]
+    attributes: Dict[str, str]
+    notes: Optional[str] = None
+
+
+@dataobject
+@dataclass
+class Flat:
+    id: str
+    value: int
+    ts: datetime
+
+
+def _order(num_items: int) -> Order:
+    return Order(
+        order_id="order-1",
+        ts=datetime.now(tz=timezone.utc),
+        customer="customer-1",
+        address=Address("street", "city", "zip"),
+        items=[LineItem(f"sku-{i}", i, 1.5 * i) for i in range(num_items)],
+        tags=["a", "b", "c"],
+        attributes={"channel": "web", "priority": "high"},
+    )
+
+
+def _bench(name: str, payload: object):
+    pickle_time = timeit.timeit(lambda: _binary_copy(payload), number=NUMBER)
+    strategy_time = timeit.timeit(lambda: copy_payload(payload), number=NUMBER)
+    print(
+        f"{name:<20} pickle={1e6 * pickle_time / NUMBER:8.2f}us "
+        f"copy_payload={1e6 * strategy_time / NUMBER:8.2f}us "
+        f"speedup={pickle_time / strategy_time:5.2f}x"
+    )
+
+
+def main():
+    _bench("flat", Flat("id", 1, datetime.now(tz=timezone.utc)))
+    _bench("order 1 item", _order(1))
+    _bench("order 10 items", _order(10))
+    _bench("order 100 items", _order(100))
+
+
+if __name__ == "__main__":
+    main()
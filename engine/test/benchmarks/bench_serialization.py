@@ -0,0 +1,73 @@
+"""
+Benchmark: encoded size and serialize/deserialize time of stream payloads
+for each serialization method, comparing json with msgpack on numeric-heavy payloads.
+
+Run with:
+    PYTHONPATH=engine/src python engine/test/benchmarks/bench_serialization.py
+"""
+
+import timeit
+from datetime import datetime, timezone
+from typing import List
+
+from hopeit.app.config import Compression, Serialization
+from hopeit.dataobjects import dataclass, dataobject
+from hopeit.server.serialization import deserialize_sync, serialize_sync
+
+NUMBER = 5000
+
+
+@dataobject
+@dataclass
+class Flat:
+    id: str
+    value: int
+    ts: datetime
+
+
+@dataobject
+@dataclass
+class Sample:
+    sensor: str
+    ts: datetime
+    readings: List[float]
+    counters: List[int]
+
+
+def _sample(num_values: int) -> Sample:
+    return Sample(
+        sensor="sensor-1",
+        ts=datetime.now(tz=timezone.utc),
+        readings=[i * 0.123456789 for i in range(num_values)],
+        counters=[i * 1000 for i in range(num_values)],
+    )
+
+
+def _bench(name: str, payload: object, compression: Compression = Compression.NONE):
+    print(f"{name} compression={compression.value}")
+    datatype = type(payload)
+    for serialization in Serialization:
+        encoded = serialize_sync(payload, serialization, compression)
+        ser_time = timeit.timeit(
+            lambda: serialize_sync(payload, serialization, compression), number=NUMBER
+        )
+        deser_time = timeit.timeit(
+            lambda: deserialize_sync(encoded, serialization, compression, datatype),
+            number=NUMBER,
+        )
+        print(
+            f"  {serialization.value:<12} size={len(encoded):7d} "
+            f"serialize={1e6 * ser_time / NUMBER:8.2f}us "
+            f"deserialize={1e6 * deser_time / NUMBER:8.2f}us"
+        )
+
+
+def main():
+    _bench("flat", Flat("id", 1, datetime.now(tz=timezone.utc)))
+    _bench("sample 10 values", _sample(10))
+    _bench("sample 1000 values", _sample(1000))
+    _bench("sample 1000 values", _sample(1000), Compression.LZ4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: memory allocated and time spent per message in Redis streams consumer path,
+reading StreamEvents using `fields` and `compact` envelopes, with track_ids and auth_info
+decoded on access (as when the event is processed) and left undecoded (as when it is not).
+Redis connection is replaced by an in-memory reader returning prepared messages.
+
+Run with:
+    PYTHONPATH=engine/src:plugins/streams/redis/src \
+        python engine/test/benchmarks/bench_stream_event.py
+"""
+
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from hopeit.app.config import Compression, Serialization, StreamEnvelope
+from hopeit.dataobjects import dataclass, dataobject
+from hopeit.redis_streams import RedisStreamManager
+
+NUMBER = 10000
+REPEAT = 5
+
+TRACK_IDS = {
+    "track.operation_id": "f0a3c9e2-5b1d-4c47-9d0a-6f3b7c2e1a90",
+    "track.request_id": "7c1e2b3a-9f8d-4e6c-a5b4-3d2c1b0a9f8e",
+    "track.request_ts": "2024-05-01T12:00:00.123456+00:00",
+    "track.session_id": "session-0001",
+}
+AUTH_INFO = {"auth_type": "Bearer", "user": "user-0001"}
+
+
+@dataobject(event_id="id", event_ts="ts")
+@dataclass
+class Event:
+    id: str
+    value: int
+    ts: datetime
+
+
+async def _messages(
+    mgr: RedisStreamManager, envelope: StreamEnvelope
+) -> List[Tuple[bytes, Dict[bytes, Any]]]:
+    fields = await mgr._encode_message(
+        Event("event-1", 42, datetime.now(tz=timezone.utc)),
+        "AUTO",
+        TRACK_IDS,
+        AUTH_INFO,
+        Compression.NONE,
+        Serialization.JSON_UTF8,
+        envelope,
+    )
+    raw = {
+        (k if isinstance(k, bytes) else k.encode()): (v if isinstance(v, bytes) else v.encode())
+        for k, v in fields.items()
+    }
+    return [(f"{1700000000000 + i}-0".encode(), dict(raw)) for i in range(NUMBER)]
+
+
+class _Reader:
+    """Replaces Redis connection used by `read_stream`, returning prepared messages"""
+
+    def __init__(self, messages: List[Tuple[bytes, Dict[bytes, Any]]]):
+        self.messages = messages
+
+    async def xreadgroup(self, groupname, consumername, streams, count, block):
+        return [[b"bench_stream", self.messages]]
+
+
+async def _decode(
+    mgr: RedisStreamManager, messages: List[Tuple[bytes, Dict[bytes, Any]]], access: bool
+) -> list:
+    mgr._reader_pools[("bench_stream", "bench_group")] = _Reader(messages)  # type: ignore
+    events = await mgr.read_stream(
+        stream_name="bench_stream",
+        consumer_group="bench_group",
+        datatypes={f"{Event.__module__}.{Event.__qualname__}": Event},
+        track_headers=list(TRACK_IDS.keys()),
+        offset=">",
+        batch_size=len(messages),
+        timeout=0,
+        batch_interval=0,
+    )
+    if access:
+        for stream_event in events:
+            assert stream_event.track_ids and stream_event.auth_info
+    return events
+
+
+async def _measure(
+    mgr: RedisStreamManager, messages: List[Tuple[bytes, Dict[bytes, Any]]], access: bool
+) -> Tuple[float, float]:
+    """Returns bytes retained and microseconds spent per message"""
+    await _decode(mgr, messages[:100], access)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = await _decode(mgr, messages, access)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del events
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        await _decode(mgr, messages, access)
+        best = min(best, time.perf_counter() - start)
+    return retained / NUMBER, 1e6 * best / NUMBER
+
+
+async def main():
+    mgr = RedisStreamManager(address="redis://localhost:6379")
+    print(f"{'envelope':<10}{'track_ids':<12}{'bytes/msg':>12}{'us/msg':>10}")
+    for envelope in StreamEnvelope:
+        messages = await _messages(mgr, envelope)
+        for access in (True, False):
+            size, elapsed = await _measure(mgr, messages, access)
+            decoded = "decoded" if access else "not used"
+            print(f"{envelope.value:<10}{decoded:<12}{size:>12.0f}{elapsed:>10.2f}")
+    mgr._codec.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
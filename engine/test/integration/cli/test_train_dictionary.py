@@ -0,0 +1,57 @@
+import json
+
+from click.testing import CliRunner
+
+from hopeit.app.config import Compression
+from hopeit.cli.compression import compression
+from hopeit.server.compression import compress, decompress, register_zstd_dictionary
+
+
+def write_samples(path, n: int):
+    with open(path, "w") as f:
+        for i in range(n):
+            sample = {"id": f"id{i}", "status": ["new", "paid"][i % 2], "amount": i * 1.5}
+            f.write(json.dumps(sample) + "\n")
+
+
+def test_train_dictionary(tmp_path):
+    samples_file = tmp_path / "samples.jsonl"
+    output_file = tmp_path / "data.zdict"
+    write_samples(samples_file, 1000)
+    runner = CliRunner()
+    result = runner.invoke(
+        compression,
+        [
+            "train-dictionary",
+            f"--samples-file={samples_file}",
+            f"--output-file={output_file}",
+            "--dict-size=2048",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with open(output_file, "rb") as f:
+        dict_data = f.read()
+    dict_id = register_zstd_dictionary(dict_data)
+    assert result.output == (
+        f"Dictionary created: file={output_file} dict_id={dict_id} "
+        f"size={len(dict_data)} samples=1000\n"
+    )
+    sample = b'{"id": "id5000", "status": "paid", "amount": 7500.0}'
+    compressed = compress(sample, Compression.ZSTD, dict_id)
+    assert decompress(compressed, Compression.ZSTD, dict_id) == sample
+
+
+def test_train_dictionary_not_enough_samples(tmp_path):
+    samples_file = tmp_path / "samples.jsonl"
+    write_samples(samples_file, 2)
+    runner = CliRunner()
+    result = runner.invoke(
+        compression,
+        [
+            "train-dictionary",
+            f"--samples-file={samples_file}",
+            f"--output-file={tmp_path / 'data.zdict'}",
+        ],
+    )
+    assert result.exit_code == 1
+    assert result.output.startswith(f"Error: Cannot train dictionary from {samples_file}")
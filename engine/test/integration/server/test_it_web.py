@@ -324,6 +324,30 @@ async def call_get_mock_spawn_event(client):
     assert result == '{"value":"stream: ok.2"}'
 
 
+async def call_get_mock_spawn_event_response_stream(client):
+    res: ClientResponse = await client.get(
+        "/api/mock-app/test/mock-spawn-event-response-stream",
+        params={"payload": "ok"},
+        data=None,
+        headers={
+            "X-Track-Request-Id": "test_request_id",
+            "X-Track-Session-Id": "test_session_id",
+        },
+    )
+    assert res.status == 200
+    assert res.headers.get("Content-Type") == "application/x-ndjson"
+    assert res.headers.get("X-Track-Session-Id") == "test_session_id"
+    assert res.headers.get("X-Track-Request-Id") == "test_request_id"
+    lines = []
+    async for line in res.content:
+        lines.append(line.decode())
+    assert lines == [
+        '{"value":"stream: ok.0"}\n',
+        '{"value":"stream: ok.1"}\n',
+        '{"value":"stream: ok.2"}\n',
+    ]
+
+
 async def call_get_mock_timeout_ok(client):
     res: ClientResponse = await client.get(
         "/api/mock-app/test/mock-timeout",
@@ -604,6 +628,7 @@ async def test_endpoints(
         call_get_mock_timeout_exceeded,
         call_get_fail_request,
         call_get_mock_spawn_event,
+        call_get_mock_spawn_event_response_stream,
         call_post_mock_event,
         call_post_mock_event_preprocess,
         call_post_mock_event_preprocess_no_datatype,
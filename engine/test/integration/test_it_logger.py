@@ -1,13 +1,16 @@
+import io
 import logging
 import os
 import socket
+import threading
+import time
 import pytest  # type: ignore
 
 from hopeit.app.config import EventSettings, EventLoggingConfig
 import hopeit.server.logger as server_logging
 import hopeit.server.version as version
 from hopeit.app.context import EventContext
-from hopeit.server.config import AuthType
+from hopeit.server.config import AuthType, LoggingConfig
 from hopeit.server.events import get_event_settings
 from hopeit.server.logger import setup_app_logger
 from hopeit.app.logger import app_logger, app_extra_logger
@@ -538,3 +541,75 @@ def test_cli_logger(monkeypatch):
         == f"| ERROR | hopeit.engine {version.ENGINE_VERSION} test_cli_logger test_host test_pid "
         "| [test_cli_logger] Log message | extra.field1=value1 | extra.field2=42"
     )
+
+
+def _log_record(msg: str) -> logging.LogRecord:
+    record = logging.LogRecord("test_async_logger", logging.INFO, __file__, 0, msg, None, None)
+    record.extra = "extra.field1=value1"
+    return record
+
+
+class BlockingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.unblock = threading.Event()
+
+    def emit(self, record):
+        self.unblock.wait(timeout=5.0)
+        self.records.append(record)
+
+
+def test_async_log_writer():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s | %(message)s | %(extra)s"))
+    writer = server_logging.AsyncLogWriter(buffer_size=100, batch_size=10)
+    for i in range(25):
+        writer.enqueue([handler], _log_record(f"Log message {i}"))
+    writer.stop()
+    lines = stream.getvalue().splitlines()
+    assert lines == [f"INFO | Log message {i} | extra.field1=value1" for i in range(25)]
+    assert writer.written == 25
+    assert writer.dropped == 0
+
+
+def test_async_log_writer_dropped_records():
+    handler = BlockingHandler()
+    writer = server_logging.AsyncLogWriter(buffer_size=2, batch_size=1)
+    writer.enqueue([handler], _log_record("Log message 0"))
+    deadline = time.monotonic() + 5.0
+    while writer.queue.qsize() > 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.queue.qsize() == 0
+    for i in range(1, 6):
+        writer.enqueue([handler], _log_record(f"Log message {i}"))
+    assert writer.dropped == 3
+    handler.unblock.set()
+    writer.stop()
+    assert [r.getMessage() for r in handler.records] == [
+        "Log message 0",
+        "Log message 1",
+        "Log records dropped: async log buffer full",
+        "Log message 2",
+    ]
+    assert handler.records[2].extra == "metrics.dropped=3 | metrics.total_dropped=3"
+
+
+def test_async_logger_setup(monkeypatch):
+    _patch_logger(monkeypatch)
+    monkeypatch.setattr(server_logging, "_async_writer", None)
+    config = LoggingConfig(log_level="INFO", async_writer=True)
+    logger = server_logging._setup_standard_logger("test_async_logger_setup", config=config)
+    assert len(logger.handlers) == 1
+    async_handler = logger.handlers[0]
+    assert isinstance(async_handler, server_logging._AsyncLogHandler)
+    assert [type(h) for h in async_handler.handlers] == [MockHandler]
+    logger.info("Log message", extra={"extra": "extra.field1=value1"})
+    async_handler.writer.stop()
+    assert async_handler.writer.written == 1
+    with open(f"{FILE_BASE_PATH}/test_async_logger_setup.log") as f:
+        assert f.readlines()[-1].endswith(
+            "| INFO | test_async_logger_setup | Log message | extra.field1=value1\n"
+        )
+    logger.removeHandler(async_handler)
@@ -62,7 +62,7 @@ def mock_app_config():
             },
             "mock_write_stream_event": {
                 "logging": {"extra_fields": ["value"], "stream_fields": ["msg_id"]},
-                "stream": {"target_max_len": 10},
+                "stream": {"target_max_len": 10, "envelope": "compact"},
             },
             "mock_service_event": {
                 "stream": {"target_max_len": 10, "throttle_ms": 100, "batch_size": 2}
@@ -72,8 +72,14 @@ def mock_app_config():
             },
             "mock_service_timeout": {"response_timeout": 2.0},
             "mock_spawn_event": {
-                "stream": {"target_max_len": 10, "throttle_ms": 100, "batch_size": 2}
+                "stream": {
+                    "target_max_len": 10,
+                    "throttle_ms": 100,
+                    "batch_size": 2,
+                    "pack_size": 2,
+                }
             },
+            "mock_spawn_event_response_stream": {"response_stream": "ndjson"},
             "mock_shuffle_event": {"stream": {"target_max_len": 10, "throttle_ms": 100}},
             "mock_timeout": {"response_timeout": 2.0},
             "custom_extra_settings": {"custom_setting": {"custom": "value"}},
@@ -143,6 +149,9 @@ def mock_app_config():
                 type=EventType.GET,
                 write_stream=WriteStreamDescriptor(name="mock_write_stream_event"),
             ),
+            "mock_spawn_event_response_stream": EventDescriptor(
+                type=EventType.GET, impl="mock_app.mock_spawn_event"
+            ),
             "mock_shuffle_event": EventDescriptor(
                 type=EventType.GET,
                 write_stream=WriteStreamDescriptor(name="mock_write_stream_event"),
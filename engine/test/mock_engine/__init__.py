@@ -12,6 +12,7 @@ from hopeit.app.config import (
     EventDescriptor,
     Serialization,
     Compression,
+    StreamEnvelope,
     StreamQueue,
 )
 from hopeit.server.engine import AppEngine
@@ -154,6 +155,7 @@ class MockStreamManager(StreamManager):
 
     last_read_stream_names: List[str] = []
     last_read_queue_names: List[str] = []
+    last_read_batch_sizes: List[int] = []
 
     def __init__(self, address: str):
         self.address = address
@@ -163,7 +165,14 @@ class MockStreamManager(StreamManager):
         self.write_track_ids: Optional[Dict[str, str]] = None
         self.write_auth_info: Optional[Dict[str, Any]] = None
         self.write_target_max_len: Optional[int] = None
+        self.write_envelope: Optional[StreamEnvelope] = None
         self.write_count = 0
+        self.write_batch_sizes: List[int] = []
+        self.write_pack_sizes: List[int] = []
+        self.ack_batch_sizes: List[int] = []
+
+    def set_expected_consumers(self, consumers: int) -> None:
+        self.expected_consumers = consumers
 
     async def connect(self, settings):
         MockStreamManager.closed = False
@@ -183,6 +192,7 @@ class MockStreamManager(StreamManager):
         target_max_len: int = 0,
         compression: Compression,
         serialization: Serialization,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
     ) -> int:
         if MockEventHandler.test_track_ids:
             track_ids["track.operation_id"] = MockEventHandler.test_track_ids["track.operation_id"]
@@ -195,11 +205,17 @@ class MockStreamManager(StreamManager):
         self.write_track_ids = track_ids
         self.write_auth_info = auth_info
         self.write_target_max_len = target_max_len
+        self.write_envelope = envelope
         self.write_count += 1
         self.last_write_stream_names.append(stream_name)
         self.last_write_queue_names.append(queue)
         return 1
 
+    async def write_stream_batch(self, *, payloads: List[EventPayload], **kwargs) -> int:
+        self.write_batch_sizes.append(len(payloads))
+        self.write_pack_sizes.append(kwargs.get("pack_size", 0))
+        return await super().write_stream_batch(payloads=payloads, **kwargs)
+
     async def ensure_consumer_group(self, *, stream_name: str, consumer_group: str):
         pass
 
@@ -208,6 +224,10 @@ class MockStreamManager(StreamManager):
     ):
         return 1
 
+    async def ack_read_stream_batch(self, *, stream_events: List[StreamEvent], **kwargs) -> int:
+        self.ack_batch_sizes.append(len(stream_events))
+        return await super().ack_read_stream_batch(stream_events=stream_events, **kwargs)
+
     async def read_stream(
         self,
         *,
@@ -221,6 +241,7 @@ class MockStreamManager(StreamManager):
         batch_interval: int,
     ) -> List[Union[StreamEvent, Exception]]:
         if not MockStreamManager.closed:
+            self.last_read_batch_sizes.append(batch_size)
             MockStreamManager.last_read_message = StreamEvent(
                 msg_internal_id=b"0000000000-0",
                 queue=MockStreamManager.test_queue or stream_name.split(".")[-1],
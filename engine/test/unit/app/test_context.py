@@ -2,9 +2,18 @@ import pytest
 from unittest.mock import MagicMock
 
 from hopeit.app import context as context_mod
-from hopeit.app.context import PostprocessHook, PreprocessFileHook, PreprocessHook
+from hopeit.app.context import (
+    EventContext,
+    EventContextTemplate,
+    PostprocessHook,
+    PreprocessFileHook,
+    PreprocessHook,
+)
+from hopeit.server.events import get_event_settings
 from hopeit.testing.hooks import MockMultipartReader, MockFileHook
 
+from mock_app import mock_app_config  # type: ignore
+
 
 class MockData:
     def __init__(self):
@@ -186,3 +195,53 @@ async def test_postprocess_host_create_web_stream_response(monkeypatch):
     assert stream_response.resp.headers["X-Track2"] == "id2"
     assert stream_response.resp.data == b""
     assert hook.content_type == "test-type"
+
+
+def test_event_context_from_template(mock_app_config):
+    settings = get_event_settings(mock_app_config.effective_settings, "mock_stream_event")
+    track_ids = {
+        "track.request_id": "test_request_id",
+        "track.request_ts": "2020-02-05T17:07:37.771396+00:00",
+        "track.session_id": "test_session_id",
+        "track.not_tracked": "ignored",
+        "stream.msg_id": "test_msg_id",
+    }
+    expected = EventContext(
+        app_config=mock_app_config,
+        plugin_config=mock_app_config,
+        event_name="mock_stream_event",
+        settings=settings,
+        track_ids=track_ids,
+        auth_info={},
+    )
+    template = EventContextTemplate.create(
+        app_config=mock_app_config,
+        plugin_config=mock_app_config,
+        event_name="mock_stream_event",
+        settings=settings,
+    )
+    context = EventContext.from_template(template, track_ids=track_ids, auth_info={})
+    assert isinstance(context, EventContext)
+    assert context.app_key == expected.app_key
+    assert context.plugin_key == expected.plugin_key
+    assert context.env == expected.env
+    assert context.event_info == expected.event_info
+    assert context.settings is settings
+    assert (
+        context.track_ids
+        == expected.track_ids
+        == {
+            "track.request_id": "test_request_id",
+            "track.request_ts": "2020-02-05T17:07:37.771396+00:00",
+            "track.session_id": "test_session_id",
+            "stream.msg_id": "test_msg_id",
+            "event.app": "mock_app.test",
+        }
+    )
+    other = EventContext.from_template(template, track_ids={}, auth_info={})
+    assert other.track_ids == {"event.app": "mock_app.test"}
+    assert context.track_ids == expected.track_ids
+    context.env["request"] = {"value": "test"}
+    assert "request" not in other.env
+    assert "request" not in template.env
+    assert other.env == expected.env
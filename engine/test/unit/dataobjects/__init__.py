@@ -1,6 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, Optional
 
 from hopeit.dataobjects import dataclass, dataobject
 
@@ -66,3 +66,13 @@ class MockDataNullable:
 @dataclass
 class MockWithDecimal:
     number: Decimal
+
+
+@dataobject
+@dataclass
+class MockDataCollections:
+    id: str
+    tags: List[str]
+    items: List[MockNested]
+    counters: Dict[str, int]
+    nested: Optional[MockNested] = None
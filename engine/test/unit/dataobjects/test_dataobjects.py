@@ -1,8 +1,11 @@
 import dataclasses
+from typing import Dict, List
 from datetime import datetime, timezone
 import uuid
 
 from hopeit.dataobjects import StreamEventParams, copy_payload, dataobject
+from hopeit.dataobjects import _COPY_STRATEGIES, _binary_copy, _model_copy, _no_copy
+from pydantic import RootModel
 import pytest
 
 from . import (
@@ -12,6 +15,7 @@ from . import (
     MockDataWithAutoEventId,
     MockDataImmutable,
     MockDataUnsafe,
+    MockDataCollections,
 )
 
 
@@ -82,6 +86,50 @@ def test_copy_mutable_collection():
     assert result == test_set and result is not test_set
 
 
+def test_copy_nested_dataobject_structure():
+    now = datetime.now(tz=timezone.utc)
+    obj = MockDataCollections(
+        id="id1",
+        tags=["a", "b"],
+        items=[MockNested(now)],
+        counters={"x": 1},
+        nested=MockNested(now),
+    )
+    new = copy_payload(obj)
+    assert new == obj
+    assert type(new) is MockDataCollections
+    assert new.tags is not obj.tags
+    assert new.items is not obj.items and new.items[0] is not obj.items[0]
+    assert new.counters is not obj.counters
+    assert new.nested is not obj.nested
+    new.items[0].ts = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    new.tags.append("c")
+    assert obj.items[0].ts == now
+    assert obj.tags == ["a", "b"]
+
+
+def test_copy_strategy_is_cached_per_type():
+    now = datetime.now(tz=timezone.utc)
+    copy_payload(MockData("id1", "value1", MockNested(now)))
+    copy_payload(MockDataImmutable("id1", "value1", MockNested(now)))
+    copy_payload(MockDataUnsafe("id1", "value1", MockNested(now)))
+    copy_payload({"test": "value"})
+    copy_payload(now)
+    assert MockData in _COPY_STRATEGIES
+    assert _COPY_STRATEGIES[MockDataImmutable] is _no_copy
+    assert _COPY_STRATEGIES[MockDataUnsafe] is _no_copy
+    assert _COPY_STRATEGIES[dict] is _binary_copy
+    assert _COPY_STRATEGIES[datetime] is _no_copy
+
+
+def test_copy_pydantic_model():
+    obj = RootModel[Dict[str, List[int]]]({"items": [1, 2]})
+    new = copy_payload(obj)
+    assert new == obj
+    assert new.root["items"] is not obj.root["items"]
+    assert _COPY_STRATEGIES[type(obj)] is _model_copy
+
+
 def test_copy_native_immutable_values_should_return_same():
     test_str, test_int, test_float, test_bool = "str", 123, 123.456, True
     assert copy_payload(test_str) is test_str
@@ -5,7 +5,7 @@ import pytest
 import json
 from datetime import datetime, timezone
 
-from hopeit.dataobjects.payload import Payload
+from hopeit.dataobjects.payload import Payload, type_adapter
 
 from . import (
     MockNested,
@@ -231,6 +231,28 @@ def test_to_json_dataobject():
     )
 
 
+def test_to_json_bytes():
+    ts = datetime.fromtimestamp(0, tz=timezone.utc)
+    assert Payload.to_json_bytes(MockData(id="test", value="ok", nested=MockNested(ts=ts))) == (
+        b'{"id":"test","value":"ok","nested":{"ts":"1970-01-01T00:00:00Z"}}'
+    )
+    assert Payload.to_json_bytes("str", key="test") == b'{"test":"str"}'
+    assert Payload.to_json_bytes(["test1", "test2"]) == b'["test1","test2"]'
+    assert Payload.to_json_bytes({"test": "dict"}) == b'{"test":"dict"}'
+
+
+def test_type_adapter_cache():
+    assert type_adapter(MockData) is type_adapter(MockData)
+    assert type_adapter(List[MockData]) is type_adapter(List[MockData])
+    assert type_adapter(List[MockData]) is not type_adapter(MockData)
+    data = '[{"id":"1","value":"ok-1","nested":{"ts":"1970-01-01T00:00:00Z"}}]'
+    assert Payload.from_json(data.encode(), List[MockData]) == [
+        MockData(
+            id="1", value="ok-1", nested=MockNested(ts=datetime.fromtimestamp(0, tz=timezone.utc))
+        )
+    ]
+
+
 def test_to_obj_dataobject():
     ts = datetime.fromtimestamp(0, tz=timezone.utc)
     assert Payload.to_obj(MockData(id="test", value="ok", nested=MockNested(ts=ts))) == {
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from hopeit.app.config import EventAdmissionConfig
+from hopeit.app.errors import ServiceUnavailable, TooManyRequests
+from hopeit.server.admission import AdmissionControl
+from hopeit.server.metrics import admission_metrics
+
+
+async def _execute(admission: AdmissionControl, running: list, delay: float = 0.1):
+    async with admission.admit():
+        running.append(admission.active)
+        await asyncio.sleep(delay)
+
+
+async def test_admission_limits_concurrency():
+    admission = AdmissionControl(
+        EventAdmissionConfig(max_concurrent=2, max_queued=3, queue_timeout=5.0)
+    )
+    running: list = []
+    await asyncio.gather(*[_execute(admission, running) for _ in range(5)])
+    assert len(running) == 5
+    assert max(running) == 2
+    assert (admission.active, admission.queued, admission.rejected) == (0, 0, 0)
+
+
+async def test_admission_queue_full():
+    admission = AdmissionControl(
+        EventAdmissionConfig(max_concurrent=1, max_queued=1, queue_timeout=5.0)
+    )
+    running: list = []
+    results = await asyncio.gather(
+        *[_execute(admission, running) for _ in range(3)], return_exceptions=True
+    )
+    assert results[0] is None
+    assert results[1] is None
+    assert isinstance(results[2], TooManyRequests)
+    assert admission.rejected == 1
+    assert admission_metrics(admission) == {
+        "extra": "metrics.active=0 | metrics.queued=0 | metrics.rejected=1"
+    }
+
+
+async def test_admission_queue_timeout():
+    admission = AdmissionControl(
+        EventAdmissionConfig(max_concurrent=1, max_queued=5, queue_timeout=0.05)
+    )
+    running: list = []
+    first = asyncio.create_task(_execute(admission, running, delay=0.2))
+    await asyncio.sleep(0.01)
+    with pytest.raises(ServiceUnavailable):
+        await _execute(admission, running)
+    assert (admission.active, admission.queued, admission.rejected) == (1, 0, 1)
+    await first
+    await _execute(admission, running)
+    assert admission.active == 0
+    assert running == [1, 1]
+
+
+async def test_admission_releases_on_error():
+    admission = AdmissionControl(EventAdmissionConfig(max_concurrent=1))
+    with pytest.raises(ValueError):
+        async with admission.admit():
+            raise ValueError("Test for error")
+    async with admission.admit():
+        assert admission.active == 1
+    assert admission.active == 0
@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+from hopeit.app.config import EventCacheConfig
+from hopeit.app.context import EventContext
+from hopeit.server import cache
+from hopeit.server.cache import CachedResponse, InFlightRequests, ResponseCache
+from hopeit.server.events import get_event_settings
+
+from mock_app import mock_app_config  # type: ignore
+
+
+def _context(app_config, auth_info):
+    return EventContext(
+        app_config=app_config,
+        plugin_config=app_config,
+        event_name="mock_event",
+        settings=get_event_settings(app_config.effective_settings, "mock_event"),
+        track_ids={},
+        auth_info=auth_info,
+    )
+
+
+def _response(body: bytes) -> CachedResponse:
+    return CachedResponse(body=body, content_type="application/json", headers={}, status=200)
+
+
+def test_cache_key(mock_app_config):
+    response_cache = ResponseCache(EventCacheConfig(ttl=10.0, auth_claims=["sub"]))
+    context1 = _context(mock_app_config, {"payload": {"sub": "user1", "iat": 1}})
+    context2 = _context(mock_app_config, {"payload": {"sub": "user2", "iat": 1}})
+    key1 = response_cache.key(context1, {"a": "1", "b": "2"}, "ok")
+    assert key1 == response_cache.key(context1, {"b": "2", "a": "1"}, "ok")
+    assert key1 != response_cache.key(context1, {"a": "1", "b": "3"}, "ok")
+    assert key1 != response_cache.key(context1, {"a": "1", "b": "2"}, None)
+    assert key1 != response_cache.key(context2, {"a": "1", "b": "2"}, "ok")
+
+    no_claims_cache = ResponseCache(EventCacheConfig(ttl=10.0))
+    assert no_claims_cache.key(context1, {}, "ok") == no_claims_cache.key(context2, {}, "ok")
+
+
+def test_cache_key_secured(mock_app_config):
+    response_cache = ResponseCache(EventCacheConfig(ttl=10.0), secured=True)
+    context1 = _context(mock_app_config, {"payload": {"sub": "user1", "iat": 1}})
+    context2 = _context(mock_app_config, {"payload": {"sub": "user2", "iat": 1}})
+    context3 = _context(mock_app_config, {"payload": {"sub": "user1", "iat": 2}})
+    key1 = response_cache.key(context1, {}, "ok")
+    assert key1 != response_cache.key(context2, {}, "ok")
+    assert key1 == response_cache.key(context3, {}, "ok")
+
+    basic1 = _context(mock_app_config, {"payload": "dXNlcjE6cGFzcw=="})
+    basic2 = _context(mock_app_config, {"payload": "dXNlcjI6cGFzcw=="})
+    assert response_cache.key(basic1, {}, "ok") != response_cache.key(basic2, {}, "ok")
+
+    claims_cache = ResponseCache(EventCacheConfig(ttl=10.0, auth_claims=["tenant"]), secured=True)
+    tenant1 = _context(mock_app_config, {"payload": {"sub": "user1", "tenant": "t1"}})
+    tenant2 = _context(mock_app_config, {"payload": {"sub": "user2", "tenant": "t1"}})
+    assert claims_cache.key(tenant1, {}, "ok") == claims_cache.key(tenant2, {}, "ok")
+
+
+def test_cache_get_put_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    response_cache = ResponseCache(EventCacheConfig(ttl=10.0))
+    assert response_cache.get("k1") is None
+    response_cache.put("k1", _response(b"1"))
+    assert response_cache.get("k1") == _response(b"1")
+    now[0] = 109.9
+    assert response_cache.get("k1") == _response(b"1")
+    now[0] = 110.0
+    assert response_cache.get("k1") is None
+    assert len(response_cache) == 0
+    assert response_cache.hits == 2
+    assert response_cache.misses == 2
+
+
+def test_cache_lru_eviction():
+    response_cache = ResponseCache(EventCacheConfig(ttl=10.0, max_entries=2))
+    response_cache.put("k1", _response(b"1"))
+    response_cache.put("k2", _response(b"2"))
+    assert response_cache.get("k1") is not None
+    response_cache.put("k3", _response(b"3"))
+    assert len(response_cache) == 2
+    assert response_cache.get("k2") is None
+    assert response_cache.get("k1") == _response(b"1")
+    assert response_cache.get("k3") == _response(b"3")
+
+
+def test_cache_metrics():
+    response_cache = ResponseCache(EventCacheConfig(ttl=10.0))
+    response_cache.get("k1")
+    response_cache.put("k1", _response(b"1"))
+    response_cache.get("k1")
+    assert response_cache.metrics(hit=True) == {
+        "extra": "metrics.cache=hit | metrics.cache_hits=1 | metrics.cache_misses=1"
+    }
+
+
+class MockExecution:
+    def __init__(self, fail: bool = False):
+        self.count = 0
+        self.fail = fail
+
+    async def __call__(self):
+        self.count += 1
+        count = self.count
+        await asyncio.sleep(0.1)
+        if self.fail:
+            raise ValueError("Test for error")
+        return {"result": count}
+
+
+async def test_in_flight_requests_coalesce():
+    in_flight = InFlightRequests(EventCacheConfig(coalesce=True))
+    execution = MockExecution()
+    results = await asyncio.gather(*[in_flight.execute("k1", execution) for _ in range(5)])
+    assert results == [{"result": 1}] * 5
+    assert results[0] is not results[1]
+    assert execution.count == 1
+    assert in_flight.coalesced == 4
+    assert len(in_flight) == 0
+
+    result = await in_flight.execute("k1", execution)
+    assert result == {"result": 2}
+    assert execution.count == 2
+
+
+async def test_in_flight_requests_different_keys():
+    in_flight = InFlightRequests(EventCacheConfig(coalesce=True))
+    execution = MockExecution()
+    results = await asyncio.gather(
+        in_flight.execute("k1", execution), in_flight.execute("k2", execution)
+    )
+    assert sorted(r["result"] for r in results) == [1, 2]
+    assert in_flight.coalesced == 0
+
+
+async def test_in_flight_requests_exception():
+    in_flight = InFlightRequests(EventCacheConfig(coalesce=True))
+    execution = MockExecution(fail=True)
+    results = await asyncio.gather(
+        *[in_flight.execute("k1", execution) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    assert execution.count == 1
+    assert len(in_flight) == 0
+
+
+async def test_in_flight_requests_caller_cancelled():
+    in_flight = InFlightRequests(EventCacheConfig(coalesce=True))
+    execution = MockExecution()
+    first = asyncio.create_task(in_flight.execute("k1", execution))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(in_flight.execute("k1", execution))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == {"result": 1}
+    assert execution.count == 1
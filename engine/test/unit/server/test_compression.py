@@ -1,10 +1,21 @@
 from hopeit.app.config import Compression
-from hopeit.server.compression import compress, decompress
+from hopeit.server.compression import (
+    AutoCompression,
+    compress,
+    compression_field,
+    decompress,
+    parse_compression_field,
+    register_zstd_dictionary,
+    train_zstd_dictionary,
+)
 import zlib
 import gzip
 import bz2
+import json
 import lzma
 import lz4.frame  # type: ignore
+import pytest
+import zstandard as zstd
 
 data = bytes([65] * 1000)
 
@@ -94,3 +105,100 @@ def test_decompress():
     assert decompress(comp[Compression.LZ4_MIN], Compression.LZ4_MIN) == data
     assert decompress(comp[Compression.LZ4_MAX], Compression.LZ4_MAX) == data
     assert decompress(comp[Compression.LZMA], Compression.LZMA) == data
+
+
+def zstd_samples():
+    return [
+        json.dumps(
+            {
+                "id": f"id{i}",
+                "status": ["new", "paid", "sent"][i % 3],
+                "amount": i * 3.5,
+                "tags": ["customer", "priority", str(i % 7)],
+            }
+        ).encode()
+        for i in range(1000)
+    ]
+
+
+def test_compress_auto_not_supported():
+    with pytest.raises(ValueError):
+        compress(data, Compression.AUTO)
+    with pytest.raises(ValueError):
+        decompress(data, Compression.AUTO)
+
+
+def test_compress_zstd():
+    for compression, level in (
+        (Compression.ZSTD, 3),
+        (Compression.ZSTD_MIN, 1),
+        (Compression.ZSTD_MAX, 19),
+    ):
+        compressed = compress(data, compression)
+        assert compressed == zstd.ZstdCompressor(level=level).compress(data)
+        assert decompress(compressed, compression) == data
+
+
+def test_compress_zstd_dictionary():
+    samples = zstd_samples()
+    dict_data = train_zstd_dictionary(samples, 4096)
+    dict_id = register_zstd_dictionary(dict_data)
+    assert dict_id == zstd.ZstdCompressionDict(dict_data).dict_id()
+    compressed = compress(samples[42], Compression.ZSTD, dict_id)
+    assert len(compressed) < len(compress(samples[42], Compression.ZSTD)) / 2
+    assert decompress(compressed, Compression.ZSTD, dict_id) == samples[42]
+    with pytest.raises(ValueError):
+        compress(samples[42], Compression.LZ4, dict_id)
+    with pytest.raises(ValueError):
+        decompress(compressed, Compression.LZ4, dict_id)
+    with pytest.raises(ValueError, match="dict_id=12345"):
+        decompress(compressed, Compression.ZSTD, 12345)
+    with pytest.raises(ValueError):
+        register_zstd_dictionary(b"not a trained dictionary")
+
+
+def test_compression_field():
+    assert compression_field(Compression.ZSTD_MAX) == "zstd:19"
+    assert compression_field(Compression.ZSTD_MAX, 1234) == "zstd:19@1234"
+    assert parse_compression_field("zstd:19@1234") == (Compression.ZSTD_MAX, 1234)
+    assert parse_compression_field("lz4") == (Compression.LZ4, 0)
+    with pytest.raises(ValueError):
+        parse_compression_field("unknown@1234")
+
+
+def test_auto_compression_select():
+    auto = AutoCompression(100, [Compression.LZ4, Compression.ZIP], samples=2, resample_every=6)
+    assert auto.select("test.Data", 99) == Compression.NONE
+    sampled = []
+    for cost in (1.0, 2.0):
+        for _ in range(2):
+            compression = auto.select("test.Data", 1000)
+            sampled.append(compression)
+            ratio = 0.5 if compression == Compression.LZ4 else 0.48
+            auto.observe("test.Data", compression, 1000, int(1000 * ratio), cost)
+    assert sorted(sampled) == [Compression.LZ4, Compression.LZ4, Compression.ZIP, Compression.ZIP]
+    # Similar ratio, selects the fastest
+    assert auto.selected == {"test.Data": Compression.LZ4}
+    assert auto.select("test.Data", 1000) == Compression.LZ4
+    # Every resample_every payloads, least sampled method is sampled again
+    assert auto.select("test.Data", 1000) == Compression.LZ4
+    auto.observe("test.Data", Compression.LZ4, 1000, 500, 1.0)
+    for _ in range(5):
+        assert auto.select("test.Data", 1000) == Compression.LZ4
+    assert auto.select("test.Data", 1000) == Compression.ZIP
+
+
+def test_auto_compression_select_best_ratio():
+    auto = AutoCompression(0, [Compression.LZ4, Compression.ZIP], samples=1)
+    auto.observe("test.Data", auto.select("test.Data", 1000), 1000, 500, 0.1)
+    auto.observe("test.Data", auto.select("test.Data", 1000), 1000, 200, 1.0)
+    assert auto.selected == {"test.Data": Compression.ZIP}
+    assert auto.select("test.Data", 1000) == Compression.ZIP
+
+
+def test_auto_compression_not_compressible():
+    auto = AutoCompression(0, [Compression.LZ4, Compression.ZIP], samples=1)
+    for _ in range(2):
+        auto.observe("test.Data", auto.select("test.Data", 1000), 1000, 1010, 0.1)
+    assert auto.selected == {"test.Data": Compression.NONE}
+    assert auto.select("test.Data", 1000) == Compression.NONE
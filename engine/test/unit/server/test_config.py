@@ -56,3 +56,12 @@ def test_missing_env_var_fails(monkeypatch, valid_config_json: str):
     monkeypatch.setattr(os, "getenv", _get_env_missing_mock)
     with pytest.raises(AssertionError):
         parse_server_config_json(valid_config_json)
+
+
+def test_streams_config_auto_compression_codecs():
+    assert StreamsConfig(auto_compression_codecs=["lz4", "zstd"]).auto_compression_codecs == [
+        "lz4",
+        "zstd",
+    ]
+    with pytest.raises(ValueError):
+        StreamsConfig(auto_compression_codecs=["lz4", "auto"])
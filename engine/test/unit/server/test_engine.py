@@ -1,15 +1,22 @@
 import asyncio
+import time
 
 import pytest  # type: ignore
 from typing import Dict, Optional, List
 
 from hopeit.app.context import EventContext, PostprocessHook
+from hopeit.app.errors import ServiceUnavailable, TooManyRequests
 from hopeit.server.config import AuthType
 from hopeit.server.events import EventHandler, get_event_settings
-from hopeit.streams import StreamCircuitBreaker, StreamOSError
+from hopeit.streams import StreamCircuitBreaker, StreamEvent, StreamOSError, stream_partition
 
 from hopeit.dataobjects import DataObject
-from hopeit.app.config import AppConfig, StreamQueueStrategy
+from hopeit.app.config import (
+    AppConfig,
+    ReadStreamDescriptor,
+    StreamEnvelope,
+    StreamQueueStrategy,
+)
 from hopeit.server.engine import AppEngine
 from hopeit.testing.apps import service_running_mock
 from mock_engine import MockEventHandler, MockStreamManager
@@ -161,6 +168,14 @@ async def test_execute_provided_request_id(monkeypatch, mock_app_config, mock_pl
     await engine.stop()
 
 
+async def test_start_sets_expected_stream_consumers(mock_app_config, mock_plugin_config):
+    mock_app_config.events["mock_read_write_stream"].read_stream.queues = ["q1", "AUTO"]
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    # 6 effective STREAM events, including shuffle stages, reading from 7 queues
+    assert engine.stream_manager.stream_manager.expected_consumers == 7
+    await engine.stop()
+
+
 async def test_read_stream(monkeypatch, mock_app_config, mock_plugin_config):
     payload = MockData("ok")
     expected = MockResult("ok: ok")
@@ -511,6 +526,46 @@ async def test_read_write_stream_multiple_queues(
     await engine.stop()
 
 
+async def test_read_stream_multiple_queues_weights(
+    monkeypatch,
+    mock_app_config,
+    mock_plugin_config,
+):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "test_queue", "original")
+    monkeypatch.setattr(MockStreamManager, "last_read_batch_sizes", [])
+    monkeypatch.setattr(MockEventHandler, "test_track_ids", None)
+    read_stream = mock_app_config.events["mock_read_write_stream"].read_stream
+    read_stream.queues = ["q1", "q2"]
+    read_stream.queue_weights = {"q1": 3}
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    monkeypatch.setattr(engine, "stream_manager", MockStreamManager(address="test"))
+    start = time.monotonic()
+    res = await engine.read_stream(event_name="mock_read_write_stream", test_mode=True)
+    elapsed = time.monotonic() - start
+    assert res == expected
+    assert MockStreamManager.last_read_batch_sizes == [75, 25]
+    assert elapsed < 1.8  # queues are read concurrently, each read waits 1 second
+    await engine.stop()
+
+
+def test_read_stream_batch_sizes():
+    stream_info = ReadStreamDescriptor(
+        name="test_stream", consumer_group="test_group", queues=["q1", "q2", "AUTO"]
+    )
+    assert AppEngine._read_stream_batch_sizes(stream_info, 10, shared=False) == [10, 10, 10]
+    assert AppEngine._read_stream_batch_sizes(stream_info, 10, shared=True) == [4, 3, 3]
+    stream_info.queue_weights = {"q2": 3}
+    assert AppEngine._read_stream_batch_sizes(stream_info, 10, shared=True) == [2, 6, 2]
+    assert AppEngine._read_stream_batch_sizes(stream_info, 2, shared=True) == [1, 1, 0]
+    assert AppEngine._read_stream_batch_sizes(stream_info, 1, shared=True) == [0, 1, 0]
+
+
 async def test_read_write_stream_multiple_queues_propagate(
     monkeypatch,
     mock_app_config,
@@ -752,6 +807,238 @@ async def test_read_stream_stop_and_recover(monkeypatch, mock_app_config, mock_p
     await engine.stop()
 
 
+async def test_read_stream_batched_acks(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None, TypeError(), None, None])
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", test_mode=True)
+    assert res == expected
+    assert stream_manager.ack_batch_sizes == [3]
+    await engine.stop()
+
+
+class SlowAckStreamManager(MockStreamManager):
+    async def ack_read_stream_batch(self, **kwargs) -> int:
+        await asyncio.sleep(1.0)
+        return await super().ack_read_stream_batch(**kwargs)
+
+
+async def test_read_stream_slow_acks_outside_timeout(
+    monkeypatch, mock_app_config, mock_plugin_config
+):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None, None])
+    mock_app_config.settings["mock_stream_event"]["stream"] = {
+        "timeout": 0.5,
+        "ack_batch_size": 1,
+    }
+    mock_app_config.setup()
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = SlowAckStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", test_mode=True)
+    assert res == expected
+    assert stream_manager.ack_batch_sizes == [2]
+    await engine.stop()
+
+
+async def test_read_stream_partitions(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None, None])
+    monkeypatch.setattr(MockStreamManager, "last_read_stream_names", [])
+    monkeypatch.setattr(MockStreamManager, "last_read_batch_sizes", [])
+    read_stream = mock_app_config.events["mock_stream_event"].read_stream
+    read_stream.partitions = 2
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", test_mode=True)
+    assert res == expected
+    assert sorted(set(MockStreamManager.last_read_stream_names)) == [
+        f"{read_stream.name}:0",
+        f"{read_stream.name}:1",
+    ]
+    assert MockStreamManager.last_read_batch_sizes == [50, 50]
+    assert stream_manager.ack_batch_sizes == [2, 2]
+    await engine.stop()
+
+
+async def test_read_stream_partitions_claim_pending(
+    monkeypatch, mock_app_config, mock_plugin_config
+):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None, None])
+    monkeypatch.setattr(MockStreamManager, "last_read_stream_names", [])
+    monkeypatch.setattr(MockStreamManager, "last_read_batch_sizes", [])
+    claims = []
+
+    async def claim_pending(self, *, stream_name: str, start_id: str, **kwargs):
+        claims.append((stream_name, start_id))
+        if stream_name.endswith(":0"):
+            claimed = StreamEvent(
+                msg_internal_id=b"0000000000-1",
+                queue=MockStreamManager.test_queue,
+                payload=payload,
+                track_ids=MockStreamManager.test_track_ids,
+                auth_info=MockStreamManager.test_auth_info,
+            )
+            return "0000000000-1", [claimed]
+        return "0-0", []
+
+    monkeypatch.setattr(MockStreamManager, "claim_pending", claim_pending)
+    read_stream = mock_app_config.events["mock_stream_event"].read_stream
+    read_stream.partitions = 2
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", test_mode=True)
+    assert res == expected
+    assert claims == [(f"{read_stream.name}:0", "0-0"), (f"{read_stream.name}:1", "0-0")]
+    # Partition 0 has pending messages left to claim, so new messages are read only from 1
+    assert MockStreamManager.last_read_stream_names == [f"{read_stream.name}:1"] * 2
+    assert MockStreamManager.last_read_batch_sizes == [99]
+    assert sorted(stream_manager.ack_batch_sizes) == [1, 2]
+    await engine.stop()
+
+
+async def test_read_stream_prefetch(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None, TypeError(), None, None])
+    mock_app_config.settings["mock_stream_event"]["stream"] = {"consumer_mode": "prefetch"}
+    mock_app_config.setup()
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", test_mode=True)
+    assert res == expected
+    assert stream_manager.ack_batch_sizes == [3]
+    assert not engine._running["mock_stream_event"].locked()
+    await engine.stop()
+
+
+async def test_read_stream_prefetch_max_events(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    mock_app_config.settings["mock_stream_event"]["stream"] = {
+        "consumer_mode": "prefetch",
+        "batch_size": 1,
+        "max_in_flight": 2,
+    }
+    mock_app_config.setup()
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", max_events=3)
+    assert res == expected
+    assert stream_manager.ack_batch_sizes == [1, 1, 1]
+    assert not engine._running["mock_stream_event"].locked()
+    await engine.stop()
+
+
+async def test_read_stream_prefetch_cancel_full_queue(
+    monkeypatch, mock_app_config, mock_plugin_config
+):
+    payload = MockData("timeout")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None])
+    mock_app_config.settings["mock_stream_event"]["stream"] = {
+        "consumer_mode": "prefetch",
+        "batch_size": 2,
+        "max_in_flight": 4,
+        "timeout": 10.0,
+    }
+    monkeypatch.setattr(mock_app_config.engine, "read_stream_timeout", 0)
+    mock_app_config.setup()
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    tasks = asyncio.all_tasks()
+    read_task = asyncio.create_task(engine.read_stream(event_name="mock_stream_event"))
+    await asyncio.sleep(0.5)
+    read_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(read_task, timeout=1.0)
+    assert [task for task in asyncio.all_tasks() - tasks if not task.done()] == []
+    await engine.stop()
+
+
+async def test_read_stream_continuous(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockStreamManager, "error_pattern", [None, TypeError(), None, None])
+    mock_app_config.settings["mock_stream_event"]["stream"] = {"consumer_mode": "continuous"}
+    mock_app_config.setup()
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", test_mode=True)
+    assert res == expected
+    assert stream_manager.ack_batch_sizes == [3]
+    assert not engine._running["mock_stream_event"].locked()
+    await engine.stop()
+
+
+async def test_read_stream_continuous_max_events(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("ok")
+    expected = MockResult("ok: ok")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    mock_app_config.settings["mock_stream_event"]["stream"] = {
+        "consumer_mode": "continuous",
+        "batch_size": 2,
+        "max_in_flight": 2,
+        "ack_batch_size": 1,
+    }
+    mock_app_config.setup()
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    res = await engine.read_stream(event_name="mock_stream_event", max_events=3)
+    assert res == expected
+    assert stream_manager.ack_batch_sizes == [1, 1, 1]
+    assert not engine._running["mock_stream_event"].locked()
+    await engine.stop()
+
+
 async def test_read_stream_failed(monkeypatch, mock_app_config, mock_plugin_config):
     payload = MockData("fail")
     setup_mocks(monkeypatch)
@@ -795,6 +1082,7 @@ async def test_write_stream(monkeypatch, mock_app_config, mock_plugin_config):
     assert stream_manager.write_stream_name == event_info.write_stream.name
     assert stream_manager.write_stream_payload == expected
     assert stream_manager.write_target_max_len == 10
+    assert stream_manager.write_envelope == StreamEnvelope.COMPACT
     await engine.stop()
 
 
@@ -826,6 +1114,92 @@ async def test_write_stream_batch(monkeypatch, mock_app_config, mock_plugin_conf
     assert stream_manager.write_stream_name == event_info.write_stream.name
     assert stream_manager.write_stream_payload == expected
     assert stream_manager.write_target_max_len == 10
+    assert stream_manager.write_batch_sizes == [1]
+    assert stream_manager.write_pack_sizes == [2]
+    assert stream_manager.write_count == 1
+    assert stream_manager.write_envelope == StreamEnvelope.FIELDS
+    await engine.stop()
+
+
+async def test_write_stream_partitions(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = "ok"
+    expected = MockData("stream: ok.3")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "test_track_ids", None)
+    write_stream = mock_app_config.events["mock_spawn_event"].write_stream
+    write_stream.partitions = 4
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    await invoke_execute(
+        engine=engine,
+        from_app=engine.app_config,
+        event_name="mock_spawn_event",
+        query_args={},
+        payload=payload,
+        expected=expected,
+        track_ids={
+            "track.request_id": "test_request_id",
+            "track.request_ts": "2020-02-05T17:07:37.771396+00:00",
+            "track.session_id": "test_session_id",
+        },
+    )
+    partition = stream_partition(expected.value, 4)
+    assert stream_manager.write_stream_name == f"{write_stream.name}:{partition}"
+    assert stream_manager.write_stream_payload == expected
+    await engine.stop()
+
+
+async def test_execute_stream(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = "ok"
+    expected = MockData("stream: ok.3")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", expected)
+    monkeypatch.setattr(MockEventHandler, "call_function", lambda p, c: MockData("stream: ok.1"))
+    monkeypatch.setattr(MockStreamManager, "test_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "test_track_ids", None)
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    stream_manager = MockStreamManager(address="test")
+    monkeypatch.setattr(engine, "stream_manager", stream_manager)
+    context = EventContext(
+        app_config=mock_app_config,
+        plugin_config=mock_app_config,
+        event_name="mock_spawn_event",
+        settings=get_event_settings(mock_app_config.effective_settings, "mock_spawn_event"),
+        track_ids={},
+        auth_info={},
+    )
+    results = [
+        item
+        async for item in engine.execute_stream(context=context, query_args={}, payload=payload)
+    ]
+    assert results == [MockData("stream: ok.1"), expected]
+    assert stream_manager.write_stream_payload == expected
+    await engine.stop()
+
+
+async def test_execute_stream_timeout(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("timeout")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", payload)
+    monkeypatch.setattr(MockEventHandler, "test_track_ids", None)
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    context = EventContext(
+        app_config=mock_app_config,
+        plugin_config=mock_app_config,
+        event_name="mock_timeout",
+        settings=get_event_settings(mock_app_config.effective_settings, "mock_timeout"),
+        track_ids={},
+        auth_info={},
+    )
+    with pytest.raises(asyncio.TimeoutError):
+        async for _ in engine.execute_stream(context=context, query_args={}, payload=payload):
+            pass
     await engine.stop()
 
 
@@ -872,7 +1246,7 @@ async def test_start_single_group(monkeypatch, mock_app_config, mock_plugin_conf
         plugin=mock_plugin_config,
         enabled_groups=["GROUP_A"],
     )
-    assert len(engine.effective_events) == 27
+    assert len(engine.effective_events) == 28
     assert all(
         event_name in engine.effective_events
         for event_name in [
@@ -896,7 +1270,7 @@ async def test_start_multiple_groups(monkeypatch, mock_app_config, mock_plugin_c
         plugin=mock_plugin_config,
         enabled_groups=["GROUP_A", "GROUP_B"],
     )
-    assert len(engine.effective_events) == 29
+    assert len(engine.effective_events) == 30
     assert all(
         event_name in engine.effective_events
         for event_name in [
@@ -922,8 +1296,8 @@ async def test_start_default_group(monkeypatch, mock_app_config, mock_plugin_con
         plugin=mock_plugin_config,
         enabled_groups=["DEFAULT"],
     )
-    # Checking count it should be 21 events + 2 split events == 23
-    assert len(engine.effective_events) == 23
+    # Checking count it should be 22 events + 2 split events == 24
+    assert len(engine.effective_events) == 24
     assert all(
         event_name not in engine.effective_events
         for event_name in [
@@ -938,3 +1312,39 @@ async def test_start_default_group(monkeypatch, mock_app_config, mock_plugin_con
         for event_name, event_info in mock_app_config.events.items()
         if event_info.group == "DEFAULT"
     )
+
+
+async def test_execute_admission_control(monkeypatch, mock_app_config, mock_plugin_config):
+    payload = MockData("timeout")
+    setup_mocks(monkeypatch)
+    monkeypatch.setattr(MockEventHandler, "input_payload", payload)
+    monkeypatch.setattr(MockEventHandler, "expected_result", payload)
+    monkeypatch.setattr(MockEventHandler, "test_track_ids", None)
+    monkeypatch.setitem(
+        mock_app_config.effective_settings,
+        "mock_timeout",
+        {
+            "response_timeout": 0.5,
+            "admission": {"max_concurrent": 1, "max_queued": 1, "queue_timeout": 0.1},
+        },
+    )
+    engine = await create_engine(app_config=mock_app_config, plugin=mock_plugin_config)
+    assert list(engine.admission_control.keys()) == ["mock_timeout"]
+    context = EventContext(
+        app_config=mock_app_config,
+        plugin_config=mock_app_config,
+        event_name="mock_timeout",
+        settings=get_event_settings(engine.settings, "mock_timeout"),
+        track_ids={},
+        auth_info={},
+    )
+    results = await asyncio.gather(
+        *[engine.execute(context=context, query_args={}, payload=payload) for _ in range(3)],
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], asyncio.TimeoutError)
+    assert isinstance(results[1], ServiceUnavailable)
+    assert isinstance(results[2], TooManyRequests)
+    admission = engine.admission_control["mock_timeout"]
+    assert (admission.active, admission.queued, admission.rejected) == (0, 0, 2)
+    await engine.stop()
@@ -0,0 +1,106 @@
+import datetime
+
+from hopeit.app.context import EventContext
+from hopeit.server import histograms
+from hopeit.server.events import get_event_settings
+from hopeit.server.histograms import BUCKET_BOUNDS_MS, LatencyHistogram, MetricsRegistry
+from hopeit.server.logger import engine_logger
+
+from mock_app import mock_app_config  # type: ignore
+
+
+def _context(app_config):
+    return EventContext(
+        app_config=app_config,
+        plugin_config=app_config,
+        event_name="mock_event",
+        settings=get_event_settings(app_config.effective_settings, "mock_event"),
+        track_ids={},
+        auth_info={},
+    )
+
+
+def test_bucket_bounds():
+    assert BUCKET_BOUNDS_MS[0] == 0.125
+    assert list(BUCKET_BOUNDS_MS[:5]) == [0.125, 0.15625, 0.1875, 0.21875, 0.25]
+    assert list(BUCKET_BOUNDS_MS) == sorted(BUCKET_BOUNDS_MS)
+    for lower, upper in zip(BUCKET_BOUNDS_MS, BUCKET_BOUNDS_MS[1:]):
+        assert upper / lower <= 1.25
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50.0) == 0.0
+    for value in range(1, 101):
+        histogram.observe(float(value))
+    assert histogram.count == 100
+    assert histogram.sum == 5050.0
+    assert histogram.percentile(50.0) == 56.0
+    assert histogram.percentile(99.0) == 112.0
+    assert 99.0 <= histogram.percentile(99.0) <= 1.25 * 99.0
+    histogram.observe(1e9)
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(100.0) == float("inf")
+
+
+def test_observe_event(monkeypatch, mock_app_config):
+    registry = MetricsRegistry()
+    context = _context(mock_app_config)
+    context.track_ids["stream.submit_ts"] = "2020-01-01T00:00:00+00:00"
+    context.track_ids["stream.read_ts"] = "2020-01-01T00:00:01.500000+00:00"
+    context.creation_ts = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
+        milliseconds=10
+    )
+    registry.observe_event(context, "done")
+    registry.observe_event(_context(mock_app_config), "failed")
+    key = ("mock_app.test", "mock_event")
+    assert registry.events == {
+        ("mock_app.test", "mock_event", "done"): 1,
+        ("mock_app.test", "mock_event", "failed"): 1,
+    }
+    assert registry.event_duration[key].count == 2
+    assert registry.event_duration[key].sum >= 10.0
+    assert registry.stream_age[key].count == 1
+    assert registry.stream_age[key].sum == 1500.0
+
+    registry.observe_step(context, "step1", 2.0)
+    assert registry.step_duration[("mock_app.test", "mock_event", "step1")].count == 1
+
+
+def test_prometheus_text(mock_app_config):
+    registry = MetricsRegistry()
+    context = _context(mock_app_config)
+    registry.observe_step(context, "step1", 0.2)
+    registry.observe_step(context, "step1", 3000.0)
+    registry.observe_event(context, "done")
+    text = registry.prometheus_text()
+    lines = text.splitlines()
+    assert "# TYPE hopeit_event_duration_seconds histogram" in lines
+    assert 'hopeit_events_total{app="mock_app.test",event="mock_event",status="done"} 1' in lines
+    labels = 'app="mock_app.test",event="mock_event",step="step1"'
+    assert f'hopeit_step_duration_seconds_bucket{{{labels},le="0.000125"}} 0' in lines
+    assert f'hopeit_step_duration_seconds_bucket{{{labels},le="0.00021875"}} 1' in lines
+    assert f'hopeit_step_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"hopeit_step_duration_seconds_sum{{{labels}}} 3.0002" in lines
+    assert f"hopeit_step_duration_seconds_count{{{labels}}} 2" in lines
+    assert "# TYPE hopeit_stream_age_seconds histogram" in lines
+    assert text.endswith("\n")
+
+    registry.clear()
+    assert "hopeit_step_duration_seconds_count" not in registry.prometheus_text()
+
+
+def test_logger_observes_events(monkeypatch, mock_app_config):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(histograms, "registry", registry)
+    context = _context(mock_app_config)
+    wrapper = engine_logger()
+    monkeypatch.setattr(wrapper, "info", lambda *args, **kwargs: None)
+    monkeypatch.setattr(wrapper, "warning", lambda *args, **kwargs: None)
+    wrapper.done(context)
+    wrapper.ignored(context)
+    wrapper.done(context)
+    assert registry.events == {
+        ("mock_app.test", "mock_event", "done"): 2,
+        ("mock_app.test", "mock_event", "ignored"): 1,
+    }
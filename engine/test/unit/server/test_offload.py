@@ -0,0 +1,172 @@
+import uuid
+
+import pytest
+
+from hopeit.app.config import Compression, Serialization
+from hopeit.dataobjects import dataclass, dataobject
+from hopeit.dataobjects.payload import Payload
+from hopeit.server.compression import train_zstd_dictionary
+from hopeit.server.config import OffloadExecutor, StreamsConfig
+from hopeit.server.histograms import registry
+from hopeit.server.offload import PayloadCodec
+from hopeit.server.serialization import serialize
+
+
+@dataobject
+@dataclass
+class Data:
+    x: str
+    y: int
+
+
+small = Data("data", 42)
+large = Data("data" * 1000, 42)
+
+
+def codec_counts():
+    return {key: histogram.count for key, histogram in registry.codec_duration.items()}
+
+
+async def test_inline_when_offload_disabled():
+    registry.clear()
+    codec = PayloadCodec(StreamsConfig())
+    encoded = await codec.serialize(large, Serialization.JSON_UTF8, Compression.GZIP)
+    assert encoded == await serialize(large, Serialization.JSON_UTF8, Compression.GZIP)
+    decoded = await codec.deserialize(encoded, Serialization.JSON_UTF8, Compression.GZIP, Data)
+    assert decoded == large
+    assert codec._executor is None
+    assert codec_counts() == {("encode", "inline"): 1, ("decode", "inline"): 1}
+    codec.shutdown()
+
+
+@pytest.mark.parametrize("executor", [OffloadExecutor.THREAD, OffloadExecutor.PROCESS])
+async def test_offload_above_threshold(executor):
+    registry.clear()
+    codec = PayloadCodec(
+        StreamsConfig(
+            offload_threshold_bytes=1000, offload_executor=executor, offload_max_workers=1
+        )
+    )
+    for payload in (small, large):
+        encoded = await codec.serialize(payload, Serialization.JSON_BASE64, Compression.LZMA)
+        assert encoded == await serialize(payload, Serialization.JSON_BASE64, Compression.LZMA)
+        decoded = await codec.deserialize(
+            encoded, Serialization.JSON_BASE64, Compression.LZMA, Data
+        )
+        assert decoded == payload
+    assert codec._executor is not None
+    # Compressed large payload is below threshold, so it is decoded inline
+    assert codec_counts() == {
+        ("encode", "inline"): 1,
+        ("encode", "offload"): 1,
+        ("decode", "inline"): 2,
+    }
+    codec.shutdown()
+    assert codec._executor is None
+
+
+@pytest.mark.parametrize("executor", [OffloadExecutor.THREAD, OffloadExecutor.PROCESS])
+async def test_offload_decode(executor):
+    registry.clear()
+    codec = PayloadCodec(StreamsConfig(offload_threshold_bytes=100, offload_executor=executor))
+    encoded = await codec.serialize(large, Serialization.PICKLE5, Compression.BZ2)
+    decoded = await codec.deserialize(encoded, Serialization.PICKLE5, Compression.BZ2, Data)
+    assert decoded == large
+    assert codec_counts() == {("encode", "offload"): 1, ("decode", "offload"): 1}
+    assert "hopeit_stream_codec_duration_seconds_count" in registry.prometheus_text()
+    codec.shutdown()
+
+
+async def test_process_executor_does_not_offload_uncompressed():
+    registry.clear()
+    codec = PayloadCodec(
+        StreamsConfig(offload_threshold_bytes=100, offload_executor=OffloadExecutor.PROCESS)
+    )
+    encoded = await codec.serialize(large, Serialization.JSON_UTF8, Compression.NONE)
+    decoded = await codec.deserialize(encoded, Serialization.JSON_UTF8, Compression.NONE, Data)
+    assert decoded == large
+    assert codec._executor is None
+    assert codec_counts() == {("encode", "inline"): 1, ("decode", "inline"): 1}
+
+
+@pytest.mark.parametrize("executor", [OffloadExecutor.THREAD, OffloadExecutor.PROCESS])
+async def test_compression_dictionaries(executor, tmp_path):
+    samples = [Payload.to_json_bytes(Data(f"data{i}" * (i % 5), i)) for i in range(1000)]
+    dict_path = tmp_path / "data.zdict"
+    with open(dict_path, "wb") as f:
+        f.write(train_zstd_dictionary(samples, 1024))
+    datatype_name = f"{Data.__module__}.{Data.__qualname__}"
+    codec = PayloadCodec(
+        StreamsConfig(
+            offload_threshold_bytes=10,
+            offload_executor=executor,
+            compression_dictionaries={datatype_name: str(dict_path)},
+        )
+    )
+    dict_id = codec.dictionary_id(datatype_name, Compression.ZSTD)
+    assert dict_id != 0
+    assert codec.dictionary_id(datatype_name, Compression.LZ4) == 0
+    assert codec.dictionary_id("unknown.Type", Compression.ZSTD) == 0
+    encoded = await codec.serialize(small, Serialization.JSON_UTF8, Compression.ZSTD, dict_id)
+    decoded = await codec.deserialize(
+        encoded, Serialization.JSON_UTF8, Compression.ZSTD, Data, dict_id
+    )
+    assert decoded == small
+    codec.shutdown()
+
+
+async def test_encode_auto_compression():
+    registry.clear()
+    codec = PayloadCodec(StreamsConfig(auto_compression_min_bytes=100))
+    encoded, comp = await codec.encode(small, Serialization.JSON_UTF8, Compression.AUTO)
+    assert comp == "none"
+    assert await codec.decode(encoded, Serialization.JSON_UTF8, comp, Data) == small
+    selected = set()
+    for _ in range(25):
+        encoded, comp = await codec.encode(large, Serialization.JSON_UTF8, Compression.AUTO)
+        assert await codec.decode(encoded, Serialization.JSON_UTF8, comp, Data) == large
+        selected.add(comp)
+    assert selected == {"lz4", "zip"}
+    assert codec.auto_compression.selected[f"{Data.__module__}.{Data.__qualname__}"] in (
+        Compression.LZ4,
+        Compression.ZIP,
+    )
+    assert codec_counts() == {("encode", "inline"): 26, ("decode", "inline"): 26}
+
+
+async def test_encode_decode():
+    codec = PayloadCodec(StreamsConfig())
+    encoded, comp = await codec.encode(large, Serialization.JSON_BASE64, Compression.BZ2)
+    assert comp == "bz2"
+    assert encoded == await serialize(large, Serialization.JSON_BASE64, Compression.BZ2)
+    assert await codec.decode(encoded, Serialization.JSON_BASE64, comp, Data) == large
+
+
+@pytest.mark.parametrize("executor", [OffloadExecutor.THREAD, OffloadExecutor.PROCESS])
+async def test_encode_decode_batch(executor):
+    registry.clear()
+    codec = PayloadCodec(
+        StreamsConfig(
+            offload_threshold_bytes=1000, offload_executor=executor, offload_max_workers=1
+        )
+    )
+    payloads = [Data(uuid.uuid4().hex, i) for i in range(100)]
+    encoded, comp = await codec.encode_batch(payloads, Serialization.MSGPACK, Compression.LZMA)
+    assert comp == "lzma"
+    assert len(encoded) >= 1000
+    assert await codec.decode_batch(encoded, Serialization.MSGPACK, comp, Data) == payloads
+    encoded, comp = await codec.encode_batch(
+        [small, small], Serialization.JSON_UTF8, Compression.AUTO
+    )
+    assert comp == "none"
+    assert await codec.decode_batch(encoded, Serialization.JSON_UTF8, comp, Data) == [
+        small,
+        small,
+    ]
+    assert codec_counts() == {
+        ("encode", "inline"): 1,
+        ("encode", "offload"): 1,
+        ("decode", "inline"): 1,
+        ("decode", "offload"): 1,
+    }
+    codec.shutdown()
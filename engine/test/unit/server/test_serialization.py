@@ -1,11 +1,15 @@
 import base64
 import pickle
 import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import msgpack  # type: ignore
 
 from hopeit.app.config import Serialization, Compression
 from hopeit.dataobjects import dataclass, dataobject
 from hopeit.dataobjects.payload import Payload
-from hopeit.server.serialization import serialize, deserialize
+from hopeit.server.serialization import serialize, deserialize, serialize_sync
 import pytest
 
 pickle5_available = (sys.version_info.major > 3) or (
@@ -216,3 +220,74 @@ async def test_serialize_collections():
     assert await deserialize(
         b'["test", "value"]', Serialization.JSON_UTF8, Compression.NONE, set
     ) == {"test", "value"}
+
+
+@dataobject
+@dataclass
+class Item:
+    name: str
+    values: List[float]
+
+
+@dataobject
+@dataclass
+class NestedData:
+    id: str
+    ts: datetime
+    items: List[Item]
+    attributes: Dict[str, int]
+    notes: Optional[str] = None
+
+
+async def test_serialize_msgpack():
+    encoded = await serialize(data, Serialization.MSGPACK, Compression.NONE)
+    assert encoded == msgpack.packb({"x": "data", "y": 42}) == b"\x82\xa1x\xa4data\xa1y*"
+    assert await deserialize(encoded, Serialization.MSGPACK, Compression.NONE, Data) == data
+    assert len(encoded) < len(ser[Serialization.JSON_UTF8])
+
+
+async def test_serialize_msgpack_round_trip():
+    nested = NestedData(
+        id="id1",
+        ts=datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc),
+        items=[Item("a", [1.5, 2.0, -3.25]), Item("b", [])],
+        attributes={"k": 1},
+    )
+    for compression in (Compression.NONE, Compression.LZ4, Compression.ZIP):
+        encoded = await serialize(nested, Serialization.MSGPACK, compression)
+        decoded = await deserialize(encoded, Serialization.MSGPACK, compression, NestedData)
+        assert decoded == nested
+        assert type(decoded.items[0]) is Item
+    # Same payload can be read from msgpack as from json
+    json_decoded = await deserialize(
+        await serialize(nested, Serialization.JSON_UTF8, Compression.NONE),
+        Serialization.JSON_UTF8,
+        Compression.NONE,
+        NestedData,
+    )
+    assert json_decoded == decoded
+
+
+async def test_serialize_msgpack_primitives_and_collections():
+    for value, datatype in (
+        ("test", str),
+        (42, int),
+        (42.5, float),
+        (True, bool),
+        ({"test": "value"}, dict),
+        (["test", "value"], list),
+    ):
+        encoded = await serialize(value, Serialization.MSGPACK, Compression.NONE)
+        assert (
+            await deserialize(encoded, Serialization.MSGPACK, Compression.NONE, datatype) == value
+        )
+    assert await serialize("test", Serialization.MSGPACK, Compression.NONE) == msgpack.packb(
+        {"value": "test"}
+    )
+
+
+async def test_serialize_auto_compression_not_supported():
+    with pytest.raises(ValueError):
+        serialize_sync(data, Serialization.JSON_UTF8, Compression.AUTO)
+    with pytest.raises(ValueError):
+        await serialize(data, Serialization.JSON_UTF8, Compression.AUTO)
@@ -14,6 +14,7 @@ from hopeit.app.config import (
 )
 from hopeit.app.context import EventContext
 from hopeit.app.events import Spawn, SHUFFLE
+from hopeit.server import histograms
 from hopeit.server.events import get_event_settings
 from hopeit.server.imports import find_event_handler
 from hopeit.server.steps import (
@@ -25,6 +26,7 @@ from hopeit.server.steps import (
     effective_steps,
     split_event_stages,
     CollectorStepsDescriptor,
+    StepDispatchTable,
 )
 from mock_app import MockData, MockResult, mock_collector  # type: ignore
 from mock_app import mock_app_config  # type: ignore
@@ -283,6 +285,39 @@ async def test_execute_multiple_spawn_steps():
     assert count == 9
 
 
+async def test_step_dispatch_table():
+    steps = [
+        (0, "step_spawn", (step_spawn, None, Spawn[MockData], True)),
+        (1, "step1", (step1, MockData, MockData, False)),
+        (2, "step4", (step4, MockData, Union[MockData, str], False)),
+        (3, "step5b", (step5b, str, MockResult, False)),
+        (4, "step6", (step6, MockResult, MockResult, False)),
+    ]
+    dispatch = StepDispatchTable(steps)
+    assert len(dispatch) == 5
+    assert dispatch._table[type(None), 0] == (0, step_spawn, True)
+    assert dispatch._table[type(None), 1] == (-1, None, False)
+    assert dispatch._table[MockData, 1] == (1, step1, False)
+    assert dispatch._table[MockData, 3] == (-1, None, False)
+    assert dispatch._table[MockResult, 0] == (4, step6, False)
+    assert (str, 0) in dispatch._table
+
+    class MockDataSubclass(MockData):
+        pass
+
+    assert (MockDataSubclass, 2) not in dispatch._table
+    assert dispatch.find_next_step(MockDataSubclass("x"), from_index=2) == (2, step4, False)
+    assert dispatch._table[MockDataSubclass, 2] == (2, step4, False)
+
+    i = 0
+    async for result in execute_steps(
+        steps=dispatch, payload=None, context=_get_event_context(), query_arg1="b"
+    ):
+        assert result == MockResult(f"b {i} step1 step4 step5b step6")
+        i += 1
+    assert i == 3
+
+
 async def test_invoke_single_step():
     result = await invoke_single_step(
         step1, payload=MockData("input"), context=_get_event_context()
@@ -389,3 +424,18 @@ def test_collector_steps_descriptor(mock_app_config):
     assert collector.__name__ == "collector@step1"
     assert collector.input_type is MockData
     assert collector.step_names == ["step1", "step2", "step3"]
+
+
+async def test_execute_steps_observes_step_duration(monkeypatch):
+    registry = histograms.MetricsRegistry()
+    monkeypatch.setattr(histograms, "registry", registry)
+    steps = [
+        (0, "step1", (step1, MockData, MockData, False)),
+        (1, "step4", (step4, MockData, Union[MockData, str], False)),
+        (2, "step5b", (step5b, str, MockResult, False)),
+    ]
+    context = _get_event_context()
+    async for _ in execute_steps(steps=steps, payload=MockData("a"), context=context):
+        pass
+    assert sorted(key[2] for key in registry.step_duration) == ["step1", "step4"]
+    assert all(h.count == 1 for h in registry.step_duration.values())
@@ -7,9 +7,16 @@ from unittest.mock import MagicMock
 
 import nest_asyncio  # type: ignore
 
-from hopeit.server import web, runtime, engine
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from hopeit.app.context import PreprocessHook
+from hopeit.server import web, runtime, engine, histograms
+from hopeit.server.config import AuthType
+from hopeit.server.events import get_event_settings
 from hopeit.server.web import parse_args
 
+from mock_app import mock_app_config  # type: ignore
+
 
 test_lock = asyncio.Lock()
 
@@ -155,6 +162,7 @@ async def test_server_initialization(monkeypatch, api_file, api_auto):
         nest_asyncio.apply()
 
         _load_engine_config = MagicMock()
+        _load_engine_config.return_value.metrics.endpoint = None
         _load_api_file = MagicMock()
         _enable_swagger = MagicMock()
         _register_server_config = MagicMock()
@@ -196,3 +204,227 @@ async def test_server_initialization(monkeypatch, api_file, api_auto):
             MockHooks._stream_startup_hook_calls = []
             MockHooks._server_startup_hook_calls = []
             MockHooks._app_startup_hook_calls = []
+
+
+def test_compile_request_plan(mock_app_config):
+    app_engine = engine.AppEngine(app_config=mock_app_config, plugins=[], enabled_groups=[])
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_auth")
+    assert plan.event_name == "mock_auth"
+    assert plan.auth_methods == (AuthType.BASIC,)
+    assert plan.auth_types == (AuthType.BASIC,)
+    assert plan.context_template.settings == get_event_settings(app_engine.settings, "mock_auth")
+    assert plan.context_template.track_fields == (
+        "track.operation_id",
+        "track.client_app_key",
+        "track.client_event_name",
+        "track.request_id",
+        "track.request_ts",
+        "track.session_id",
+    )
+    assert plan.track_header("track.session_id") == "X-Track-Session-Id"
+    assert plan.track_header("event.app") == "X-Event-App"
+    assert plan.track_header("track.not_compiled") == "X-Track-Not-Compiled"
+
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_event")
+    assert plan.auth_methods == (AuthType.UNSECURED,)
+    assert plan.auth_types == (AuthType.UNSECURED,)
+
+    track_ids = web._track_ids(MagicMock(headers={"X-Track-Session-Id": "test"}))
+    context = web.EventContext.from_template(
+        plan.context_template, track_ids=track_ids, auth_info={}
+    )
+    assert context.event_name == "mock_event"
+    assert context.settings is plan.context_template.settings
+    assert context.track_ids["track.session_id"] == "test"
+    assert context.track_ids["event.app"] == "mock_app.test"
+
+
+class MockCachedEngine:
+    def __init__(self):
+        self.execute_count = 0
+        self.admission_control = {}
+
+    async def preprocess(self, *, context, query_args, payload, request):
+        return payload
+
+    async def execute(self, *, context, query_args, payload):
+        self.execute_count += 1
+        count = self.execute_count
+        await asyncio.sleep(0.1)
+        return f"result {count}: {payload}"
+
+    async def postprocess(self, *, context, payload, response):
+        return payload
+
+
+async def test_request_execute_cached_response(monkeypatch, mock_app_config):
+    monkeypatch.setitem(mock_app_config.effective_settings["mock_event"], "cache", {"ttl": 10})
+    monkeypatch.setattr(web, "logger", MagicMock())
+    app_engine = engine.AppEngine(app_config=mock_app_config, plugins=[], enabled_groups=[])
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_event")
+    assert plan.cache is not None
+    assert plan.cache.ttl == 10.0
+
+    mock_engine = MockCachedEngine()
+    results = []
+    for payload in ["ok", "ok", "other"]:
+        context = web.EventContext.from_template(
+            plan.context_template, track_ids={"track.request_id": payload}, auth_info={}
+        )
+        response = await web._request_execute(
+            mock_engine,  # type: ignore
+            plan,
+            context,
+            {"arg": "1"},
+            payload,
+            PreprocessHook(headers=CIMultiDictProxy(CIMultiDict())),
+            MagicMock(),
+        )
+        assert response.status == 200
+        assert response.headers["X-Track-Request-Id"] == payload
+        results.append(response.body)
+
+    assert results == [
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 2: other"}',
+    ]
+    assert mock_engine.execute_count == 2
+    assert (plan.cache.hits, plan.cache.misses) == (1, 2)
+
+    monkeypatch.setitem(mock_app_config.effective_settings["mock_post_event"], "cache", {"ttl": 10})
+    app_engine = engine.AppEngine(app_config=mock_app_config, plugins=[], enabled_groups=[])
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_post_event")
+    assert plan.cache is None
+
+
+async def test_request_execute_cached_response_secured(monkeypatch, mock_app_config):
+    monkeypatch.setitem(mock_app_config.effective_settings["mock_event"], "cache", {"ttl": 10})
+    monkeypatch.setattr(mock_app_config.events["mock_event"], "auth", [AuthType.BEARER])
+    monkeypatch.setattr(web, "logger", MagicMock())
+    app_engine = engine.AppEngine(app_config=mock_app_config, plugins=[], enabled_groups=[])
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_event")
+    assert plan.cache is not None
+    assert plan.cache.secured
+
+    mock_engine = MockCachedEngine()
+    results = []
+    for user in ["user1", "user2", "user1"]:
+        context = web.EventContext.from_template(
+            plan.context_template,
+            track_ids={},
+            auth_info={"allowed": True, "payload": {"sub": user}},
+        )
+        response = await web._request_execute(
+            mock_engine,  # type: ignore
+            plan,
+            context,
+            {},
+            "ok",
+            PreprocessHook(headers=CIMultiDictProxy(CIMultiDict())),
+            MagicMock(),
+        )
+        results.append(response.body)
+
+    assert results == [
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 2: ok"}',
+        b'{"mock_event":"result 1: ok"}',
+    ]
+    assert (plan.cache.hits, plan.cache.misses) == (1, 2)
+
+
+async def test_request_execute_coalesced(monkeypatch, mock_app_config):
+    monkeypatch.setitem(
+        mock_app_config.effective_settings["mock_event"], "cache", {"coalesce": True}
+    )
+    monkeypatch.setattr(web, "logger", MagicMock())
+    app_engine = engine.AppEngine(app_config=mock_app_config, plugins=[], enabled_groups=[])
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_event")
+    assert plan.cache is None
+    assert plan.in_flight is not None
+
+    async def request(payload: str):
+        context = web.EventContext.from_template(plan.context_template, track_ids={}, auth_info={})
+        return await web._request_execute(
+            mock_engine,  # type: ignore
+            plan,
+            context,
+            {},
+            payload,
+            PreprocessHook(headers=CIMultiDictProxy(CIMultiDict())),
+            MagicMock(),
+        )
+
+    mock_engine = MockCachedEngine()
+    responses = await asyncio.gather(request("ok"), request("ok"), request("ok"), request("other"))
+    assert [r.body for r in responses] == [
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 2: other"}',
+    ]
+    assert mock_engine.execute_count == 2
+    assert plan.in_flight.coalesced == 2
+
+    responses = await asyncio.gather(request("ok"))
+    assert responses[0].body == b'{"mock_event":"result 3: ok"}'
+
+
+async def test_request_execute_coalesced_secured(monkeypatch, mock_app_config):
+    monkeypatch.setitem(
+        mock_app_config.effective_settings["mock_event"], "cache", {"coalesce": True}
+    )
+    monkeypatch.setattr(mock_app_config.events["mock_event"], "auth", [AuthType.BEARER])
+    monkeypatch.setattr(web, "logger", MagicMock())
+    app_engine = engine.AppEngine(app_config=mock_app_config, plugins=[], enabled_groups=[])
+    plan = web._compile_request_plan(app_engine, app_engine, "mock_event")
+    assert plan.in_flight is not None
+    assert plan.in_flight.secured
+
+    async def request(user: str):
+        context = web.EventContext.from_template(
+            plan.context_template,
+            track_ids={},
+            auth_info={"allowed": True, "payload": {"sub": user}},
+        )
+        return await web._request_execute(
+            mock_engine,  # type: ignore
+            plan,
+            context,
+            {},
+            "ok",
+            PreprocessHook(headers=CIMultiDictProxy(CIMultiDict())),
+            MagicMock(),
+        )
+
+    mock_engine = MockCachedEngine()
+    responses = await asyncio.gather(request("user1"), request("user1"), request("user2"))
+    assert [r.body for r in responses] == [
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 1: ok"}',
+        b'{"mock_event":"result 2: ok"}',
+    ]
+    assert mock_engine.execute_count == 2
+    assert plan.in_flight.coalesced == 1
+
+
+async def test_metrics_handler(monkeypatch, mock_app_config):
+    registry = histograms.MetricsRegistry()
+    monkeypatch.setattr(histograms, "registry", registry)
+    context = web.EventContext(
+        app_config=mock_app_config,
+        plugin_config=mock_app_config,
+        event_name="mock_event",
+        settings=get_event_settings(mock_app_config.effective_settings, "mock_event"),
+        track_ids={},
+        auth_info={},
+    )
+    registry.observe_event(context, "done")
+    response = await web._metrics_handler(MagicMock())
+    assert response.status == 200
+    assert response.headers["Content-Type"] == histograms.PROMETHEUS_CONTENT_TYPE
+    assert (
+        b'hopeit_events_total{app="mock_app.test",event="mock_event",status="done"} 1'
+        in response.body
+    )
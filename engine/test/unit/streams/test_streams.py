@@ -1,14 +1,20 @@
+import asyncio
 from datetime import datetime, timezone
-from typing import List, Union
+from typing import List, Optional, Union
 
 import pytest
 
+from hopeit.app.config import Compression, Serialization
 from hopeit.dataobjects import dataclass, dataobject
 from hopeit.streams import (
+    StreamAckAggregator,
     StreamCircuitBreaker,
     StreamEvent,
     StreamManager,
     StreamOSError,
+    StreamPartitions,
+    partition_stream_name,
+    stream_partition,
 )
 
 
@@ -27,6 +33,7 @@ class MockInvalidDataEvent:
 class MockStreamManager(StreamManager):
     def __init__(self) -> None:
         self.connected = True
+        self.acked: List[tuple] = []
 
     async def ensure_consumer_group(self, **kwargs) -> None:
         if self.connected:
@@ -61,6 +68,20 @@ class MockStreamManager(StreamManager):
         else:
             raise StreamOSError()
 
+    async def assign_partitions(self, **kwargs) -> List[int]:
+        if self.connected:
+            return await super().assign_partitions(**kwargs)
+        else:
+            raise StreamOSError()
+
+    async def ack_read_stream(
+        self, *, stream_name: str, consumer_group: str, stream_event: StreamEvent
+    ) -> None:
+        if self.connected:
+            self.acked.append((stream_name, consumer_group, stream_event.msg_internal_id))
+        else:
+            raise StreamOSError()
+
 
 def test_as_data_event():
     test_data = MockData("ok", datetime.now(tz=timezone.utc))
@@ -241,3 +262,398 @@ async def test_stream_circuit_breaker_write_stream():
 
     # recover fully
     await check_result(state=0, backoff=0.0)
+
+
+async def test_write_stream_batch_default():
+    stream_manager = MockStreamManager()
+    circuit_breaker = StreamCircuitBreaker(
+        stream_manager=stream_manager,
+        initial_backoff_seconds=0.1,
+        num_failures_open_circuit_breaker=2,
+        max_backoff_seconds=0.4,
+    )
+    payloads = [MockData(value=f"mock{i}", ts=datetime(2020, 1, 1)) for i in range(3)]
+    res = await circuit_breaker.write_stream_batch(
+        stream_name="test_stream",
+        queue="AUTO",
+        payloads=payloads,
+        track_ids={},
+        auth_info={},
+        compression=Compression.NONE,
+        serialization=Serialization.JSON_UTF8,
+    )
+    assert res == 3
+
+    stream_manager.connected = False
+    with pytest.raises(StreamOSError):
+        await circuit_breaker.write_stream_batch(
+            stream_name="test_stream",
+            queue="AUTO",
+            payloads=payloads,
+            track_ids={},
+            auth_info={},
+            compression=Compression.NONE,
+            serialization=Serialization.JSON_UTF8,
+        )
+    assert circuit_breaker.state == 1
+    await asyncio.sleep(0.2)  # Wait for backoff to finish
+
+
+async def test_write_stream_fanout_default():
+    stream_manager = MockStreamManager()
+    circuit_breaker = StreamCircuitBreaker(
+        stream_manager=stream_manager,
+        initial_backoff_seconds=0.1,
+        num_failures_open_circuit_breaker=2,
+        max_backoff_seconds=0.4,
+    )
+    payloads = [MockData(value=f"mock{i}", ts=datetime(2020, 1, 1)) for i in range(3)]
+    res = await circuit_breaker.write_stream_fanout(
+        targets=[("test_stream.q1", "q1"), ("test_stream", "AUTO")],
+        payloads=payloads,
+        track_ids={},
+        auth_info={},
+        compression=Compression.NONE,
+        serialization=Serialization.JSON_UTF8,
+    )
+    assert res == 6
+
+    stream_manager.connected = False
+    with pytest.raises(StreamOSError):
+        await circuit_breaker.write_stream_fanout(
+            targets=[("test_stream", "AUTO")],
+            payloads=payloads,
+            track_ids={},
+            auth_info={},
+            compression=Compression.NONE,
+            serialization=Serialization.JSON_UTF8,
+        )
+    assert circuit_breaker.state == 1
+    await asyncio.sleep(0.2)  # Wait for backoff to finish
+
+
+def _stream_event(msg_id: bytes, packed: int = 1) -> StreamEvent:
+    return StreamEvent(
+        msg_id,
+        "test-queue",
+        payload=MockData(value="mock", ts=datetime(2020, 1, 1)),
+        track_ids={},
+        auth_info={},
+        packed=packed,
+    )
+
+
+async def test_ack_aggregator_flush_on_size_and_explicit():
+    stream_manager = MockStreamManager()
+    acks = StreamAckAggregator(
+        stream_manager, consumer_group="test_group", max_batch_size=2, flush_interval_ms=60000
+    )
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"1"))
+    assert await acks.flush_expired() == 0
+    assert stream_manager.acked == []
+    acks.ack(stream_name="stream2", stream_event=_stream_event(b"2"))
+    assert stream_manager.acked == []
+    assert await acks.flush_expired() == 2
+    assert stream_manager.acked == [
+        ("stream1", "test_group", b"1"),
+        ("stream2", "test_group", b"2"),
+    ]
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"3"))
+    assert acks.pending_count == 1
+    assert await acks.flush() == 1
+    assert stream_manager.acked[-1] == ("stream1", "test_group", b"3")
+    assert acks.pending_count == 0
+    assert await acks.flush() == 0
+
+
+async def test_ack_aggregator_flush_on_interval():
+    stream_manager = MockStreamManager()
+    acks = StreamAckAggregator(
+        stream_manager, consumer_group="test_group", max_batch_size=100, flush_interval_ms=50
+    )
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"1"))
+    assert await acks.flush_expired() == 0
+    await asyncio.sleep(0.1)
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2"))
+    assert await acks.flush_expired() == 2
+    assert stream_manager.acked == [
+        ("stream1", "test_group", b"1"),
+        ("stream1", "test_group", b"2"),
+    ]
+
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"3"))
+    assert await acks.flush_expired() == 0
+    await asyncio.sleep(0.1)
+    assert await acks.flush_expired() == 1
+    assert stream_manager.acked[-1] == ("stream1", "test_group", b"3")
+
+
+async def test_ack_aggregator_stream_failure():
+    stream_manager = MockStreamManager()
+    circuit_breaker = StreamCircuitBreaker(
+        stream_manager=stream_manager,
+        initial_backoff_seconds=0.1,
+        num_failures_open_circuit_breaker=2,
+        max_backoff_seconds=0.4,
+    )
+    acks = StreamAckAggregator(
+        circuit_breaker, consumer_group="test_group", max_batch_size=10, flush_interval_ms=1000
+    )
+    stream_manager.connected = False
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"1"))
+    assert await acks.flush() == 0
+    assert circuit_breaker.state == 1
+    assert acks.pending_count == 1
+
+    stream_manager.connected = True
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2"))
+    assert await acks.flush() == 2
+    assert stream_manager.acked == [
+        ("stream1", "test_group", b"1"),
+        ("stream1", "test_group", b"2"),
+    ]
+    assert acks.pending_count == 0
+
+
+async def test_ack_aggregator_keeps_pending_on_failure():
+    stream_manager = MockStreamManager()
+    acks = StreamAckAggregator(
+        stream_manager, consumer_group="test_group", max_batch_size=10, flush_interval_ms=1000
+    )
+    stream_manager.connected = False
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"1"))
+    acks.ack(stream_name="stream2", stream_event=_stream_event(b"2"))
+    assert await acks.flush() == 0
+    assert acks.pending_count == 2
+
+    stream_manager.connected = True
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"3"))
+    assert await acks.flush() == 3
+    assert stream_manager.acked == [
+        ("stream1", "test_group", b"1"),
+        ("stream1", "test_group", b"3"),
+        ("stream2", "test_group", b"2"),
+    ]
+    assert acks.pending_count == 0
+
+
+class SlowAckStreamManager(MockStreamManager):
+    async def ack_read_stream_batch(self, *, stream_name: str, **kwargs) -> int:
+        if stream_name == "slow_stream":
+            await asyncio.sleep(1.0)
+        return await super().ack_read_stream_batch(stream_name=stream_name, **kwargs)
+
+
+async def test_ack_aggregator_keeps_pending_on_timeout():
+    stream_manager = SlowAckStreamManager()
+    acks = StreamAckAggregator(
+        stream_manager, consumer_group="test_group", max_batch_size=10, flush_interval_ms=1000
+    )
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"1"))
+    acks.ack(stream_name="slow_stream", stream_event=_stream_event(b"2"))
+    acks.ack(stream_name="stream2", stream_event=_stream_event(b"3"))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(acks.flush(), timeout=0.1)
+    assert stream_manager.acked == [("stream1", "test_group", b"1")]
+    assert acks.pending_count == 2
+    assert {
+        stream_name: [stream_event.msg_internal_id for stream_event in stream_events]
+        for stream_name, stream_events in acks.pending.items()
+    } == {"slow_stream": [b"2"], "stream2": [b"3"]}
+
+
+async def test_ack_aggregator_packed_events():
+    stream_manager = MockStreamManager()
+    acks = StreamAckAggregator(
+        stream_manager, consumer_group="test_group", max_batch_size=10, flush_interval_ms=60000
+    )
+    for _ in range(3):
+        assert acks.pending_count == 0
+        acks.ack(stream_name="stream1", stream_event=_stream_event(b"1", packed=3))
+    assert acks.pending_count == 1
+
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2", packed=3))
+    acks.fail(stream_name="stream1", stream_event=_stream_event(b"2", packed=3))
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2", packed=3))
+    acks.fail(stream_name="stream1", stream_event=_stream_event(b"3"))
+    assert await acks.flush() == 1
+    assert stream_manager.acked == [("stream1", "test_group", b"1")]
+
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2", packed=3))
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2", packed=3))
+    assert acks.pending_count == 0
+    acks.ack(stream_name="stream1", stream_event=_stream_event(b"2", packed=3))
+    assert await acks.flush() == 1
+    assert stream_manager.acked[-1] == ("stream1", "test_group", b"2")
+
+
+class LazyStreamEvent(StreamEvent):
+    __slots__ = ("decoded",)
+
+    def __init__(self, msg_id: bytes):
+        super().__init__(
+            msg_id, "test-queue", payload=MockData(value="mock", ts=datetime(2020, 1, 1))
+        )
+        self.decoded = 0
+
+    def _decode_track_ids(self):
+        self.decoded += 1
+        return {"stream.msg_id": self.msg_internal_id.decode()}
+
+    def _decode_auth_info(self):
+        self.decoded += 1
+        return {"auth_type": "Unsecured"}
+
+
+def test_stream_event_lazy_decode():
+    stream_event = LazyStreamEvent(b"1")
+    assert not hasattr(stream_event, "__dict__")
+    assert stream_event.decoded == 0
+    assert stream_event.track_ids == {"stream.msg_id": "1"}
+    assert stream_event.track_ids is stream_event.track_ids
+    assert stream_event.auth_info == {"auth_type": "Unsecured"}
+    assert stream_event.auth_info is stream_event.auth_info
+    assert stream_event.decoded == 2
+    assert stream_event == StreamEvent(
+        b"1",
+        "test-queue",
+        payload=MockData(value="mock", ts=datetime(2020, 1, 1)),
+        track_ids={"stream.msg_id": "1"},
+        auth_info={"auth_type": "Unsecured"},
+    )
+    assert _stream_event(b"1").track_ids == {}
+    assert _stream_event(b"1") != _stream_event(b"2")
+
+
+def test_stream_partition():
+    assert stream_partition("id1", 8) == stream_partition("id1", 8)
+    assert {stream_partition(f"id{i}", 8) for i in range(100)} == set(range(8))
+    assert partition_stream_name("stream.q1", 3) == "stream.q1:3"
+
+
+async def test_stream_partitions_assignment():
+    stream_manager = MockStreamManager()
+    partitions = StreamPartitions(
+        stream_manager,
+        stream_name="stream1",
+        consumer_group="test_group",
+        partitions=3,
+        lease_ms=60000,
+    )
+    assert await partitions.renew() == [0, 1, 2]
+    assert partitions.batch_sizes(7) == [(0, 3), (1, 2), (2, 2)]
+    assert partitions.batch_sizes(2) == [(1, 1), (2, 1)]
+    assert partitions.batch_sizes(2) == [(2, 1), (0, 1)]
+    assert partitions.batch_sizes(0) == []
+    await partitions.release()
+    assert partitions.assigned == []
+    assert partitions.batch_sizes(2) == []
+
+
+async def test_stream_partitions_assignment_failure():
+    stream_manager = MockStreamManager()
+    circuit_breaker = StreamCircuitBreaker(
+        stream_manager=stream_manager,
+        initial_backoff_seconds=0.1,
+        num_failures_open_circuit_breaker=2,
+        max_backoff_seconds=0.4,
+    )
+    partitions = StreamPartitions(
+        circuit_breaker,
+        stream_name="stream1",
+        consumer_group="test_group",
+        partitions=3,
+        lease_ms=0,
+    )
+    stream_manager.connected = False
+    assert await partitions.renew() == []
+    assert circuit_breaker.state == 1
+    stream_manager.connected = True
+    await asyncio.sleep(0.2)
+    assert await partitions.renew() == [0, 1, 2]
+
+
+class MockPartitionsStreamManager(MockStreamManager):
+    def __init__(self, assigned: List[int]) -> None:
+        super().__init__()
+        self.assigned = assigned
+        self.released: List[Optional[List[int]]] = []
+
+    async def assign_partitions(self, **kwargs) -> List[int]:
+        return self.assigned
+
+    async def release_partitions(self, **kwargs) -> None:
+        self.released.append(kwargs.get("released"))
+
+
+async def test_stream_partitions_release_after_processed():
+    stream_manager = MockPartitionsStreamManager([0, 1, 2])
+    acks = StreamAckAggregator(
+        stream_manager, consumer_group="test_group", max_batch_size=10, flush_interval_ms=60000
+    )
+    partitions = StreamPartitions(
+        stream_manager,
+        stream_name="stream1",
+        consumer_group="test_group",
+        partitions=3,
+        lease_ms=0,
+        acks=acks,
+    )
+    assert await partitions.renew() == [0, 1, 2]
+    stream_events = [("stream1:2", _stream_event(b"1")), ("stream1:2", _stream_event(b"2"))]
+    partitions.read(stream_events)
+
+    # Partition 2 is not released while its events are in flight
+    stream_manager.assigned = [0]
+    assert await partitions.renew() == [0]
+    assert partitions.releasing == [2]
+    assert stream_manager.released == [[1]]
+
+    # Nor while its acknowledgements fail
+    for stream_name, stream_event in stream_events:
+        acks.ack(stream_name=stream_name, stream_event=stream_event)
+    partitions.processed(stream_events)
+    stream_manager.connected = False
+    assert await partitions.renew() == [0]
+    assert stream_manager.released == [[1]]
+
+    stream_manager.connected = True
+    assert await partitions.renew() == [0]
+    assert stream_manager.acked == [
+        ("stream1:2", "test_group", b"1"),
+        ("stream1:2", "test_group", b"2"),
+    ]
+    assert stream_manager.released == [[1], [2]]
+    assert partitions.releasing == []
+
+    await partitions.release()
+    assert stream_manager.released == [[1], [2], None]
+
+
+async def test_stream_partitions_claims():
+    stream_manager = MockPartitionsStreamManager([0, 1])
+    partitions = StreamPartitions(
+        stream_manager,
+        stream_name="stream1",
+        consumer_group="test_group",
+        partitions=3,
+        lease_ms=0,
+        queue_stream_names=["stream1.q1", "stream1.q2"],
+    )
+    assert await partitions.renew() == [0, 1]
+    assert partitions.claims == {
+        "stream1.q1:0": "0-0",
+        "stream1.q1:1": "0-0",
+        "stream1.q2:0": "0-0",
+        "stream1.q2:1": "0-0",
+    }
+    partitions.claimed("stream1.q1:0", "5-0")
+    partitions.claimed("stream1.q1:1", "0-0")
+    partitions.claimed("stream1.q2:1", "0-0")
+    partitions.claimed("stream1.q1:2", "1-0")
+    assert partitions.claims == {"stream1.q1:0": "5-0", "stream1.q2:0": "0-0"}
+
+    # Partitions kept are not claimed again, and claims of partitions lost are dropped
+    stream_manager.assigned = [1, 2]
+    assert await partitions.renew() == [1, 2]
+    assert partitions.claims == {"stream1.q1:2": "0-0", "stream1.q2:2": "0-0"}
@@ -10,19 +10,30 @@ import shutil
 from glob import glob
 from pathlib import Path
 import uuid
-from typing import Optional, Type, Generic, List
+from typing import Optional, Type, Generic, List, Union
 
 import aiofiles
 import aiofiles.os
 
+from hopeit.app.config import Compression, Serialization
 from hopeit.dataobjects import DataObject, dataclass, dataobject
 from hopeit.dataobjects.payload import Payload
 from hopeit.fs_storage.partition import get_file_partition_key, get_partition_key
+from hopeit.server.serialization import deserialize_sync, serialize_sync
 
 __all__ = ["FileStorage", "FileStorageSettings"]
 
 SUFFIX = ".json"
 
+SUFFIXES = {
+    Serialization.JSON_UTF8: SUFFIX,
+    Serialization.JSON_BASE64: ".json.b64",
+    Serialization.PICKLE3: ".pickle",
+    Serialization.PICKLE4: ".pickle",
+    Serialization.PICKLE5: ".pickle",
+    Serialization.MSGPACK: ".msgpack",
+}
+
 
 @dataobject
 @dataclass
@@ -38,12 +49,17 @@ class FileStorageSettings:
         buffered partitions. Default 0 means flush is not triggered by time.
     :field: flush_max_size: max number of elements to keep in a partition before forcing a flush.
         Default 1. A value of 0 will disable flushing by partition size.
+    :field: serialization, Serialization: format used to store dataobjects, default "json".
+        Files are saved with an extension according to serialization, i.e. `.json`, `.msgpack`.
+        Stream batch storage saves json as `.jsonlines` and other serializations as
+        length-prefixed frames, i.e. `.msgpack.batch`
     """
 
     path: str
     partition_dateformat: Optional[str] = None
     flush_seconds: float = 0.0
     flush_max_size: int = 1
+    serialization: Serialization = Serialization.JSON_UTF8
 
 
 @dataobject
@@ -58,18 +74,32 @@ class FileStorage(Generic[DataObject]):
     Stores and retrieves dataobjects from filesystem
     """
 
-    def __init__(self, *, path: str, partition_dateformat: Optional[str] = None):
+    def __init__(
+        self,
+        *,
+        path: str,
+        partition_dateformat: Optional[str] = None,
+        serialization: Serialization = Serialization.JSON_UTF8,
+    ):
         """
         Setups a file storage
 
         :param path: str, base path to be used to store and retrieve objects
+        :param partition_dateformat: optional str, date format used to partition saved files
+        :param serialization: Serialization, format used to store dataobjects, default json
         """
         self.path: Path = Path(path)
         self.partition_dateformat = (partition_dateformat or "").strip("/")
+        self.serialization = serialization
+        self.suffix = SUFFIXES[serialization]
 
     @classmethod
     def with_settings(cls, settings: FileStorageSettings) -> "FileStorage":
-        return cls(path=settings.path, partition_dateformat=settings.partition_dateformat)
+        return cls(
+            path=settings.path,
+            partition_dateformat=settings.partition_dateformat,
+            serialization=settings.serialization,
+        )
 
     async def get(
         self,
@@ -87,6 +117,13 @@ class FileStorage(Generic[DataObject]):
         :return: instance of datatype or None if not found
         """
         path = self.path / partition_key if partition_key else self.path
+        if self.serialization != Serialization.JSON_UTF8:
+            payload = await self._load_binary_file(path=path, file_name=key + self.suffix)
+            if payload:
+                return deserialize_sync(  # type: ignore[return-value]
+                    payload, self.serialization, Compression.NONE, datatype
+                )
+            return None
         payload_str = await self._load_file(path=path, file_name=key + SUFFIX)
         if payload_str:
             return Payload.from_json(payload_str, datatype)
@@ -121,11 +158,14 @@ class FileStorage(Generic[DataObject]):
         :param value: DataObject, instance of dataclass annotated with @dataobject
         :return: str, path where the object was stored
         """
-        payload_str = Payload.to_json(value)
         path = self.path
         if self.partition_dateformat:
             path = path / get_partition_key(value, self.partition_dateformat)
         os.makedirs(path.resolve().as_posix(), exist_ok=True)
+        if self.serialization != Serialization.JSON_UTF8:
+            payload = serialize_sync(value, self.serialization, Compression.NONE)
+            return await self._save_file(payload, path=path, file_name=key + self.suffix)
+        payload_str = Payload.to_json(value)
         return await self._save_file(payload_str, path=path, file_name=key + SUFFIX)
 
     async def store_file(
@@ -157,9 +197,11 @@ class FileStorage(Generic[DataObject]):
         :return: List of objects key
         """
         base_path = str(self.path.resolve())
-        path = base_path + "/" + wildcard + SUFFIX
+        path = base_path + "/" + wildcard + self.suffix
         n_part_comps = len(self.partition_dateformat.split("/"))
-        return [self._get_item_locator(item_path, n_part_comps, SUFFIX) for item_path in glob(path)]
+        return [
+            self._get_item_locator(item_path, n_part_comps, self.suffix) for item_path in glob(path)
+        ]
 
     async def list_files(self, wildcard: str = "*") -> List[ItemLocator]:
         """
@@ -181,7 +223,7 @@ class FileStorage(Generic[DataObject]):
         """
         path = self.path / partition_key if partition_key else self.path
         for key in keys:
-            await aiofiles.os.remove(path / (key + SUFFIX))
+            await aiofiles.os.remove(path / (key + self.suffix))
 
     async def delete_files(self, *file_names: str, partition_key: Optional[str] = None):
         """
@@ -220,18 +262,37 @@ class FileStorage(Generic[DataObject]):
             return None
 
     @staticmethod
-    async def _save_file(payload_str: str, *, path: Path, file_name: str) -> str:
+    async def _load_binary_file(*, path: Path, file_name: str) -> Optional[bytes]:
+        """
+        Read binary contents from file `path/file_name` asynchronously.
+        Returns bytes or None is file is not found.
+        """
+        file_path = path / file_name
+        try:
+            async with aiofiles.open(file_path, "rb") as f:
+                return await f.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    async def _save_file(payload: Union[str, bytes], *, path: Path, file_name: str) -> str:
         """
-        Save `payload_str` to `path/file_name` asynchronously.
+        Save `payload` to `path/file_name` asynchronously, as utf-8 text if `payload` is str,
+        or as binary if bytes.
         First buffers and stores the file with a random hidden file name
         into the specified `path`, then when writing is finished
         it will rename the file to the desired name atomically.
         """
         file_path = path / file_name
         tmp_path = path / str(f".{uuid.uuid4()}")
-        async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:  # type: ignore
-            await f.write(payload_str)
-            await f.flush()
+        if isinstance(payload, bytes):
+            async with aiofiles.open(tmp_path, "wb") as bf:
+                await bf.write(payload)
+                await bf.flush()
+        else:
+            async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:  # type: ignore
+                await f.write(payload)
+                await f.flush()
         shutil.move(str(tmp_path), str(file_path))
         return file_path.as_posix()
 
@@ -75,23 +75,30 @@ all folders.
 Each generated files is a in `jsonlines` format (http://jsonlines.org) where
 each line is a valid single-line json object resulting of serializing the
 dataobjects consumed from the input stream.
+
+If `serialization` setting is other than "json", each file contains a sequence of frames
+with a uint32 big-endian length followed by the serialized dataobject, and file extension
+is the one for serialization followed by `.batch`, i.e. `.msgpack.batch`.
 """
 
 import asyncio
 import dataclasses
 import os
+import struct
 import uuid
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import aiofiles
+from hopeit.app.config import Compression, Serialization
 from hopeit.app.context import EventContext
 from hopeit.app.events import Spawn
 from hopeit.app.logger import app_extra_logger
 from hopeit.dataobjects import DataObject, dataclass, dataobject
 from hopeit.dataobjects.payload import Payload
-from hopeit.fs_storage import FileStorageSettings
+from hopeit.fs_storage import SUFFIXES, FileStorageSettings
 from hopeit.fs_storage.partition import get_partition_key
+from hopeit.server.serialization import serialize_sync
 
 logger, extra = app_extra_logger()
 
@@ -105,6 +112,8 @@ class Partition:
 
 
 SUFFIX = ".jsonlines"
+BATCH_SUFFIX = ".batch"
+FRAME_HEADER = struct.Struct("!I")
 buffer: Dict[str, Partition] = {}
 buffer_lock: asyncio.Lock = asyncio.Lock()
 
@@ -164,9 +173,18 @@ async def flush(signal: FlushSignal, context: EventContext):
 async def _save_partition(partition_key: str, items: List[DataObject], context: EventContext):
     settings = context.settings(datatype=FileStorageSettings)
     path = Path(settings.path) / partition_key
-    file = path / f"{uuid.uuid4()}{SUFFIX}"
+    if settings.serialization == Serialization.JSON_UTF8:
+        file = path / f"{uuid.uuid4()}{SUFFIX}"
+        logger.info(context, f"Saving {file}...")
+        os.makedirs(path.resolve(), exist_ok=True)
+        async with aiofiles.open(file, "w") as f:
+            for item in items:
+                await f.write(Payload.to_json(item) + "\n")
+        return
+    file = path / f"{uuid.uuid4()}{SUFFIXES[settings.serialization]}{BATCH_SUFFIX}"
     logger.info(context, f"Saving {file}...")
     os.makedirs(path.resolve(), exist_ok=True)
-    async with aiofiles.open(file, "w") as f:
+    async with aiofiles.open(file, "wb") as f:
         for item in items:
-            await f.write(Payload.to_json(item) + "\n")
+            data = serialize_sync(item, settings.serialization, Compression.NONE)
+            await f.write(FRAME_HEADER.pack(len(data)) + data)
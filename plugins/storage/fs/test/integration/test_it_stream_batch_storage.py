@@ -1,6 +1,8 @@
 from glob import glob
 import asyncio
-from hopeit.fs_storage.events.stream_batch_storage import FlushSignal
+from hopeit.app.config import Compression, Serialization
+from hopeit.fs_storage.events.stream_batch_storage import FRAME_HEADER, FlushSignal
+from hopeit.server.serialization import deserialize_sync
 
 
 from hopeit.testing.apps import execute_event
@@ -62,3 +64,35 @@ async def test_buffer_object_and_flush_signal(app_config, test_objs):  # noqa: F
                 saved_objects[obj.object_id] = obj
     assert len(saved_objects) == 1
     assert test_obj == saved_objects[test_obj.object_id]
+
+
+async def test_buffer_objects_and_flush_partitions_msgpack(app_config, test_objs):  # noqa: F811
+    settings = app_config.settings["test_stream_batch_storage"]
+    settings["serialization"] = Serialization.MSGPACK.value
+    test_save_path = settings["path"]
+
+    for test_obj in test_objs:
+        result = await execute_event(
+            app_config=app_config, event_name="test_stream_batch_storage", payload=test_obj
+        )
+        assert result is None
+
+    await asyncio.sleep(1)  # Allow aiofiles to save
+
+    assert glob(f"{test_save_path}/2020/05/01/**/*.jsonlines") == []
+    saved_objects = {}
+    for file_name in glob(f"{test_save_path}/2020/05/01/**/*.msgpack.batch"):
+        with open(file_name, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            (length,) = FRAME_HEADER.unpack_from(data, pos)
+            pos += FRAME_HEADER.size
+            obj = deserialize_sync(
+                data[pos : pos + length], Serialization.MSGPACK, Compression.NONE, MyObject
+            )
+            pos += length
+            saved_objects[obj.object_id] = obj
+    assert len(saved_objects) == len(test_objs)
+    for obj in test_objs:
+        assert obj == saved_objects[obj.object_id]
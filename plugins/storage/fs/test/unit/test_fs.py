@@ -6,8 +6,10 @@ import os
 from pathlib import Path
 
 import aiofiles
+import msgpack  # type: ignore
 
 import hopeit.fs_storage as fs_module
+from hopeit.app.config import Serialization
 from hopeit.dataobjects import dataclass, dataobject
 from hopeit.fs_storage import FileStorage, FileStorageSettings, ItemLocator
 
@@ -320,3 +322,25 @@ async def test_with_settings():
     fs = FileStorage.with_settings(settings=setting)
     assert fs.path == Path("/tmp/")
     assert fs.partition_dateformat == "%Y/%m/%d"
+
+
+async def test_save_load_msgpack_file():
+    key = "MSGPACKFILE"
+    fs = FileStorage(path=f"/tmp/{key}/", serialization=Serialization.MSGPACK)
+    path = await fs.store(key, test_fs_with_ts)
+    assert path == f"/tmp/{key}/{key}.msgpack"
+    with open(path, "rb") as f:
+        assert msgpack.unpackb(f.read()) == {"test": "test_fs", "ts": "2022-03-01T00:00:00Z"}
+    loaded = await fs.get(key, datatype=FsMockData)
+    assert loaded == test_fs_with_ts
+    assert type(loaded) is FsMockData
+    assert await fs.list_objects() == [ItemLocator(key, None)]
+    await fs.delete(key)
+    assert await fs.get(key, datatype=FsMockData) is None
+
+
+async def test_with_settings_serialization():
+    setting = FileStorageSettings(path="/tmp/", serialization=Serialization.MSGPACK)
+    fs = FileStorage.with_settings(settings=setting)
+    assert fs.serialization == Serialization.MSGPACK
+    assert fs.suffix == ".msgpack"
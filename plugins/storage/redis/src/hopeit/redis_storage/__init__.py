@@ -7,8 +7,10 @@ from typing import Optional, Type, Generic, Any, List
 
 import redis.asyncio as redis
 
+from hopeit.app.config import Compression, Serialization
 from hopeit.dataobjects import DataObject
 from hopeit.dataobjects.payload import Payload
+from hopeit.server.serialization import deserialize_sync, serialize_sync
 
 __all__ = ["RedisStorage"]
 
@@ -21,13 +23,21 @@ class RedisStorage(Generic[DataObject]):
         ```
         redis_store = RedisStorage().connect(address="redis://hostname:6379")
         ```
+    Dataobjects are stored as json by default. Other serialization formats, i.e. `msgpack`,
+    can be specified on creation:
+        ```
+        redis_store = RedisStorage(serialization=Serialization.MSGPACK).connect(...)
+        ```
     """
 
-    def __init__(self) -> None:
+    def __init__(self, serialization: Serialization = Serialization.JSON_UTF8) -> None:
         """
         Setups Redis connection
+
+        :param serialization: Serialization, format used to store dataobjects, default json
         """
         self._conn: Optional[redis.Redis] = None
+        self.serialization = serialization
 
     def connect(self, *, address: str, username: str = "", password: str = "") -> Any:
         """
@@ -52,6 +62,10 @@ class RedisStorage(Generic[DataObject]):
         assert self._conn
         payload_str = await self._conn.get(key)
         if payload_str:
+            if self.serialization != Serialization.JSON_UTF8:
+                return deserialize_sync(  # type: ignore[return-value]
+                    payload_str, self.serialization, Compression.NONE, datatype
+                )
             return Payload.from_json(payload_str, datatype)
         return None
 
@@ -81,8 +95,11 @@ class RedisStorage(Generic[DataObject]):
 
         """
         assert self._conn
-        payload_str = str(Payload.to_json(value))
-        await self._conn.set(key, payload_str, **kwargs)
+        if self.serialization != Serialization.JSON_UTF8:
+            payload = serialize_sync(value, self.serialization, Compression.NONE)
+        else:
+            payload = Payload.to_json_bytes(value)
+        await self._conn.set(key, payload, **kwargs)
 
     async def delete(self, *keys: str):
         """
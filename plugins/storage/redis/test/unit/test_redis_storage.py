@@ -1,7 +1,9 @@
 from typing import Any, Dict, Optional
 from uuid import uuid4
 from fnmatch import fnmatch
+import msgpack  # type: ignore
 import redis.asyncio as redis
+from hopeit.app.config import Serialization
 from hopeit.dataobjects import dataclass, dataobject
 from hopeit.dataobjects.payload import Payload
 
@@ -24,7 +26,7 @@ async def store_item():
     redis = RedisStorage().connect(address=test_url)
     await redis.store(test_key, test_redis)
     assert test_key in redis._conn.items
-    assert redis._conn.items[test_key] == Payload.to_json(test_redis)
+    assert redis._conn.items[test_key] == Payload.to_json_bytes(test_redis)
 
 
 async def store_item_extra_args():
@@ -32,7 +34,7 @@ async def store_item_extra_args():
     await redis.store(test_key, test_redis, ex=60)  # ttl 60 secconds
     assert redis._conn.set_called_with == {"ex": 60}
     assert test_key in redis._conn.items
-    assert redis._conn.items[test_key] == Payload.to_json(test_redis)
+    assert redis._conn.items[test_key] == Payload.to_json_bytes(test_redis)
 
 
 async def get_item():
@@ -143,3 +145,13 @@ async def test_get_item_not_found(monkeypatch):
 async def test_connect(monkeypatch):
     monkeypatch.setattr(redis, "from_url", MockRedisPool.from_url)
     await connect()
+
+
+async def test_store_get_msgpack(monkeypatch):
+    monkeypatch.setattr(redis, "from_url", MockRedisPool.from_url)
+    redis_store = RedisStorage(serialization=Serialization.MSGPACK).connect(address=test_url)
+    await redis_store.store("msgpack_key", test_redis)
+    assert redis_store._conn.items["msgpack_key"] == msgpack.packb({"test": "test_redis"})
+    loaded = await redis_store.get("msgpack_key", datatype=RedisMockData)
+    assert loaded == test_redis
+    assert type(loaded) is RedisMockData
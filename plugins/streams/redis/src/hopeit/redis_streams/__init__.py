@@ -3,27 +3,219 @@
 import asyncio
 import json
 import base64
+import inspect
 import uuid
 from datetime import datetime, timezone
-from typing import Callable, Dict, List, Any, Optional, Union
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 
 import redis.asyncio as redis
 from redis import RedisError, ResponseError
 from redis.exceptions import ConnectionError as RedisConnectionError
 
-from hopeit.app.config import Compression, Serialization, StreamQueue
+from hopeit.app.config import Compression, Serialization, StreamEnvelope, StreamQueue
 from hopeit.dataobjects import EventPayload
+from hopeit.redis_streams.envelope import (
+    ENVELOPE_FIELD,
+    CompactEnvelope,
+    EnvelopeShared,
+    datatype_ids,
+    decode_envelope,
+    encode_envelope,
+    encode_envelope_shared,
+    name_id,
+)
 from hopeit.server.config import StreamsConfig
-from hopeit.server.serialization import deserialize, serialize
+from hopeit.server.offload import PayloadCodec
 from hopeit.server.logger import engine_logger, extra_logger
-from hopeit.streams import StreamManager, StreamEvent, StreamOSError
+from hopeit.streams import (
+    StreamManager,
+    StreamEvent,
+    StreamOSError,
+    partition_stream_name,
+)
 
 logger = engine_logger()
 extra = extra_logger()
 
 DEFAULT_QUEUE = StreamQueue.AUTO.encode()
 
-ConnectionFactory = Callable[[str], redis.Redis]
+# Max number of XADD commands sent to Redis in a single pipeline round trip
+WRITE_BATCH_CHUNK_SIZE = 1000
+
+# Number of stream consumers sharing each connection of the pool used for XACK and XGROUP commands
+CONSUMERS_PER_ACK_CONNECTION = 4
+
+# Connection factories receive Redis address, and `max_connections` keyword argument
+# if they accept it, to limit the size of the connection pool of the client created
+ConnectionFactory = Callable[..., redis.Redis]
+
+# Registers consumer as active, drops consumers not seen during lease time, and assigns
+# an equal share of partitions to consumer: renewing leases already held, and taking free
+# partitions in order until share is reached. Leases held over consumer share are renewed
+# but not returned, so they are kept until consumer releases them explicitly, once messages
+# already read from them are processed.
+# KEYS: active consumers sorted set, followed by lease key of each partition
+# ARGV: consumer id, lease time in milliseconds
+_ASSIGN_PARTITIONS_SCRIPT = """
+local consumer, lease = ARGV[1], tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZADD', KEYS[1], now, consumer)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - lease)
+redis.call('PEXPIRE', KEYS[1], 2 * lease)
+local share = math.ceil((#KEYS - 1) / redis.call('ZCARD', KEYS[1]))
+local assigned = {}
+for i = 2, #KEYS do
+    if redis.call('GET', KEYS[i]) == consumer then
+        redis.call('PEXPIRE', KEYS[i], lease)
+        if #assigned < share then
+            table.insert(assigned, i - 2)
+        end
+    end
+end
+for i = 2, #KEYS do
+    if #assigned >= share then
+        break
+    end
+    if redis.call('SET', KEYS[i], consumer, 'NX', 'PX', lease) then
+        table.insert(assigned, i - 2)
+    end
+end
+return assigned
+"""
+
+# Deletes partition leases held by consumer, and unregisters consumer if requested
+# KEYS: active consumers sorted set, followed by lease key of each partition to release
+# ARGV: consumer id, 1 to unregister consumer or 0 to keep it active
+_RELEASE_PARTITIONS_SCRIPT = """
+if ARGV[2] == '1' then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+end
+for i = 2, #KEYS do
+    if redis.call('GET', KEYS[i]) == ARGV[1] then
+        redis.call('DEL', KEYS[i])
+    end
+end
+return 0
+"""
+
+_SERIALIZATIONS: Dict[bytes, Serialization] = {s.value.encode(): s for s in Serialization}
+
+
+def _serialization(value: bytes) -> Serialization:
+    serialization = _SERIALIZATIONS.get(value)
+    if serialization is None:
+        serialization = Serialization(value.decode())
+    return serialization
+
+
+def _as_str(value: Union[str, bytes]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisStreamEvent(StreamEvent):
+    """
+    StreamEvent read from Redis, keeping raw message fields to decode
+    `track_ids` and `auth_info` only when accessed. Both are decoded at once for messages using
+    compact envelope.
+    `source` is shared by all events read in a batch: stream name, consumer group and
+    track headers to extract from message.
+    Events unpacked from a message with many `packed` payloads share message fields,
+    taking `stream.event_id` and `stream.event_ts` from their own payload.
+    """
+
+    __slots__ = ("_fields", "_envelope", "_source", "_read_ts")
+
+    def __init__(
+        self,
+        *,
+        msg_internal_id: bytes,
+        queue: str,
+        payload: EventPayload,
+        fields: Dict[bytes, bytes],
+        envelope: Optional[CompactEnvelope],
+        source: Tuple[str, str, List[str]],
+        read_ts: str,
+        packed: int = 1,
+    ):
+        super().__init__(msg_internal_id, queue, payload, packed=packed)
+        self._fields = fields
+        self._envelope = envelope
+        self._source = source
+        self._read_ts = read_ts
+
+    def _decode_track_ids(self) -> Dict[str, str]:
+        stream_name, consumer_group, track_headers = self._source
+        envelope = self._envelope
+        if envelope is None:
+            fields = self._fields
+            track_ids = {
+                "stream.name": stream_name,
+                "stream.msg_id": self.msg_internal_id.decode(),
+                "stream.consumer_group": consumer_group,
+                "stream.submit_ts": fields[b"submit_ts"].decode(),
+                "stream.event_ts": fields[b"event_ts"].decode(),
+                "stream.event_id": fields[b"id"].decode(),
+                "stream.read_ts": self._read_ts,
+                **{k: (fields.get(k.encode()) or b"").decode() for k in track_headers},
+                "track.operation_id": str(uuid.uuid4()),
+            }
+        else:
+            metadata = envelope.metadata()
+            if self._auth_info is None:
+                self._auth_info = _auth_info(metadata.auth_info)
+            track_ids = {
+                "stream.name": stream_name,
+                "stream.msg_id": self.msg_internal_id.decode(),
+                "stream.consumer_group": consumer_group,
+                "stream.submit_ts": metadata.submit_ts,
+                "stream.event_ts": metadata.event_ts,
+                "stream.event_id": metadata.event_id,
+                "stream.read_ts": self._read_ts,
+                **{k: metadata.track_ids.get(name_id(k), "") for k in track_headers},
+                "track.operation_id": str(uuid.uuid4()),
+            }
+        if self.packed > 1:
+            track_ids["stream.event_id"] = str(self.payload.event_id())  # type: ignore
+            track_ids["stream.event_ts"] = _event_ts(self.payload)
+        return track_ids
+
+    def _decode_auth_info(self) -> Dict[str, Any]:
+        if self._envelope is None:
+            return json.loads(base64.b64decode(self._fields.get(b"auth_info", b"{}")))
+        return _auth_info(self._envelope.metadata().auth_info)
+
+
+def _auth_info(encoded: Optional[str]) -> Dict[str, Any]:
+    return {} if encoded is None else json.loads(encoded)
+
+
+def _event_ts(payload: EventPayload) -> str:
+    event_ts = payload.event_ts()  # type: ignore
+    if isinstance(event_ts, datetime):
+        return event_ts.astimezone(tz=timezone.utc).isoformat()
+    if isinstance(event_ts, str):
+        return event_ts
+    return ""
+
+
+def _pack(payloads: List[EventPayload], pack_size: int) -> List[List[EventPayload]]:
+    """
+    Splits payloads in groups of up to `pack_size` consecutive payloads of the same datatype,
+    preserving order
+    """
+    if pack_size <= 1:
+        return [[payload] for payload in payloads]
+    groups: List[List[EventPayload]] = []
+    group: List[EventPayload] = []
+    for payload in payloads:
+        if group and (len(group) == pack_size or type(payload) is not type(group[0])):
+            groups.append(group)
+            group = []
+        group.append(payload)
+    if group:
+        groups.append(group)
+    return groups
 
 
 class RedisStreamManager(StreamManager):
@@ -31,12 +223,20 @@ class RedisStreamManager(StreamManager):
 
     # __connection_factory must be initialized during redis_streams plugin setup event
     __connection_factory: Optional[ConnectionFactory] = None
+    __factory_limits_connections: bool = False
 
     @classmethod
-    def connection_factory(cls, address: str) -> redis.Redis:
+    def connection_factory(cls, address: str, max_connections: Optional[int] = None) -> redis.Redis:
+        """
+        Creates a Redis client with its own connection pool. If `max_connections` is specified,
+        and the registered factory accepts `max_connections` argument, pool size is limited to it,
+        without exceeding configured plugin max_connections.
+        """
         assert cls.__connection_factory is not None, (
             "Redis Streams connection factory not initialized. Check if Redis Streams plugin `setup_redis_pool` event not configured"
         )
+        if max_connections and cls.__factory_limits_connections:
+            return cls.__connection_factory(address, max_connections=max_connections)
         return cls.__connection_factory(address)
 
     @classmethod
@@ -45,6 +245,9 @@ class RedisStreamManager(StreamManager):
             "Redis Streams connection factory already initialized."
         )
         cls.__connection_factory = connection_factory
+        cls.__factory_limits_connections = (
+            "max_connections" in inspect.signature(connection_factory).parameters
+        )
 
     def __init__(self, *, address: str):
         """
@@ -54,38 +257,75 @@ class RedisStreamManager(StreamManager):
         """
         self.address = address
         self.consumer_id = self._consumer_id()
+        self.expected_consumers = 0
         self._write_pool: redis.Redis
-        self._read_pool: redis.Redis
+        self._ack_pool: redis.Redis
+        self._reader_pools: Dict[Tuple[str, str], redis.Redis] = {}
+        self._codec = PayloadCodec(StreamsConfig())
+
+    def set_expected_consumers(self, consumers: int) -> None:
+        """
+        Sets the number of stream consumers expected to read using this stream manager,
+        used to size the connection pool for acks and control commands on `connect()`.
+        """
+        self.expected_consumers = consumers
 
     async def connect(self, config: StreamsConfig) -> StreamManager:
         """
-        Create separate Redis clients for stream reads and writes.
+        Create separate Redis clients for stream writes and for acks and control commands.
+        Blocking reads use a dedicated client per consumer, created on its first read.
 
         The clients and their connection pools are created by the factory initialized
-        by the Redis Streams plugin SETUP event.
+        by the Redis Streams plugin SETUP event. When the number of expected consumers is known,
+        acks pool is limited to one connection every `CONSUMERS_PER_ACK_CONNECTION` consumers,
+        plus one for control commands. Payloads are encoded and decoded offloading large messages
+        according to `offload_*` settings in `config`.
 
         :param config: Engine stream configuration required by the StreamManager interface.
         :return: This connected stream manager.
         """
         logger.info(__name__, f"Connecting address={self.address}...")
         try:
+            ack_pool_size = None
+            if self.expected_consumers > 0:
+                ack_pool_size = 1 + (
+                    (self.expected_consumers + CONSUMERS_PER_ACK_CONNECTION - 1)
+                    // CONSUMERS_PER_ACK_CONNECTION
+                )
+            self._codec = PayloadCodec(config)
             self._write_pool = self.connection_factory(self.address)
-            self._read_pool = self.connection_factory(self.address)
+            self._ack_pool = self.connection_factory(self.address, ack_pool_size)
             return self
         except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
             logger.error(__name__, e)
             raise StreamOSError(e) from e
 
     async def close(self):
-        """Close both Redis clients and their connection pools."""
+        """Close all Redis clients and their connection pools."""
 
         async def _close(pool) -> None:
             if pool:
                 await pool.aclose(close_connection_pool=True)
             return None
 
-        self._read_pool = await _close(self._read_pool)
+        for reader_pool in self._reader_pools.values():
+            await _close(reader_pool)
+        self._reader_pools.clear()
+        self._ack_pool = await _close(self._ack_pool)
         self._write_pool = await _close(self._write_pool)
+        self._codec.shutdown()
+
+    def _reader_pool(self, stream_name: str, consumer_group: str) -> redis.Redis:
+        """
+        Returns client with a single dedicated connection used for blocking reads
+        of a consumer group from a stream, so blocked reads do not hold connections
+        needed by acks or other consumers.
+        """
+        key = (stream_name, consumer_group)
+        reader_pool = self._reader_pools.get(key)
+        if reader_pool is None:
+            reader_pool = self._reader_pools[key] = self.connection_factory(self.address, 1)
+        return reader_pool
 
     async def write_stream(
         self,
@@ -98,6 +338,7 @@ class RedisStreamManager(StreamManager):
         compression: Compression,
         serialization: Serialization,
         target_max_len: int = 0,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
     ) -> int:
         """
         Writes event to a Redis stream using XADD
@@ -110,11 +351,12 @@ class RedisStreamManager(StreamManager):
         :param serialization: Serialization, supported serialization format from enum
         :param target_max_len: int, max_len to indicate approx. target collection size to Redis,
             default 0 will not send max_len to Redis.
+        :param envelope: StreamEnvelope, format used to encode message metadata, default `fields`.
         :return: number of successful written messages
         """
         try:
             event_fields = await self._encode_message(
-                payload, queue, track_ids, auth_info, compression, serialization
+                payload, queue, track_ids, auth_info, compression, serialization, envelope
             )
             ok = await self._write_pool.xadd(
                 name=stream_name,
@@ -126,6 +368,132 @@ class RedisStreamManager(StreamManager):
         except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
             raise StreamOSError(e) from e
 
+    async def write_stream_batch(
+        self,
+        *,
+        stream_name: str,
+        queue: str,
+        payloads: List[EventPayload],
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+        compression: Compression,
+        serialization: Serialization,
+        target_max_len: int = 0,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
+        pack_size: int = 0,
+    ) -> int:
+        """
+        Writes a batch of events to a Redis stream, sending XADD commands using a
+        non-transactional pipeline, in chunks of up to `WRITE_BATCH_CHUNK_SIZE` commands
+        per round trip. Events are written in the same order as `payloads`.
+        :param stream_name: stream name or key used by Redis
+        :param queue: queue name to be saved into the messages. Will not affect provided stream_name.
+        :param payloads: List[EventPayload], dataclass objects decorated with `@dataobject`
+        :param track_ids: dict with key and id values to track in stream events
+        :param auth_info: dict with auth info to be tracked as part of stream events
+        :param compression: Compression, supported compression algorithm from enum
+        :param serialization: Serialization, supported serialization format from enum
+        :param target_max_len: int, max_len to indicate approx. target collection size to Redis,
+            default 0 will not send max_len to Redis.
+        :param envelope: StreamEnvelope, format used to encode message metadata, default `fields`.
+        :param pack_size: int, max number of consecutive payloads of the same datatype packed in a
+            single message, default 0 writes one message per payload.
+        :return: number of successful written events
+        """
+        return await self.write_stream_fanout(
+            targets=[(stream_name, queue)],
+            payloads=payloads,
+            track_ids=track_ids,
+            auth_info=auth_info,
+            compression=compression,
+            serialization=serialization,
+            target_max_len=target_max_len,
+            envelope=envelope,
+            pack_size=pack_size,
+        )
+
+    async def write_stream_fanout(
+        self,
+        *,
+        targets: List[Tuple[str, str]],
+        payloads: List[EventPayload],
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+        compression: Compression,
+        serialization: Serialization,
+        target_max_len: int = 0,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
+        pack_size: int = 0,
+    ) -> int:
+        """
+        Writes a batch of events to multiple Redis streams. Each payload is serialized
+        and compressed once, and its encoded fields are sent to every target stream,
+        only replacing queue name. XADD commands are sent using a non-transactional pipeline,
+        in chunks of up to `WRITE_BATCH_CHUNK_SIZE` commands per round trip.
+        If `pack_size` > 1, up to `pack_size` consecutive payloads of the same datatype are
+        compressed together and written in a single message with a `pack` field containing
+        the number of packed payloads. Message metadata is taken from the first payload.
+        :param targets: List[Tuple[str, str]], Redis stream name and queue name of each target
+        :param payloads: List[EventPayload], dataclass objects decorated with `@dataobject`
+        :param track_ids: dict with key and id values to track in stream events
+        :param auth_info: dict with auth info to be tracked as part of stream events
+        :param compression: Compression, supported compression algorithm from enum
+        :param serialization: Serialization, supported serialization format from enum
+        :param target_max_len: int, max_len to indicate approx. target collection size to Redis,
+            default 0 will not send max_len to Redis.
+        :param envelope: StreamEnvelope, format used to encode message metadata, default `fields`.
+        :param pack_size: int, max number of consecutive payloads of the same datatype packed in a
+            single message, default 0 writes one message per payload.
+        :return: number of successful written events, adding up all targets
+        """
+        if len(targets) == 0:
+            return 0
+        try:
+            compact_shared = None
+            shared_fields = {}
+            if envelope == StreamEnvelope.COMPACT:
+                compact_shared = encode_envelope_shared(track_ids, auth_info, serialization)
+            if compact_shared is None:
+                shared_fields = self._encode_shared_fields(track_ids, auth_info, serialization)
+            encoded_queues = [(stream_name, queue.encode()) for stream_name, queue in targets]
+            chunk_size = max(1, WRITE_BATCH_CHUNK_SIZE // len(targets))
+            groups = _pack(payloads, pack_size)
+            written = 0
+            for i in range(0, len(groups), chunk_size):
+                chunk = groups[i : i + chunk_size]
+                async with self._write_pool.pipeline(transaction=False) as pipe:
+                    for group in chunk:
+                        if len(group) > 1:
+                            event_fields = await self._encode_packed_fields(
+                                group,
+                                compact_shared,
+                                shared_fields,
+                                compression,
+                                serialization,
+                            )
+                        elif compact_shared is not None:
+                            event_fields = await self._encode_compact_fields(
+                                group[0], compact_shared, compression, serialization
+                            )
+                        else:
+                            event_fields = await self._encode_payload_fields(
+                                group[0], shared_fields, compression, serialization
+                            )
+                        for stream_name, queue in encoded_queues:
+                            pipe.xadd(
+                                name=stream_name,
+                                fields={**event_fields, "queue": queue},
+                                maxlen=target_max_len if target_max_len > 0 else None,
+                                approximate=True,
+                            )
+                    results = await pipe.execute()
+                written += sum(
+                    len(chunk[j // len(targets)]) for j, msg_id in enumerate(results) if msg_id
+                )
+            return written
+        except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
+            raise StreamOSError(e) from e
+
     async def ensure_consumer_group(self, *, stream_name: str, consumer_group: str):
         """
         Ensure a consumer group exists for a given stream.
@@ -138,7 +506,7 @@ class RedisStreamManager(StreamManager):
         :param consumer_group: str, consumer group passed to Redis
         """
         try:
-            await self._read_pool.xgroup_create(
+            await self._ack_pool.xgroup_create(
                 name=stream_name, groupname=consumer_group, id="0", mkstream=True
             )
         except ResponseError:
@@ -165,6 +533,8 @@ class RedisStreamManager(StreamManager):
     ) -> List[Union[StreamEvent, Exception]]:
         """
         Read a batch of events using a Redis consumer group.
+        Messages containing many packed payloads are unpacked into one event per payload,
+        sharing `msg_internal_id`, so `batch_size` limits the number of messages read.
 
         The Redis read blocks for up to ``timeout`` milliseconds. If no messages are
         returned, this method waits for ``batch_interval`` milliseconds and returns an
@@ -184,7 +554,7 @@ class RedisStreamManager(StreamManager):
         :return: A list containing decoded stream events or per-message decoding errors.
         """
         try:
-            response = await self._read_pool.xreadgroup(
+            response = await self._reader_pool(stream_name, consumer_group).xreadgroup(
                 groupname=consumer_group,
                 consumername=self.consumer_id,
                 streams={stream_name: offset},
@@ -193,39 +563,9 @@ class RedisStreamManager(StreamManager):
             )
 
             if len(response) != 0:
-                batch = response[0][1]
-                logger.debug(
-                    __name__,
-                    "Received batch",
-                    extra=extra(
-                        prefix="stream.",
-                        name=stream_name,
-                        consumer_group=consumer_group,
-                        batch_size=len(batch),
-                        head=batch[0][0],
-                        tail=batch[-1][0],
-                    ),
+                return await self._decode_batch(
+                    stream_name, response[0][1], consumer_group, datatypes, track_headers
                 )
-                stream_events: List[Union[StreamEvent, Exception]] = []
-                for msg in batch:
-                    read_ts = datetime.now(tz=timezone.utc).isoformat()
-                    msg_type = msg[1][b"type"].decode()
-                    datatype = datatypes.get(msg_type)
-                    if datatype is None:
-                        err_msg = f"Cannot read msg_id={msg[0].decode()}: msg_type={msg_type} is not any of {datatypes}"
-                        stream_events.append(TypeError(err_msg))
-                    else:
-                        stream_events.append(
-                            await self._decode_message(
-                                stream_name,
-                                msg,
-                                datatype,
-                                consumer_group,
-                                track_headers,
-                                read_ts,
-                            )
-                        )
-                return stream_events
 
             #  Wait some time if no messages to prevent race condition in connection pool
             await asyncio.sleep(batch_interval / 1000.0)
@@ -233,6 +573,178 @@ class RedisStreamManager(StreamManager):
         except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
             raise StreamOSError(e) from e
 
+    async def read_partitions(
+        self,
+        *,
+        stream_name: str,
+        partitions: List[int],
+        consumer_group: str,
+        datatypes: Dict[str, type],
+        track_headers: List[str],
+        offset: str,
+        batch_size: int,
+        timeout: int,
+        batch_interval: int,
+    ) -> List[Tuple[str, Union[StreamEvent, Exception]]]:
+        """
+        Reads a batch of events from partitions of a partitioned stream using a single
+        XREADGROUP request for all partition streams, so the read returns as soon as any
+        partition has messages. Reads use the same dedicated connection as `read_stream`
+        for `stream_name`.
+
+        :param stream_name: str, base stream name of partitioned stream, including queue suffix
+        :param partitions: List[int], partition numbers to read
+        :param consumer_group: str, consumer group registered in Redis
+        :param datatypes: Dict[str, type] supported datatypes name: type to be extracted from stream.
+        :param track_headers: list of headers/id fields to extract from message if available
+        :param offset: str, last msg id consumed to resume from. Use'>' to consume unconsumed events
+        :param batch_size: max number of messages to read from each partition
+        :param timeout: time to block waiting for messages, in milliseconds
+        :param batch_interval: int, time to sleep between requests to connection pool in case no
+            messages are returned. In milliseconds. Used to prevent blocking the pool.
+        :return: list of partition stream name and decoded stream event or decoding error
+        """
+        try:
+            response = await self._reader_pool(stream_name, consumer_group).xreadgroup(
+                groupname=consumer_group,
+                consumername=self.consumer_id,
+                streams={
+                    partition_stream_name(stream_name, partition): offset
+                    for partition in partitions
+                },
+                count=batch_size,
+                block=timeout,
+            )
+            stream_events: List[Tuple[str, Union[StreamEvent, Exception]]] = []
+            for read_stream_name, batch in response:
+                if len(batch) == 0:
+                    continue
+                read_stream_name = _as_str(read_stream_name)
+                stream_events.extend(
+                    (read_stream_name, stream_event)
+                    for stream_event in await self._decode_batch(
+                        read_stream_name, batch, consumer_group, datatypes, track_headers
+                    )
+                )
+            if len(stream_events) == 0:
+                #  Wait some time if no messages to prevent race condition in connection pool
+                await asyncio.sleep(batch_interval / 1000.0)
+            return stream_events
+        except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
+            raise StreamOSError(e) from e
+
+    async def claim_pending(
+        self,
+        *,
+        stream_name: str,
+        consumer_group: str,
+        datatypes: Dict[str, type],
+        track_headers: List[str],
+        start_id: str,
+        batch_size: int,
+    ) -> Tuple[str, List[Union[StreamEvent, Exception]]]:
+        """
+        Claims messages pending in consumer group using XAUTOCLAIM, so messages read
+        by a previous consumer of a partition and not acknowledged are processed
+        by this consumer. Messages deleted from stream while pending are skipped.
+
+        :param stream_name: str, stream name or key used by Redis
+        :param consumer_group: str, consumer group registered in Redis
+        :param datatypes: Dict[str, type] supported datatypes name: type to be extracted from stream.
+        :param track_headers: list of headers/id fields to extract from message if available
+        :param start_id: str, message id to start claiming from, "0-0" to start from first
+        :param batch_size: max number of messages to claim
+        :return: message id to continue claiming from, "0-0" if no pending messages are left,
+            and decoded stream events or decoding errors
+        """
+        try:
+            response = await self._ack_pool.xautoclaim(
+                stream_name,
+                consumer_group,
+                self.consumer_id,
+                min_idle_time=0,
+                start_id=start_id,
+                count=batch_size,
+            )
+            next_id, batch = _as_str(response[0]), [msg for msg in response[1] if msg[1]]
+            if len(batch) == 0:
+                return next_id, []
+            return next_id, await self._decode_batch(
+                stream_name, batch, consumer_group, datatypes, track_headers
+            )
+        except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
+            raise StreamOSError(e) from e
+
+    async def assign_partitions(
+        self, *, stream_name: str, consumer_group: str, partitions: int, lease_ms: int
+    ) -> List[int]:
+        """
+        Assigns partitions of a partitioned stream to this consumer using leases stored in Redis,
+        running a Lua script so assignment is atomic. Every call registers this consumer
+        as active in consumer group, and partitions are shared equally among consumers
+        active during the last `lease_ms` milliseconds: partitions already assigned are renewed
+        and kept, up to this consumer share, so assignment changes only when consumers join
+        or leave the group.
+        :param stream_name: str, base stream name of partitioned stream
+        :param consumer_group: str, consumer group registered in Redis
+        :param partitions: int, number of partitions of the stream
+        :param lease_ms: int, time in milliseconds assignment is valid if not renewed
+        :return: list of partition numbers assigned to this consumer
+        """
+        try:
+            assigned = await self._ack_pool.eval(
+                _ASSIGN_PARTITIONS_SCRIPT,
+                partitions + 1,
+                *self._partition_keys(stream_name, consumer_group, partitions),
+                self.consumer_id,
+                lease_ms,
+            )
+            return sorted(int(partition) for partition in assigned)
+        except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
+            raise StreamOSError(e) from e
+
+    async def release_partitions(
+        self,
+        *,
+        stream_name: str,
+        consumer_group: str,
+        partitions: int,
+        released: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Releases partitions assigned to this consumer, so they can be assigned to other consumers
+        without waiting for leases to expire. If `released` is not specified, all partitions
+        are released and consumer is unregistered from active consumers.
+        :param stream_name: str, base stream name of partitioned stream
+        :param consumer_group: str, consumer group registered in Redis
+        :param partitions: int, number of partitions of the stream
+        :param released: optional list of partition numbers to release, keeping consumer active
+        """
+        keys = self._partition_keys(stream_name, consumer_group, partitions)
+        if released is not None:
+            keys = [keys[0], *(keys[partition + 1] for partition in released)]
+        try:
+            await self._ack_pool.eval(
+                _RELEASE_PARTITIONS_SCRIPT,
+                len(keys),
+                *keys,
+                self.consumer_id,
+                1 if released is None else 0,
+            )
+        except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
+            raise StreamOSError(e) from e
+
+    @staticmethod
+    def _partition_keys(stream_name: str, consumer_group: str, partitions: int) -> List[str]:
+        """
+        Returns keys of active consumers sorted set and partition leases of a consumer group
+        """
+        prefix = f"{stream_name}:{consumer_group}"
+        return [
+            f"{prefix}:consumers",
+            *(f"{prefix}:partition:{partition}" for partition in range(partitions)),
+        ]
+
     async def ack_read_stream(
         self, *, stream_name: str, consumer_group: str, stream_event: StreamEvent
     ):
@@ -247,7 +759,7 @@ class RedisStreamManager(StreamManager):
         :param stream_event: StreamEvent, as provided by `read_stream(...)` method
         """
         try:
-            ack = await self._read_pool.xack(
+            ack = await self._ack_pool.xack(
                 stream_name, consumer_group, stream_event.msg_internal_id
             )
             assert ack == 1
@@ -255,6 +767,104 @@ class RedisStreamManager(StreamManager):
         except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
             raise StreamOSError(e) from e
 
+    async def ack_read_stream_batch(
+        self, *, stream_name: str, consumer_group: str, stream_events: List[StreamEvent]
+    ) -> int:
+        """
+        Acknowledges a batch of read messages to Redis streams using a single XACK command.
+        :param stream_name: str, stream name or key used by Redis
+        :param consumer_group: str, consumer group registered with Redis
+        :param stream_events: List[StreamEvent], as provided by `read_stream(...)` method
+        :return: number of acknowledged messages
+        """
+        if len(stream_events) == 0:
+            return 0
+        try:
+            return await self._ack_pool.xack(
+                stream_name,
+                consumer_group,
+                *(stream_event.msg_internal_id for stream_event in stream_events),
+            )
+        except (OSError, RedisError, RedisConnectionError) as e:  # pragma: no cover
+            raise StreamOSError(e) from e
+
+    async def _decode_batch(
+        self,
+        stream_name: str,
+        batch: List[Any],
+        consumer_group: str,
+        datatypes: Dict[str, type],
+        track_headers: List[str],
+    ) -> List[Union[StreamEvent, Exception]]:
+        """
+        Decodes messages read from a stream, returning a stream event per payload,
+        or an error for each message that cannot be decoded
+        """
+        logger.debug(
+            __name__,
+            "Received batch",
+            extra=extra(
+                prefix="stream.",
+                name=stream_name,
+                consumer_group=consumer_group,
+                batch_size=len(batch),
+                head=batch[0][0],
+                tail=batch[-1][0],
+            ),
+        )
+        stream_events: List[Union[StreamEvent, Exception]] = []
+        types_by_id: Optional[Dict[int, type]] = None
+        for msg in batch:
+            read_ts = datetime.now(tz=timezone.utc).isoformat()
+            header = msg[1].get(ENVELOPE_FIELD)
+            envelope = None
+            if header is None:
+                msg_type = msg[1][b"type"].decode()
+                datatype = datatypes.get(msg_type)
+            else:
+                try:
+                    envelope = decode_envelope(header)
+                except ValueError as e:
+                    stream_events.append(e)
+                    continue
+                if types_by_id is None:
+                    types_by_id = datatype_ids(datatypes)
+                msg_type = f"id:{envelope.type_id}"
+                datatype = types_by_id.get(envelope.type_id)
+            if datatype is None:
+                err_msg = f"Cannot read msg_id={msg[0].decode()}: msg_type={msg_type} is not any of {datatypes}"
+                stream_events.append(TypeError(err_msg))
+                continue
+            try:
+                if b"pack" in msg[1]:
+                    stream_events.extend(
+                        await self._decode_packed_message(
+                            stream_name,
+                            msg,
+                            datatype,
+                            consumer_group,
+                            track_headers,
+                            read_ts,
+                            envelope,
+                        )
+                    )
+                else:
+                    stream_events.append(
+                        await self._decode_message(
+                            stream_name,
+                            msg,
+                            datatype,
+                            consumer_group,
+                            track_headers,
+                            read_ts,
+                            envelope,
+                        )
+                    )
+            except ValueError as e:  # i.e. compression dictionary not registered
+                err_msg = f"Cannot read msg_id={msg[0].decode()}: {e}"
+                stream_events.append(ValueError(err_msg))
+        return stream_events
+
     async def _encode_message(
         self,
         payload: EventPayload,
@@ -263,35 +873,121 @@ class RedisStreamManager(StreamManager):
         auth_info: Dict[str, Any],
         compression: Compression,
         serialization: Serialization,
+        envelope: StreamEnvelope = StreamEnvelope.FIELDS,
     ) -> dict:
         """
         Extract dictionary of fields to be sent to Redis from a DataEvent
         :param payload, DataEvent
-        :return: dict of str containing:
+        :return: dict of str containing, using `fields` envelope:
             :id: extracted from payload.event_id() method
             :type: datatype name
             :submit_ts: datetime at the moment of this call, in UTC ISO format
             :event_ts: extracted from payload.event_ts() if defined, if not empty string
             :payload: json serialized payload
+            using `compact` envelope, event metadata is sent in `env` binary header field,
+            see `hopeit.redis_streams.envelope`
         """
+        compact_shared = None
+        if envelope == StreamEnvelope.COMPACT:
+            compact_shared = encode_envelope_shared(track_ids, auth_info, serialization)
+        if compact_shared is not None:
+            event_fields = await self._encode_compact_fields(
+                payload, compact_shared, compression, serialization
+            )
+        else:
+            event_fields = await self._encode_payload_fields(
+                payload,
+                self._encode_shared_fields(track_ids, auth_info, serialization),
+                compression,
+                serialization,
+            )
+        event_fields["queue"] = queue.encode()
+        return event_fields
+
+    @staticmethod
+    def _encode_shared_fields(
+        track_ids: Dict[str, str],
+        auth_info: Dict[str, Any],
+        serialization: Serialization,
+    ) -> dict:
+        """
+        Encodes fields that are the same for all messages written in a batch:
+        track_ids, auth_info and serialization
+        """
+        return {
+            **{k: v or "" for k, v in track_ids.items()},
+            "auth_info": base64.b64encode(json.dumps(auth_info).encode()),
+            "ser": serialization.value,
+        }
+
+    async def _encode_payload_fields(
+        self,
+        payload: EventPayload,
+        shared_fields: dict,
+        compression: Compression,
+        serialization: Serialization,
+    ) -> dict:
+        """
+        Encodes fields specific to a payload, merged with already encoded `shared_fields`.
+        `comp` field records the compression method used, resolved if `compression` is `auto`,
+        and the compression dictionary used, if one is configured for payload datatype.
+        """
+        encoded_payload, comp = await self._codec.encode(payload, serialization, compression)
+        return {
+            **self._payload_fields(payload, shared_fields, comp),
+            "payload": encoded_payload,
+        }
+
+    @staticmethod
+    def _payload_fields(payload: EventPayload, shared_fields: dict, comp: str) -> dict:
         datatype = type(payload)
-        event_fields = {
+        return {
             "id": payload.event_id(),  # type: ignore
             "type": f"{datatype.__module__}.{datatype.__qualname__}",
             "submit_ts": datetime.now(tz=timezone.utc).isoformat(),
-            "event_ts": "",
-            **{k: v or "" for k, v in track_ids.items()},
-            "auth_info": base64.b64encode(json.dumps(auth_info).encode()),
-            "ser": serialization.value,
-            "comp": compression.value,
-            "payload": await serialize(payload, serialization, compression),
-            "queue": queue.encode(),
+            "event_ts": _event_ts(payload),
+            **shared_fields,
+            "comp": comp,
         }
-        event_ts = payload.event_ts()  # type: ignore
-        if isinstance(event_ts, datetime):
-            event_fields["event_ts"] = event_ts.astimezone(tz=timezone.utc).isoformat()
-        elif isinstance(event_ts, str):
-            event_fields["event_ts"] = event_ts
+
+    async def _encode_compact_fields(
+        self,
+        payload: EventPayload,
+        shared: EnvelopeShared,
+        compression: Compression,
+        serialization: Serialization,
+    ) -> dict:
+        """
+        Encodes payload and its metadata using compact envelope format, with `shared` header
+        values from `encode_envelope_shared`.
+        """
+        encoded_payload, comp = await self._codec.encode(payload, serialization, compression)
+        return {
+            ENVELOPE_FIELD: encode_envelope(payload, comp, shared),
+            "payload": encoded_payload,
+        }
+
+    async def _encode_packed_fields(
+        self,
+        payloads: List[EventPayload],
+        compact_shared: Optional[EnvelopeShared],
+        shared_fields: dict,
+        compression: Compression,
+        serialization: Serialization,
+    ) -> dict:
+        """
+        Encodes payloads of the same datatype compressed together in a single `payload` field,
+        with metadata of the first payload, using compact envelope if `compact_shared`
+        is provided. `pack` field contains the number of packed payloads.
+        """
+        encoded_payload, comp = await self._codec.encode_batch(payloads, serialization, compression)
+        event_fields: dict
+        if compact_shared is not None:
+            event_fields = {ENVELOPE_FIELD: encode_envelope(payloads[0], comp, compact_shared)}
+        else:
+            event_fields = self._payload_fields(payloads[0], shared_fields, comp)
+        event_fields["payload"] = encoded_payload
+        event_fields["pack"] = len(payloads)
         return event_fields
 
     async def _decode_message(
@@ -302,28 +998,72 @@ class RedisStreamManager(StreamManager):
         consumer_group: str,
         track_headers: List[str],
         read_ts: str,
+        envelope: Optional[CompactEnvelope] = None,
     ):
-        """Decode and deserialize a message from a Redis stream."""
+        """
+        Decode and deserialize a message from a Redis stream.
+        Messages using compact envelope are decoded using already decoded `envelope` header.
+        """
         assert isinstance(msg[0], bytes) and isinstance(msg[1], dict), (
             "Invalid message format. Expected `[bytes, bytes, Dict[bytes, bytes]]`"
         )
-        compression = Compression(msg[1][b"comp"].decode())
-        serialization = Serialization(msg[1][b"ser"].decode())
-        payload = await deserialize(msg[1][b"payload"], serialization, compression, datatype)
-        return StreamEvent(
+        fields = msg[1]
+        if envelope is None:
+            payload = await self._codec.decode(
+                fields[b"payload"],
+                _serialization(fields[b"ser"]),
+                fields[b"comp"].decode(),
+                datatype,
+            )
+        else:
+            payload = await self._codec.decode(
+                fields[b"payload"], envelope.serialization, envelope.comp, datatype
+            )
+        return RedisStreamEvent(
             msg_internal_id=msg[0],
             payload=payload,
-            queue=msg[1].get(b"queue", DEFAULT_QUEUE).decode(),  # Default ensures backwards compat
-            track_ids={
-                "stream.name": stream_name,
-                "stream.msg_id": msg[0].decode(),
-                "stream.consumer_group": consumer_group,
-                "stream.submit_ts": msg[1][b"submit_ts"].decode(),
-                "stream.event_ts": msg[1][b"event_ts"].decode(),
-                "stream.event_id": msg[1][b"id"].decode(),
-                "stream.read_ts": read_ts,
-                **{k: (msg[1].get(k.encode()) or b"").decode() for k in track_headers},
-                "track.operation_id": str(uuid.uuid4()),
-            },
-            auth_info=json.loads(base64.b64decode(msg[1].get(b"auth_info", b"{}"))),
+            queue=fields.get(b"queue", DEFAULT_QUEUE).decode(),  # Default ensures backwards compat
+            fields=fields,
+            envelope=envelope,
+            source=(stream_name, consumer_group, track_headers),
+            read_ts=read_ts,
         )
+
+    async def _decode_packed_message(
+        self,
+        stream_name: str,
+        msg: List[Union[bytes, Dict[bytes, bytes]]],
+        datatype: type,
+        consumer_group: str,
+        track_headers: List[str],
+        read_ts: str,
+        envelope: Optional[CompactEnvelope] = None,
+    ) -> List[RedisStreamEvent]:
+        """
+        Decode and deserialize all payloads packed in a message from a Redis stream,
+        returning one event per payload.
+        """
+        assert isinstance(msg[0], bytes) and isinstance(msg[1], dict), (
+            "Invalid message format. Expected `[bytes, bytes, Dict[bytes, bytes]]`"
+        )
+        fields = msg[1]
+        if envelope is None:
+            serialization, comp = _serialization(fields[b"ser"]), fields[b"comp"].decode()
+        else:
+            serialization, comp = envelope.serialization, envelope.comp
+        payloads = await self._codec.decode_batch(fields[b"payload"], serialization, comp, datatype)
+        queue = fields.get(b"queue", DEFAULT_QUEUE).decode()
+        source = (stream_name, consumer_group, track_headers)
+        return [
+            RedisStreamEvent(
+                msg_internal_id=msg[0],
+                payload=payload,
+                queue=queue,
+                fields=fields,
+                envelope=envelope,
+                source=source,
+                read_ts=read_ts,
+                packed=len(payloads),
+            )
+            for payload in payloads
+        ]
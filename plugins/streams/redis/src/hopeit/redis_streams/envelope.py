@@ -0,0 +1,281 @@
+"""
+Compact envelope format for Redis stream messages.
+
+Event metadata is packed in a single binary `env` field, next to `payload` and `queue` fields:
+
+    version: uint8, currently 1
+    flags: uint8, bit set indicating optional values present in header
+    type_id: uint32, id of payload datatype name
+    submit_ts: int64, microseconds since epoch (UTC)
+    event_ts: int64, microseconds since epoch (UTC), if event_ts is a datetime, 0 otherwise
+    count: uint16, number of string values
+    track_count: uint16, number of track ids
+    track_keys: track_count x uint32, ids of track ids keys
+    lengths: count x uint16, length in characters of each string value
+    values: utf-8 encoded concatenation of string values:
+        comp, ser, event_id,
+        event_ts, only if payload event_ts is a string,
+        auth_info json, only if auth_info is not empty,
+        track_ids values, in the same order as track_keys
+
+Datatype names and track ids keys are interned as CRC32 ids of their names: readers resolve
+them from the datatypes and track headers they already expect, so no registry is needed.
+String values are limited to 65535 characters, and track ids keys ids must not collide:
+batches not fitting these limits are sent using `fields` envelope.
+String values are decoded with a single utf-8 decode and split using lengths.
+Compression and serialization come first, so readers decode the rest of the header
+only when event metadata is used.
+"""
+
+import json
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from hopeit.app.config import Serialization
+from hopeit.dataobjects import EventPayload
+
+__all__ = [
+    "ENVELOPE_FIELD",
+    "ENVELOPE_VERSION",
+    "CompactEnvelope",
+    "EnvelopeMetadata",
+    "name_id",
+    "datatype_ids",
+    "encode_envelope_shared",
+    "encode_envelope",
+    "decode_envelope",
+]
+
+ENVELOPE_FIELD = b"env"
+ENVELOPE_VERSION = 1
+
+_HEADER = struct.Struct("!BBIqqHH")
+_MAX_LENGTH = 0xFFFF
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+_EVENT_TS_DATETIME = 1
+_EVENT_TS_STR = 2
+_AUTH_INFO = 4
+
+_SERIALIZATIONS = {serialization.value: serialization for serialization in Serialization}
+
+# flags, serialization, track keys ids, lengths and concatenation of auth_info and track values
+EnvelopeShared = Tuple[int, str, bytes, List[int], str]
+
+
+class EnvelopeMetadata(NamedTuple):
+    """
+    Event metadata decoded from compact envelope header.
+    Timestamps are UTC ISO formatted, as in `fields` envelope format.
+    `track_ids` values are indexed by id of track ids keys, see `name_id`.
+    """
+
+    submit_ts: str
+    event_ts: str
+    event_id: str
+    auth_info: Optional[str]
+    track_ids: Dict[int, str]
+
+
+class CompactEnvelope:
+    """
+    Compact envelope header, decoding only values required to deserialize payload:
+    `type_id`, `comp` and `serialization`. The rest of event metadata is decoded calling
+    `metadata()`.
+    """
+
+    __slots__ = (
+        "type_id",
+        "comp",
+        "serialization",
+        "_header",
+        "_flags",
+        "_submit_ts_us",
+        "_event_ts_us",
+        "_count",
+        "_track_count",
+    )
+
+    def __init__(self, header: bytes):
+        version, flags, type_id, submit_ts_us, event_ts_us, count, track_count = (
+            _HEADER.unpack_from(header)
+        )
+        if version != ENVELOPE_VERSION:
+            raise ValueError(f"Unsupported stream envelope version={version}")
+        lengths_pos = _HEADER.size + 4 * track_count
+        comp_len, ser_len = _lengths(2).unpack_from(header, lengths_pos)
+        # comp and ser are ascii, so their lengths in characters and bytes are the same
+        start = lengths_pos + 2 * count
+        ser = header[start + comp_len : start + comp_len + ser_len].decode()
+        self.type_id: int = type_id
+        self.comp = header[start : start + comp_len].decode()
+        self.serialization = _SERIALIZATIONS.get(ser) or Serialization(ser)
+        self._header = header
+        self._flags = flags
+        self._submit_ts_us = submit_ts_us
+        self._event_ts_us = event_ts_us
+        self._count = count
+        self._track_count = track_count
+
+    def metadata(self) -> EnvelopeMetadata:
+        header, flags, count, track_count = (
+            self._header,
+            self._flags,
+            self._count,
+            self._track_count,
+        )
+        track_keys = _keys(track_count).unpack_from(header, _HEADER.size)
+        lengths_pos = _HEADER.size + 4 * track_count
+        text = header[lengths_pos + 2 * count :].decode()
+        values = []
+        pos = 0
+        for length in _lengths(count).unpack_from(header, lengths_pos):
+            values.append(text[pos : pos + length])
+            pos += length
+        i = 3
+        event_ts = ""
+        if flags & _EVENT_TS_DATETIME:
+            event_ts = _from_micros(self._event_ts_us)
+        elif flags & _EVENT_TS_STR:
+            event_ts = values[i]
+            i += 1
+        auth_info = None
+        if flags & _AUTH_INFO:
+            auth_info = values[i]
+            i += 1
+        return EnvelopeMetadata(
+            submit_ts=_from_micros(self._submit_ts_us),
+            event_ts=event_ts,
+            event_id=values[2],
+            auth_info=auth_info,
+            track_ids=dict(zip(track_keys, values[i:])),
+        )
+
+
+@lru_cache(maxsize=1024)
+def name_id(name: str) -> int:
+    """
+    Returns integer id for a datatype full name or track id key,
+    used in message headers instead of names
+    """
+    return zlib.crc32(name.encode())
+
+
+def datatype_ids(datatypes: Dict[str, type]) -> Dict[int, type]:
+    """
+    Returns datatypes indexed by id of their full names, see `name_id`.
+    Raises `ValueError` if two datatypes have the same id, since messages of one of them
+    would be silently read as the other.
+    """
+    ids: Dict[int, type] = {}
+    names: Dict[int, str] = {}
+    for name, datatype in datatypes.items():
+        type_id = name_id(name)
+        if type_id in names:
+            raise ValueError(
+                f"Datatypes {names[type_id]} and {name} have the same compact envelope "
+                f"type_id={type_id}: rename one of them or use `fields` envelope"
+            )
+        ids[type_id] = datatype
+        names[type_id] = name
+    return ids
+
+
+def encode_envelope_shared(
+    track_ids: Dict[str, str], auth_info: Dict[str, Any], serialization: Serialization
+) -> Optional[EnvelopeShared]:
+    """
+    Prepares header values that are the same for all messages written in a batch:
+    serialization, auth_info if not empty, and track_ids.
+    Returns None if values cannot be encoded in compact envelope, that is, when
+    auth_info or a track id value is longer than 65535 characters, or two track ids keys
+    have the same id. In that case `fields` envelope should be used instead.
+    """
+    flags = 0
+    values = []
+    if auth_info:
+        flags |= _AUTH_INFO
+        values.append(json.dumps(auth_info))
+    values.extend(value or "" for value in track_ids.values())
+    lengths = [len(value) for value in values]
+    keys = {name_id(key) for key in track_ids}
+    if len(keys) < len(track_ids) or any(length > _MAX_LENGTH for length in lengths):
+        return None
+    return (
+        flags,
+        serialization.value,
+        _keys(len(track_ids)).pack(*(name_id(key) for key in track_ids)),
+        lengths,
+        "".join(values),
+    )
+
+
+def encode_envelope(payload: EventPayload, comp: str, shared: EnvelopeShared) -> bytes:
+    """
+    Encodes message header for a payload, using `shared` values from `encode_envelope_shared`.
+    Raises `ValueError` if payload event_id or event_ts is longer than 65535 characters.
+    """
+    flags, serialization, track_keys, shared_lengths, shared_values = shared
+    datatype = type(payload)
+    event_ts = payload.event_ts()  # type: ignore
+    event_ts_us = 0
+    values = [comp, serialization, str(payload.event_id())]  # type: ignore
+    if isinstance(event_ts, datetime):
+        flags |= _EVENT_TS_DATETIME
+        event_ts_us = _to_micros(event_ts)
+    elif isinstance(event_ts, str):
+        flags |= _EVENT_TS_STR
+        values.append(event_ts)
+    lengths = [len(value) for value in values]
+    if any(length > _MAX_LENGTH for length in lengths):
+        raise ValueError(
+            f"Cannot encode event_id or event_ts longer than {_MAX_LENGTH} characters "
+            "in compact envelope, use `fields` envelope"
+        )
+    lengths.extend(shared_lengths)
+    values.append(shared_values)
+    return b"".join(
+        (
+            _HEADER.pack(
+                ENVELOPE_VERSION,
+                flags,
+                name_id(f"{datatype.__module__}.{datatype.__qualname__}"),
+                _to_micros(datetime.now(tz=timezone.utc)),
+                event_ts_us,
+                len(lengths),
+                len(track_keys) // 4,
+            ),
+            track_keys,
+            _lengths(len(lengths)).pack(*lengths),
+            "".join(values).encode(),
+        )
+    )
+
+
+def decode_envelope(header: bytes) -> CompactEnvelope:
+    """
+    Decodes message header. Raises `ValueError` if header version is not supported.
+    """
+    return CompactEnvelope(header)
+
+
+@lru_cache(maxsize=256)
+def _lengths(count: int) -> struct.Struct:
+    return struct.Struct(f"!{count}H")
+
+
+@lru_cache(maxsize=256)
+def _keys(count: int) -> struct.Struct:
+    return struct.Struct(f"!{count}I")
+
+
+def _to_micros(ts: datetime) -> int:
+    return (ts.astimezone(tz=timezone.utc) - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
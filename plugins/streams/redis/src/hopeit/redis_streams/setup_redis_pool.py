@@ -1,5 +1,7 @@
 """SETUP event that configures Redis Streams clients with blocking connection pools."""
 
+from typing import Optional
+
 from hopeit.app.context import EventContext
 from hopeit.redis_streams import RedisStreamManager
 from hopeit.redis_streams.settings import RedisAuthSettings, RedisPoolSettings
@@ -17,13 +19,17 @@ async def init_redis_streams(payload: None, context: EventContext) -> None:
     auth_settings = context.settings(key="redis_auth", datatype=RedisAuthSettings)
     pool_settings = context.settings(key="redis_pool", datatype=RedisPoolSettings)
 
-    def connection_factory(address: str):
+    def connection_factory(address: str, max_connections: Optional[int] = None):
         return redis.Redis(
             connection_pool=BlockingConnectionPool.from_url(
                 address,
                 username=auth_settings.username.get_secret_value(),
                 password=auth_settings.password.get_secret_value(),
-                max_connections=pool_settings.max_connections,
+                max_connections=(
+                    min(max_connections, pool_settings.max_connections)
+                    if max_connections
+                    else pool_settings.max_connections
+                ),
                 timeout=pool_settings.pool_timeout,
                 socket_timeout=pool_settings.socket_timeout,
                 socket_connect_timeout=pool_settings.socket_connect_timeout,
@@ -1,6 +1,12 @@
 import asyncio
+from typing import Dict, List
 
+import pytest
+
+from hopeit import redis_streams
 from hopeit.redis_streams import setup_redis_pool
+from hopeit.server.compression import train_zstd_dictionary
+from hopeit.server.offload import PayloadCodec
 import redis.asyncio as redis
 from redis import ResponseError
 
@@ -14,14 +20,18 @@ from hopeit.app.config import (
     EventDescriptor,
     EventType,
     Serialization,
+    StreamEnvelope,
 )
 from hopeit.dataobjects import dataclass, dataobject
+from hopeit.dataobjects.payload import Payload
 from hopeit.server.config import AuthType, StreamsConfig
 from hopeit.server.version import APPS_API_VERSION
 from hopeit.testing.apps import create_test_context
 
 from hopeit.streams import StreamEvent
-from hopeit.redis_streams import RedisStreamManager
+from hopeit.redis_streams import RedisStreamEvent, RedisStreamManager
+from hopeit.redis_streams import envelope as envelope_module
+from hopeit.redis_streams.envelope import ENVELOPE_FIELD, datatype_ids, decode_envelope, name_id
 from hopeit.redis_streams.setup_redis_pool import BlockingConnectionPool
 
 from . import MockEventHandler, TestStreamData
@@ -138,12 +148,12 @@ async def write_stream():
 async def ensure_consumer_group():
     mgr = await create_stream_manager()
     await mgr.ensure_consumer_group(stream_name="test_stream", consumer_group="test_group")
-    assert mgr._read_pool.xgroup_name == "test_stream"
-    assert mgr._read_pool.xgroup_groupname == "test_group"
-    assert mgr._read_pool.xgroup_latest_id == "0"
-    assert mgr._read_pool.xgroup_mkstream is True
+    assert mgr._ack_pool.xgroup_name == "test_stream"
+    assert mgr._ack_pool.xgroup_groupname == "test_group"
+    assert mgr._ack_pool.xgroup_latest_id == "0"
+    assert mgr._ack_pool.xgroup_mkstream is True
     await mgr.ensure_consumer_group(stream_name="test_stream", consumer_group="test_group")
-    assert mgr._read_pool.xgroup_exists
+    assert mgr._ack_pool.xgroup_exists
     await mgr.close()
 
 
@@ -204,7 +214,33 @@ async def ack_read_stream():
         stream_name="test_stream", consumer_group="test_group", stream_event=stream_event
     )
     assert res == 1
-    assert mgr._read_pool.xack_msg_id == msg_id
+    assert mgr._ack_pool.xack_msg_id == msg_id
+
+
+async def ack_read_stream_batch():
+    stream_events = [
+        StreamEvent(
+            msg_internal_id=msg_id,
+            queue=TestStreamData.test_queue,
+            payload=TestStreamData.test_payload,
+            track_ids=TestStreamData.test_track_ids,
+            auth_info={"auth_type": AuthType.UNSECURED, "allowed": "true"},
+        )
+        for msg_id in (b"0000000000-0", b"0000000000-1", b"0000000000-2")
+    ]
+    mgr = await create_stream_manager()
+    await mgr.ensure_consumer_group(stream_name="test_stream", consumer_group="test_group")
+    res = await mgr.ack_read_stream_batch(
+        stream_name="test_stream", consumer_group="test_group", stream_events=stream_events
+    )
+    assert res == 3
+    assert mgr._ack_pool.xack_msg_ids == [b"0000000000-0", b"0000000000-1", b"0000000000-2"]
+    assert mgr._ack_pool.xack_count == 1
+    res = await mgr.ack_read_stream_batch(
+        stream_name="test_stream", consumer_group="test_group", stream_events=[]
+    )
+    assert res == 0
+    assert mgr._ack_pool.xack_count == 1
 
 
 async def test_write_stream(monkeypatch):
@@ -249,6 +285,11 @@ async def test_ack_read_stream(monkeypatch):
     await ack_read_stream()
 
 
+async def test_ack_read_stream_batch(monkeypatch):
+    patch_redis_client(monkeypatch)
+    await ack_read_stream_batch()
+
+
 async def test_connect_uses_blocking_pool_settings(monkeypatch):
     patch_redis_client(monkeypatch)
     mgr = await create_stream_manager(
@@ -269,11 +310,74 @@ async def test_connect_uses_blocking_pool_settings(monkeypatch):
         "health_check_interval": 0.0,
         "protocol": 2,
     }
-    assert mgr._read_pool.connection_kwargs == mgr._write_pool.connection_kwargs
-    assert mgr._write_pool is not mgr._read_pool
+    assert mgr._ack_pool.connection_kwargs == mgr._write_pool.connection_kwargs
+    assert mgr._write_pool is not mgr._ack_pool
     await mgr.close()
     assert mgr._write_pool is None
-    assert mgr._read_pool is None
+    assert mgr._ack_pool is None
+
+
+async def test_dedicated_reader_pools(monkeypatch):
+    patch_redis_client(monkeypatch)
+    stream_config = StreamsConfig()
+    mgr = await create_stream_manager(max_connections=3)
+    await mgr.close()
+    mgr = RedisStreamManager(address=MockRedisPool.test_url)
+    mgr.set_expected_consumers(10)
+    await mgr.connect(stream_config)
+    assert mgr._write_pool.connection_kwargs["max_connections"] == 3
+    assert mgr._ack_pool.connection_kwargs["max_connections"] == 3
+
+    mgr = RedisStreamManager(address=MockRedisPool.test_url)
+    mgr.set_expected_consumers(2)
+    await mgr.connect(stream_config)
+    assert mgr._write_pool.connection_kwargs["max_connections"] == 3
+    assert mgr._ack_pool.connection_kwargs["max_connections"] == 2
+
+    for stream_name in ("test_stream", "test_stream.q1"):
+        await mgr.ensure_consumer_group(stream_name=stream_name, consumer_group="test_group")
+        for _ in range(2):
+            await mgr.read_stream(
+                stream_name=stream_name,
+                consumer_group="test_group",
+                datatypes={"unit.test_redis_streams.MockData": MockData},
+                track_headers=[],
+                offset=">",
+                batch_size=1,
+                batch_interval=1000,
+                timeout=1,
+            )
+    reader_pools = dict(mgr._reader_pools)
+    assert set(reader_pools.keys()) == {
+        ("test_stream", "test_group"),
+        ("test_stream.q1", "test_group"),
+    }
+    for reader_pool in reader_pools.values():
+        assert reader_pool.connection_kwargs["max_connections"] == 1
+        assert reader_pool.xread_count == 2
+        assert reader_pool is not mgr._ack_pool
+    assert mgr._ack_pool.xread_count == 0
+    await mgr.close()
+    assert mgr._reader_pools == {}
+    assert all(reader_pool.aclosed for reader_pool in reader_pools.values())
+
+
+async def test_connection_factory_without_max_connections(monkeypatch):
+    patch_redis_client(monkeypatch)
+    addresses = []
+
+    def connection_factory(address: str):
+        addresses.append(address)
+        return redis.Redis(connection_pool=BlockingConnectionPool.from_url(address))
+
+    setattr(RedisStreamManager, "_RedisStreamManager__connection_factory", None)
+    RedisStreamManager.setup_connection_factory(connection_factory)
+    mgr = RedisStreamManager(address=MockRedisPool.test_url)
+    await mgr.connect(StreamsConfig())
+    assert addresses == [MockRedisPool.test_url] * 2
+    assert mgr._ack_pool.connection_kwargs == {}
+    await mgr.close()
+    setattr(RedisStreamManager, "_RedisStreamManager__connection_factory", None)
 
 
 async def test_write_stream_concurrent_low_max_connections(monkeypatch):
@@ -299,9 +403,107 @@ async def test_write_stream_concurrent_low_max_connections(monkeypatch):
     await mgr.close()
 
 
+async def test_write_stream_batch(monkeypatch):
+    patch_redis_client(monkeypatch)
+    monkeypatch.setattr(redis_streams, "WRITE_BATCH_CHUNK_SIZE", 2)
+    mgr = await create_stream_manager()
+    payloads = [
+        MockData(f"test_value_{i}", datetime.fromtimestamp(0, tz=timezone.utc)) for i in range(5)
+    ]
+    res = await mgr.write_stream_batch(
+        stream_name="test_stream",
+        queue=TestStreamData.test_queue,
+        payloads=payloads,
+        track_ids=MockEventHandler.test_track_ids,
+        auth_info={"auth_type": AuthType.UNSECURED, "allowed": "true"},
+        target_max_len=10,
+        compression=Compression.NONE,
+        serialization=Serialization.JSON_UTF8,
+    )
+    assert res == 5
+    pipelines = mgr._write_pool.pipelines
+    assert [len(pipe.commands) for pipe in pipelines] == [2, 2, 1]
+    assert all(pipe.transaction is False and pipe.executed for pipe in pipelines)
+    commands = [command for pipe in pipelines for command in pipe.commands]
+    assert [c["fields"]["id"] for c in commands] == [f"test_value_{i}" for i in range(5)]
+    assert all(c["name"] == "test_stream" and c["maxlen"] == 10 for c in commands)
+    assert commands[0]["fields"]["payload"] == (
+        b'{"value":"test_value_0","ts":"1970-01-01T00:00:00Z"}'
+    )
+    assert commands[0]["fields"]["queue"] == TestStreamData.test_queue.encode()
+    await mgr.close()
+
+
+async def test_write_stream_fanout(monkeypatch):
+    patch_redis_client(monkeypatch)
+    monkeypatch.setattr(redis_streams, "WRITE_BATCH_CHUNK_SIZE", 4)
+    serialized = []
+
+    codec_serialize = PayloadCodec.serialize
+
+    async def counting_serialize(self, payload, serialization, compression, dict_id=0):
+        serialized.append(payload)
+        return await codec_serialize(self, payload, serialization, compression, dict_id)
+
+    monkeypatch.setattr(PayloadCodec, "serialize", counting_serialize)
+    mgr = await create_stream_manager()
+    payloads = [
+        MockData(f"test_value_{i}", datetime.fromtimestamp(0, tz=timezone.utc)) for i in range(3)
+    ]
+    res = await mgr.write_stream_fanout(
+        targets=[("test_stream.q1", "q1"), ("test_stream", "AUTO")],
+        payloads=payloads,
+        track_ids=MockEventHandler.test_track_ids,
+        auth_info={"auth_type": AuthType.UNSECURED, "allowed": "true"},
+        target_max_len=10,
+        compression=Compression.NONE,
+        serialization=Serialization.JSON_UTF8,
+    )
+    assert res == 6
+    assert serialized == payloads
+    pipelines = mgr._write_pool.pipelines
+    assert [len(pipe.commands) for pipe in pipelines] == [4, 2]
+    commands = [command for pipe in pipelines for command in pipe.commands]
+    assert [(c["name"], c["fields"]["id"], c["fields"]["queue"]) for c in commands] == [
+        ("test_stream.q1", "test_value_0", b"q1"),
+        ("test_stream", "test_value_0", b"AUTO"),
+        ("test_stream.q1", "test_value_1", b"q1"),
+        ("test_stream", "test_value_1", b"AUTO"),
+        ("test_stream.q1", "test_value_2", b"q1"),
+        ("test_stream", "test_value_2", b"AUTO"),
+    ]
+    assert commands[0]["fields"]["payload"] == commands[1]["fields"]["payload"]
+    assert commands[0]["fields"]["auth_info"] == (
+        b"eyJhdXRoX3R5cGUiOiAiVW5zZWN1cmVkIiwgImFsbG93ZWQiOiAidHJ1ZSJ9"
+    )
+    await mgr.close()
+
+
+class MockRedisPipeline:
+    def __init__(self, transaction: bool):
+        self.transaction = transaction
+        self.commands = []
+        self.executed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def xadd(self, name, fields, id=b"*", maxlen=None, approximate=True):
+        self.commands.append({"name": name, "fields": fields, "maxlen": maxlen})
+        return self
+
+    async def execute(self):
+        self.executed = True
+        return [f"{i}-0".encode() for i in range(len(self.commands))]
+
+
 class MockRedisPool:
     test_url: str = "redis://test_url"
     message_count = 10
+    consumer_groups: Dict[str, str] = {}
     test_msg = [
         b"0000000000-0",
         {
@@ -335,7 +537,12 @@ class MockRedisPool:
         self.xgroup_mkstream = None
         self.xgroup_exists = False
         self.xread_consumername = None
+        self.xread_count = 0
         self.xack_msg_id = None
+        self.xack_msg_ids = []
+        self.xack_count = 0
+        self.eval_calls = []
+        self.pipelines = []
         self.closed = False
         self.aclosed = False
 
@@ -367,28 +574,42 @@ class MockRedisPool:
         finally:
             self._active_connections -= 1
 
+    def pipeline(self, transaction=True):
+        pipe = MockRedisPipeline(transaction)
+        self.pipelines.append(pipe)
+        return pipe
+
     async def xgroup_create(self, name, groupname, id="$", mkstream=False):
         if self.xgroup_name == name and self.xgroup_groupname == groupname:
             self.xgroup_exists = True
             raise ResponseError
         self.xgroup_name = name
         self.xgroup_groupname = groupname
+        MockRedisPool.consumer_groups[name] = groupname
         self.xgroup_latest_id = id
         self.xgroup_mkstream = mkstream
 
     async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
         if groupname == "empty_batch":
             return []
-        assert self.xgroup_groupname == groupname
-        assert {self.xgroup_name: ">"} == streams
+        ((stream_name, offset),) = streams.items()
+        assert MockRedisPool.consumer_groups[stream_name] == groupname
+        assert offset == ">"
         self.xread_consumername = consumername
-        return [[self.xgroup_name, [MockRedisPool.test_msg for _ in range(count)]]]
+        self.xread_count += 1
+        return [[stream_name, [MockRedisPool.test_msg for _ in range(count)]]]
 
     async def xack(self, name, groupname, id, *ids):
         assert self.xgroup_groupname == groupname
         assert self.xgroup_name == name
         self.xack_msg_id = id
-        return 1
+        self.xack_msg_ids = [id, *ids]
+        self.xack_count += 1
+        return 1 + len(ids)
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        self.eval_calls.append((script, keys_and_args[:numkeys], keys_and_args[numkeys:]))
+        return [2, 0]
 
     async def close(self):
         self.closed = True
@@ -396,3 +617,575 @@ class MockRedisPool:
     async def aclose(self, close_connection_pool=None):
         assert close_connection_pool is True
         self.aclosed = True
+
+
+async def test_connect_configures_payload_offload(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = RedisStreamManager(address=MockRedisPool.test_url)
+    await mgr.connect(StreamsConfig(offload_threshold_bytes=1024, offload_max_workers=2))
+    assert mgr._codec.threshold_bytes == 1024
+    assert mgr._codec.max_workers == 2
+    await mgr.close()
+    assert mgr._codec._executor is None
+
+
+async def test_compression_dictionary(monkeypatch, tmp_path):
+    patch_redis_client(monkeypatch)
+    samples = [
+        Payload.to_json_bytes(MockData(f"value_{i}", datetime.fromtimestamp(i, tz=timezone.utc)))
+        for i in range(1000)
+    ]
+    dict_path = tmp_path / "mock_data.zdict"
+    with open(dict_path, "wb") as f:
+        f.write(train_zstd_dictionary(samples, 1024))
+    datatype_name = f"{MockData.__module__}.{MockData.__qualname__}"
+    mgr = RedisStreamManager(address=MockRedisPool.test_url)
+    await mgr.connect(StreamsConfig(compression_dictionaries={datatype_name: str(dict_path)}))
+    dict_id = mgr._codec.dictionaries[datatype_name]
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    fields = await mgr._encode_message(
+        payload,
+        "AUTO",
+        MockEventHandler.test_track_ids,
+        {},
+        Compression.ZSTD,
+        Serialization.JSON_UTF8,
+    )
+    assert fields["comp"] == f"zstd@{dict_id}"
+    stream_event = await mgr._decode_message(
+        "test_stream",
+        [b"0000000000-0", {k.encode(): _as_bytes(v) for k, v in fields.items()}],
+        MockData,
+        "test_group",
+        [],
+        datetime.now(tz=timezone.utc).isoformat(),
+    )
+    assert stream_event.payload == payload
+    await mgr.close()
+
+
+def _as_bytes(value) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+async def test_auto_compression(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = RedisStreamManager(address=MockRedisPool.test_url)
+    await mgr.connect(StreamsConfig(auto_compression_min_bytes=100))
+    small = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    large = MockData("test_value" * 100, datetime.fromtimestamp(0, tz=timezone.utc))
+    for payload, expected_comp in ((small, "none"), (large, "lz4")):
+        fields = await mgr._encode_message(
+            payload,
+            "AUTO",
+            MockEventHandler.test_track_ids,
+            {},
+            Compression.AUTO,
+            Serialization.JSON_UTF8,
+        )
+        assert fields["comp"] == expected_comp
+        stream_event = await mgr._decode_message(
+            "test_stream",
+            [b"0000000000-0", {k.encode(): _as_bytes(v) for k, v in fields.items()}],
+            MockData,
+            "test_group",
+            [],
+            datetime.now(tz=timezone.utc).isoformat(),
+        )
+        assert stream_event.payload == payload
+    await mgr.close()
+
+
+async def test_msgpack_serialization(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    fields = await mgr._encode_message(
+        payload,
+        "AUTO",
+        MockEventHandler.test_track_ids,
+        {},
+        Compression.LZ4,
+        Serialization.MSGPACK,
+    )
+    assert fields["ser"] == "msgpack"
+    stream_event = await mgr._decode_message(
+        "test_stream",
+        [b"0000000000-0", {k.encode(): _as_bytes(v) for k, v in fields.items()}],
+        MockData,
+        "test_group",
+        [],
+        datetime.now(tz=timezone.utc).isoformat(),
+    )
+    assert stream_event.payload == payload
+    await mgr.close()
+
+
+async def test_write_read_compact_envelope(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    res = await mgr.write_stream(
+        stream_name="test_stream",
+        queue=TestStreamData.test_queue,
+        payload=payload,
+        track_ids=MockEventHandler.test_track_ids,
+        auth_info={"auth_type": AuthType.UNSECURED, "allowed": "true"},
+        compression=Compression.NONE,
+        serialization=Serialization.JSON_UTF8,
+        envelope=StreamEnvelope.COMPACT,
+    )
+    assert res == 1
+    written_fields = mgr._write_pool.xadd_fields
+    assert set(written_fields.keys()) == {ENVELOPE_FIELD, "payload", "queue"}
+    header = decode_envelope(written_fields[ENVELOPE_FIELD])
+    assert header.comp == "none"
+    assert header.serialization == Serialization.JSON_UTF8
+    metadata = header.metadata()
+    assert metadata.event_id == "test_value"
+    assert metadata.event_ts == "1970-01-01T00:00:00+00:00"
+    assert metadata.track_ids == {name_id(k): v for k, v in MockEventHandler.test_track_ids.items()}
+    assert datetime.fromisoformat(metadata.submit_ts) <= datetime.now(tz=timezone.utc)
+
+    test_msg = [
+        b"0000000000-0",
+        {(k if isinstance(k, bytes) else k.encode()): v for k, v in written_fields.items()},
+    ]
+    monkeypatch.setattr(MockRedisPool, "test_msg", test_msg)
+    stream_events = await mgr.read_stream(
+        stream_name="test_stream",
+        consumer_group="test_group",
+        datatypes={"unit.test_redis_streams.MockData": MockData},
+        track_headers=list(MockEventHandler.test_track_ids.keys()),
+        offset=">",
+        batch_size=10,
+        batch_interval=1000,
+        timeout=1,
+    )
+    assert len(stream_events) == MockRedisPool.message_count
+    for stream_event in stream_events:
+        assert isinstance(stream_event, StreamEvent)
+        assert stream_event.payload == payload
+        assert stream_event.queue == TestStreamData.test_queue
+        assert stream_event.auth_info == {"auth_type": "Unsecured", "allowed": "true"}
+        assert stream_event.track_ids["stream.event_id"] == "test_value"
+        assert stream_event.track_ids["stream.event_ts"] == "1970-01-01T00:00:00+00:00"
+        assert stream_event.track_ids["stream.submit_ts"] == metadata.submit_ts
+        for k, v in MockEventHandler.test_track_ids.items():
+            if k != "track.operation_id":
+                assert stream_event.track_ids[k] == v
+    await mgr.close()
+
+
+@pytest.mark.parametrize("envelope", [StreamEnvelope.FIELDS, StreamEnvelope.COMPACT])
+async def test_write_read_packed(monkeypatch, envelope):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payloads = [
+        MockData(f"test_value_{i}", datetime.fromtimestamp(i, tz=timezone.utc)) for i in range(5)
+    ]
+    res = await mgr.write_stream_batch(
+        stream_name="test_stream",
+        queue=TestStreamData.test_queue,
+        payloads=payloads,
+        track_ids=MockEventHandler.test_track_ids,
+        auth_info={"auth_type": AuthType.UNSECURED, "allowed": "true"},
+        compression=Compression.LZ4,
+        serialization=Serialization.JSON_UTF8,
+        envelope=envelope,
+        pack_size=2,
+    )
+    assert res == 5
+    (pipe,) = mgr._write_pool.pipelines
+    assert [c["fields"].get("pack") for c in pipe.commands] == [2, 2, None]
+
+    fields = pipe.commands[1]["fields"]
+    test_msg = [b"0000000000-0", {_as_bytes(k): _as_bytes(v) for k, v in fields.items()}]
+    monkeypatch.setattr(MockRedisPool, "test_msg", test_msg)
+    stream_events = await mgr.read_stream(
+        stream_name="test_stream",
+        consumer_group="test_group",
+        datatypes={"unit.test_redis_streams.MockData": MockData},
+        track_headers=list(MockEventHandler.test_track_ids.keys()),
+        offset=">",
+        batch_size=1,
+        batch_interval=1000,
+        timeout=1,
+    )
+    assert [stream_event.payload for stream_event in stream_events] == payloads[2:4]
+    for i, stream_event in enumerate(stream_events, 2):
+        assert isinstance(stream_event, StreamEvent)
+        assert stream_event.msg_internal_id == b"0000000000-0"
+        assert stream_event.packed == 2
+        assert stream_event.queue == TestStreamData.test_queue
+        assert stream_event.auth_info == {"auth_type": "Unsecured", "allowed": "true"}
+        assert stream_event.track_ids["stream.event_id"] == f"test_value_{i}"
+        assert stream_event.track_ids["stream.event_ts"] == (
+            datetime.fromtimestamp(i, tz=timezone.utc).isoformat()
+        )
+        assert stream_event.track_ids["track.request_id"] == "test_request_id"
+    await mgr.close()
+
+
+def test_pack_groups_same_datatype():
+    ts = datetime.fromtimestamp(0, tz=timezone.utc)
+    a, b, c, d = (MockData(value, ts) for value in "abcd")
+    other = TestStreamData.test_payload
+    assert redis_streams._pack([a, b, c, other, d], 2) == [[a, b], [c], [other], [d]]
+    assert redis_streams._pack([a, b, c], 0) == [[a], [b], [c]]
+    assert redis_streams._pack([], 3) == []
+
+
+async def test_compact_envelope_omits_empty_auth_info(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    sizes = []
+    for auth_info in ({"auth_type": AuthType.UNSECURED}, {}):
+        fields = await mgr._encode_message(
+            payload,
+            "AUTO",
+            {},
+            auth_info,
+            Compression.NONE,
+            Serialization.JSON_UTF8,
+            StreamEnvelope.COMPACT,
+        )
+        sizes.append(len(fields[ENVELOPE_FIELD]))
+        stream_event = await mgr._decode_message(
+            "test_stream",
+            [b"0000000000-0", {_as_bytes(k): _as_bytes(v) for k, v in fields.items()}],
+            MockData,
+            "test_group",
+            [],
+            datetime.now(tz=timezone.utc).isoformat(),
+            decode_envelope(fields[ENVELOPE_FIELD]),
+        )
+        assert stream_event.payload == payload
+        assert stream_event.auth_info == auth_info
+    assert sizes[1] < sizes[0]
+    legacy_fields = await mgr._encode_message(
+        payload, "AUTO", {}, {}, Compression.NONE, Serialization.JSON_UTF8
+    )
+    legacy_size = sum(len(_as_bytes(v)) for k, v in legacy_fields.items() if k != "payload")
+    assert sizes[1] < legacy_size / 2
+    await mgr.close()
+
+
+async def test_read_compact_envelope_errors(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    fields = await mgr._encode_message(
+        payload,
+        "AUTO",
+        {},
+        {},
+        Compression.NONE,
+        Serialization.JSON_UTF8,
+        StreamEnvelope.COMPACT,
+    )
+    msg = {_as_bytes(k): _as_bytes(v) for k, v in fields.items()}
+    monkeypatch.setattr(MockRedisPool, "test_msg", [b"0000000000-0", msg])
+    stream_events = await mgr.read_stream(
+        stream_name="test_stream",
+        consumer_group="test_group",
+        datatypes={"unit.test_redis_streams.OtherData": MockData},
+        track_headers=[],
+        offset=">",
+        batch_size=10,
+        batch_interval=1000,
+        timeout=1,
+    )
+    assert all(isinstance(e, TypeError) for e in stream_events)
+
+    msg[ENVELOPE_FIELD] = b"\x02" + msg[ENVELOPE_FIELD][1:]
+    stream_events = await mgr.read_stream(
+        stream_name="test_stream",
+        consumer_group="test_group",
+        datatypes={"unit.test_redis_streams.MockData": MockData},
+        track_headers=[],
+        offset=">",
+        batch_size=10,
+        batch_interval=1000,
+        timeout=1,
+    )
+    assert all(isinstance(e, ValueError) for e in stream_events)
+    await mgr.close()
+
+
+async def test_compact_envelope_long_values(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    auth_info = {"auth_type": AuthType.UNSECURED, "token": "x" * 70000}
+    fields = await mgr._encode_message(
+        payload,
+        "AUTO",
+        {"track.request_id": "test_request_id"},
+        auth_info,
+        Compression.NONE,
+        Serialization.JSON_UTF8,
+        StreamEnvelope.COMPACT,
+    )
+    assert ENVELOPE_FIELD not in fields
+    stream_event = await mgr._decode_message(
+        "test_stream",
+        [b"0000000000-0", {_as_bytes(k): _as_bytes(v) for k, v in fields.items()}],
+        MockData,
+        "test_group",
+        ["track.request_id"],
+        datetime.now(tz=timezone.utc).isoformat(),
+    )
+    assert stream_event.payload == payload
+    assert stream_event.auth_info == auth_info
+    assert stream_event.track_ids["track.request_id"] == "test_request_id"
+
+    res = await mgr.write_stream_fanout(
+        targets=[("test_stream", TestStreamData.test_queue)],
+        payloads=[payload],
+        track_ids={"track.request_id": "y" * 70000},
+        auth_info={},
+        compression=Compression.NONE,
+        serialization=Serialization.JSON_UTF8,
+        envelope=StreamEnvelope.COMPACT,
+    )
+    assert res == 1
+    (pipe,) = mgr._write_pool.pipelines
+    assert ENVELOPE_FIELD not in pipe.commands[0]["fields"]
+
+    long_id = MockData("z" * 70000, datetime.fromtimestamp(0, tz=timezone.utc))
+    with pytest.raises(ValueError, match="compact envelope"):
+        await mgr._encode_message(
+            long_id,
+            "AUTO",
+            {},
+            {},
+            Compression.NONE,
+            Serialization.JSON_UTF8,
+            StreamEnvelope.COMPACT,
+        )
+    await mgr.close()
+
+
+async def test_read_compact_envelope_datatype_ids_collision(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    fields = await mgr._encode_message(
+        payload,
+        "AUTO",
+        {},
+        {},
+        Compression.NONE,
+        Serialization.JSON_UTF8,
+        StreamEnvelope.COMPACT,
+    )
+    msg = {_as_bytes(k): _as_bytes(v) for k, v in fields.items()}
+    monkeypatch.setattr(MockRedisPool, "test_msg", [b"0000000000-0", msg])
+    monkeypatch.setattr(envelope_module, "name_id", lambda name: 1)
+    datatypes = {
+        "unit.test_redis_streams.MockData": MockData,
+        "unit.test_redis_streams.OtherData": MockInvalidDataEvent,
+    }
+    with pytest.raises(ValueError, match="same compact envelope type_id=1"):
+        datatype_ids(datatypes)
+    with pytest.raises(ValueError, match="OtherData"):
+        await mgr.read_stream(
+            stream_name="test_stream",
+            consumer_group="test_group",
+            datatypes=datatypes,
+            track_headers=[],
+            offset=">",
+            batch_size=10,
+            batch_interval=1000,
+            timeout=1,
+        )
+    await mgr.close()
+
+
+async def test_read_stream_unknown_compression_dictionary(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    payload = MockData("test_value", datetime.fromtimestamp(0, tz=timezone.utc))
+    fields = await mgr._encode_message(
+        payload,
+        "AUTO",
+        {},
+        {},
+        Compression.ZSTD,
+        Serialization.JSON_UTF8,
+    )
+    msg = {_as_bytes(k): _as_bytes(v) for k, v in fields.items()}
+    msg[b"comp"] = b"zstd@12345"
+    monkeypatch.setattr(MockRedisPool, "test_msg", [b"0000000000-0", msg])
+    await mgr.ensure_consumer_group(stream_name="test_stream", consumer_group="test_group")
+    stream_events = await mgr.read_stream(
+        stream_name="test_stream",
+        consumer_group="test_group",
+        datatypes={"unit.test_redis_streams.MockData": MockData},
+        track_headers=[],
+        offset=">",
+        batch_size=10,
+        batch_interval=1000,
+        timeout=1,
+    )
+    assert len(stream_events) == 10
+    assert all(isinstance(e, ValueError) for e in stream_events)
+    assert "msg_id=0000000000-0" in str(stream_events[0])
+    assert "dict_id=12345" in str(stream_events[0])
+    await mgr.close()
+
+
+async def test_read_stream_lazy_track_ids(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    stream_events = await mgr.read_stream(
+        stream_name="test_stream",
+        consumer_group="test_group",
+        datatypes={"unit.test_redis_streams.MockData": MockData},
+        track_headers=list(MockEventHandler.test_track_ids.keys()),
+        offset=">",
+        batch_size=10,
+        batch_interval=1000,
+        timeout=1,
+    )
+    stream_event = stream_events[0]
+    assert isinstance(stream_event, RedisStreamEvent)
+    assert stream_event._track_ids is None and stream_event._auth_info is None
+    assert stream_event.track_ids["stream.submit_ts"] == "2020-02-05T17:07:38.771396+00:00"
+    assert (
+        stream_event.track_ids["track.operation_id"] == stream_event.track_ids["track.operation_id"]
+    )
+    assert stream_event.auth_info == {"auth_type": "Unsecured", "allowed": "true"}
+    await mgr.close()
+
+
+async def test_assign_release_partitions(monkeypatch):
+    patch_redis_client(monkeypatch)
+    mgr = await create_stream_manager()
+    assigned = await mgr.assign_partitions(
+        stream_name="test_stream", consumer_group="test_group", partitions=3, lease_ms=1000
+    )
+    assert assigned == [0, 2]
+    await mgr.release_partitions(
+        stream_name="test_stream", consumer_group="test_group", partitions=3
+    )
+    keys = [
+        "test_stream:test_group:consumers",
+        "test_stream:test_group:partition:0",
+        "test_stream:test_group:partition:1",
+        "test_stream:test_group:partition:2",
+    ]
+    (assign_script, assign_keys, assign_args), (release_script, release_keys, release_args) = (
+        mgr._ack_pool.eval_calls
+    )
+    assert assign_script == redis_streams._ASSIGN_PARTITIONS_SCRIPT
+    assert assign_keys == tuple(keys)
+    assert assign_args == (mgr.consumer_id, 1000)
+    assert release_script == redis_streams._RELEASE_PARTITIONS_SCRIPT
+    assert release_keys == tuple(keys)
+    assert release_args == (mgr.consumer_id, 1)
+    await mgr.close()
+
+
+async def create_fake_redis_stream_managers(monkeypatch, count: int) -> List[RedisStreamManager]:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(RedisStreamManager, "_RedisStreamManager__connection_factory", None)
+    monkeypatch.setattr(
+        RedisStreamManager, "_RedisStreamManager__factory_limits_connections", False
+    )
+    RedisStreamManager.setup_connection_factory(
+        lambda address: fakeredis.FakeAsyncRedis(server=server)
+    )
+    return [
+        await RedisStreamManager(address="redis://fakeredis").connect(StreamsConfig())
+        for _ in range(count)
+    ]
+
+
+async def test_partition_scripts(monkeypatch):
+    mgr1, mgr2 = await create_fake_redis_stream_managers(monkeypatch, 2)
+    stream = {"stream_name": "test_stream", "consumer_group": "test_group", "partitions": 4}
+    assert await mgr1.assign_partitions(**stream, lease_ms=10000) == [0, 1, 2, 3]
+    assert await mgr2.assign_partitions(**stream, lease_ms=10000) == []
+
+    # Partitions over consumer share are not returned, but kept until released
+    assert await mgr1.assign_partitions(**stream, lease_ms=10000) == [0, 1]
+    assert await mgr2.assign_partitions(**stream, lease_ms=10000) == []
+    await mgr1.release_partitions(**stream, released=[2, 3])
+    assert await mgr2.assign_partitions(**stream, lease_ms=10000) == [2, 3]
+    assert await mgr1.assign_partitions(**stream, lease_ms=10000) == [0, 1]
+
+    # Releasing partitions held by others has no effect
+    await mgr1.release_partitions(**stream, released=[2])
+    assert await mgr2.assign_partitions(**stream, lease_ms=10000) == [2, 3]
+
+    await mgr1.release_partitions(**stream)
+    assert await mgr2.assign_partitions(**stream, lease_ms=10000) == [0, 1, 2, 3]
+
+    # Leases of a stopped consumer expire
+    assert await mgr2.assign_partitions(**stream, lease_ms=50) == [0, 1, 2, 3]
+    await asyncio.sleep(0.1)
+    assert await mgr1.assign_partitions(**stream, lease_ms=10000) == [0, 1, 2, 3]
+    for mgr in (mgr1, mgr2):
+        await mgr.close()
+
+
+async def test_read_partitions_claim_pending(monkeypatch):
+    mgr1, mgr2 = await create_fake_redis_stream_managers(monkeypatch, 2)
+    datatypes = {"unit.test_redis_streams.MockData": MockData}
+    ts = datetime.fromtimestamp(0, tz=timezone.utc)
+    for partition, values in ((0, ["a0", "a1"]), (1, []), (2, ["c0"])):
+        await mgr1.ensure_consumer_group(
+            stream_name=f"test_stream:{partition}", consumer_group="test_group"
+        )
+        await mgr1.write_stream_batch(
+            stream_name=f"test_stream:{partition}",
+            queue=TestStreamData.test_queue,
+            payloads=[MockData(value, ts) for value in values],
+            track_ids={},
+            auth_info={},
+            compression=Compression.NONE,
+            serialization=Serialization.JSON_UTF8,
+        )
+    read = {
+        "stream_name": "test_stream",
+        "partitions": [0, 1, 2],
+        "consumer_group": "test_group",
+        "datatypes": datatypes,
+        "track_headers": [],
+        "offset": ">",
+        "batch_size": 10,
+        "timeout": 1,
+        "batch_interval": 1,
+    }
+    stream_events = await mgr1.read_partitions(**read)
+    assert [(name, e.payload.value) for name, e in stream_events] == [
+        ("test_stream:0", "a0"),
+        ("test_stream:0", "a1"),
+        ("test_stream:2", "c0"),
+    ]
+    assert len(mgr1._reader_pools) == 1
+
+    # Partition 0 is assigned to another consumer before "a1" is acknowledged
+    await mgr1.ack_read_stream_batch(
+        stream_name="test_stream:0",
+        consumer_group="test_group",
+        stream_events=[stream_events[0][1]],
+    )
+    next_id, claimed = await mgr2.claim_pending(
+        stream_name="test_stream:0",
+        consumer_group="test_group",
+        datatypes=datatypes,
+        track_headers=[],
+        start_id="0-0",
+        batch_size=10,
+    )
+    assert next_id == "0-0"
+    assert [e.payload.value for e in claimed] == ["a1"]
+    assert await mgr2.read_partitions(**{**read, "partitions": [0]}) == []
+    for mgr in (mgr1, mgr2):
+        await mgr.close()